@@ -1,40 +1,89 @@
+import os
+from functools import lru_cache
+
 import streamlit as st
-import random
-from hanafuda_logic00 import HanafudaRule, initialize_game, Card, BRIGHT, ANIMAL, RIBBON, JUNK
+from hanafuda_logic00 import HanafudaRule, BRIGHT, ANIMAL, RIBBON, JUNK
+from hanafuda_engine00 import deal, CARDS, MONTH, MONTH_MASK, cards_of, iter_cards, TurnResult
+from hanafuda_ai00 import HanafudaAI
+
+AI_TIME_MS = 500  # 相手（AI）の1手あたりの思考時間（ミリ秒）
+
+
+@st.cache_resource(on_release=HanafudaAI.close)
+def get_ai():
+    """相手（AI）。確定化のシミュレーションは全セッションで共有するプロセスプールで並列に回す（キャッシュから外れたら閉じる）"""
+    return HanafudaAI(time_ms=AI_TIME_MS, workers=os.cpu_count() or 1)
 
 
 def init_session_state():
     """Streamlitのセッション状態を初期化します。"""
     if 'game_state' not in st.session_state:
-        st.session_state['game_state'] = initialize_game()
-        st.session_state['selected_hand_card'] = None  # プレイヤーが選択した手札
-
-
-def display_card_text(card: Card, key_prefix: str):
-    """札の種別に応じて色分けしたテキストで表示します。（画像不使用のため）"""
-    # 札の種別に応じて色と記号を決定
-    color_map = {
-        BRIGHT: ("red", "⭐"),
-        ANIMAL: ("green", "◎"),
-        RIBBON: ("blue", "🎗️"),
-        JUNK: ("gray", "⚫")
-    }
-    color, symbol = color_map.get(card.type, ("black", "❓"))
-
-    # st.markdown は表示のみに使用し、キーは使用しない
-    st.markdown(
-        f"<div style='border: 1px solid {color}; padding: 5px; margin: 2px; text-align: center; border-radius: 5px; background-color: #f0f0f0;'>"
-        f"**{symbol} {card.name}**<br><span style='font-size: 0.8em;'>({card.month}月/{card.type})</span>"
-        f"</div>",
-        unsafe_allow_html=True,
-        # key=display_key # 👈 この行を削除/コメントアウトします
+        # 場に同じ月が4枚そろったら配り直す（hanafuda_engine00.HanafudaState）
+        st.session_state['game_state'] = deal(redeal=True)
+        st.session_state['selected_hand_card'] = None  # プレイヤーが選択した手札（札の番号 0〜47）
+        st.session_state['selected_field_card'] = None  # 同じ月の場札が2枚あるとき、どちらを取るか
+
+
+# 札の種別ごとの枠の色と記号
+COLOR_MAP = {
+    BRIGHT: ("red", "⭐"),
+    ANIMAL: ("green", "◎"),
+    RIBBON: ("blue", "🎗️"),
+    JUNK: ("gray", "⚫")
+}
+
+
+@lru_cache(maxsize=None)
+def card_html(card_id: int, small: bool = False) -> str:
+    """札1枚の HTML 断片（札の id ごとに1度だけ作って使い回す）。small は獲得札用の小さい表示"""
+    card = CARDS[card_id - 1]
+    color, symbol = COLOR_MAP.get(card.type, ("black", "❓"))
+    width, font = ("84px", "0.75em") if small else ("120px", "1em")
+    return (
+        f"<div style='border: 1px solid {color}; padding: 5px; margin: 2px; text-align: center; border-radius: 5px;"
+        f" background-color: #f0f0f0; width: {width}; font-size: {font};'>"
+        f"<b>{symbol} {card.name}</b><br><span style='font-size: 0.8em;'>({card.month}月/{card.type})</span>"
+        f"</div>"
     )
 
 
+def cards_html(mask: int, small: bool = False) -> str:
+    """マスクの札を月順に横に並べた HTML"""
+    fragments = "".join(card_html(card + 1, small) for card in iter_cards(mask))
+    return f"<div style='display: flex; flex-wrap: wrap;'>{fragments}</div>"
+
+
+def show_turn_result(result: TurnResult, who: str):
+    """1ターンの結果（取った札・引いた札・場に残った札）をメッセージで表示します。"""
+    # --- 1. 手札から場へ札を出した結果 ---
+    played = CARDS[result.played]
+    if result.taken:
+        gained = "・".join(card.name for card in cards_of(result.taken))
+        st.success(f"🎊 {who}の **{played.name}** が **{gained}** と組み合わさり、{result.taken.bit_count() + 1}枚を獲得しました！")
+    else:
+        st.info(f"👉 {who}の手札の札 **{played.name}** は場札とマッチしませんでした。")
+
+    # --- 2. 山札から札を引いた結果 ---
+    if result.drawn is not None:
+        drawn = CARDS[result.drawn]
+        st.info(f"🃏 山札から **{drawn.name}** が引かれました。")
+        if result.draw_taken:
+            gained = "・".join(card.name for card in cards_of(result.draw_taken))
+            st.success(f"🎉 山札の **{drawn.name}** が **{gained}** と組み合わさり、さらに{result.draw_taken.bit_count() + 1}枚を獲得！")
+        else:
+            st.info(f"👉 山札の札 **{drawn.name}** は場札とマッチしませんでした。")
+
+    # --- 3. 場に残った札 ---
+    if not result.taken:
+        st.warning(f"❌ {who}が手札から出した札 **{played.name}** が場に残りました。")
+    if result.drawn is not None and not result.draw_taken:
+        st.warning(f"⚠️ 山札の札 **{CARDS[result.drawn].name}** が場に残りました。")
+
+
 def handle_turn_action():
     """
     手札から札を出した後、山札から札を引く処理を含む、ターン処理全体を実行します。
-    この関数はプレイヤー1のターンを処理します。
+    プレイヤー1のターンを処理し、続けて相手（AI）のターンを処理します。
     """
     state = st.session_state['game_state']
     selected_card = st.session_state['selected_hand_card']
@@ -43,95 +92,66 @@ def handle_turn_action():
     if selected_card is None:
         return
 
-    # プレイヤーの手札から選択した札を削除
-    state['player1_hand'] = [
-        card for card in state['player1_hand'] if card.id != selected_card.id
-    ]
-
-    # --- 1. 手札から場へ札を出す処理の実行 ---
-
-    temp_played_card: Optional[Card] = selected_card
-
-    # マッチする場札を探す
-    matching_field_cards_hand = [card for card in state['field_cards'] if card.month == temp_played_card.month]
-
-    if len(matching_field_cards_hand) >= 1:
-        # 簡易版：最初のマッチング札を獲得
-        gained_card_hand = matching_field_cards_hand[0]
-
-        # 場札から獲得札を削除
-        state['field_cards'].remove(gained_card_hand)
-
-        # 獲得札リストに追加
-        state['player1_collected'].append(temp_played_card)
-        state['player1_collected'].append(gained_card_hand)
-        st.success(f"🎊 **{temp_played_card.name}** が **{gained_card_hand.name}** と組み合わさり、2枚を獲得しました！")
-
-        temp_played_card = None  # 獲得されたため場には出ない
-    else:
-        st.info(f"👉 手札の札 **{temp_played_card.name}** は場札とマッチしませんでした。")
-
-    # --- 2. 山札から札を引く処理 ---
-
-    temp_drawn_card: Optional[Card] = None
-
-    if state['yama_fuda']:
-        drawn_card = state['yama_fuda'].pop(0)
-        temp_drawn_card = drawn_card
-        st.info(f"🃏 山札から **{drawn_card.name}** が引かれました。")
-
-        # 場札から、引いた札と同じ月の札があるか探す
-        matching_field_cards_yama = [card for card in state['field_cards'] if card.month == temp_drawn_card.month]
-
-        if len(matching_field_cards_yama) >= 1:
-            gained_card_yama = matching_field_cards_yama[0]
-
-            state['field_cards'].remove(gained_card_yama)
-
-            # 獲得札リストに追加
-            state['player1_collected'].append(temp_drawn_card)
-            state['player1_collected'].append(gained_card_yama)
-
-            st.success(
-                f"🎉 山札の **{temp_drawn_card.name}** が **{gained_card_yama.name}** と組み合わさり、さらに2枚を獲得！")
-
-            temp_drawn_card = None  # 獲得されたため場には出ない
+    # 手札から場へ出し、山札から1枚引く（ルールは hanafuda_engine00）
+    show_turn_result(state.play_turn(selected_card, st.session_state.get('selected_field_card')), "あなた")
+    st.session_state['selected_hand_card'] = None
+    st.session_state['selected_field_card'] = None
+
+    # 相手（AI）のターン: 見えていない札を配り直しながら、思考時間いっぱい先を読んで手を選ぶ
+    if state.turn == 2 and state.hands[2]:
+        with st.spinner("🤖 相手（AI）が考えています…"):
+            decision = get_ai().choose(state, player=2)
+        show_turn_result(state.play_turn(decision.card, decision.choice), "相手（AI）")
+
+
+def play_options(state) -> list:
+    """出し方の一覧 (手札, 取る場札)。同じ月の場札が2枚ある手札は、どちらを取るかで2通りにする"""
+    options = []
+    for card in iter_cards(state.hands[1]):
+        matches = state.field & MONTH_MASK[MONTH[card]]
+        if matches.bit_count() == 2:
+            options.extend((card, choice) for choice in iter_cards(matches))
         else:
-            st.info(f"👉 山札の札 **{temp_drawn_card.name}** は場札とマッチしませんでした。")
-
-    # --- 3. 場の更新処理（獲得されなかった札を場に追加） ---
+            options.append((card, None))
+    return options
 
-    # 手札から出した札（獲得されなかった場合）を場に追加
-    if temp_played_card:
-        state['field_cards'].append(temp_played_card)
-        st.warning(f"❌ 手札から出した札 **{temp_played_card.name}** が場に残りました。")
 
-        # 山札から引いた札（獲得されなかった場合）を場に追加
-    if temp_drawn_card:
-        state['field_cards'].append(temp_drawn_card)
-        st.warning(f"⚠️ 山札の札 **{temp_drawn_card.name}** が場に残りました。")
+def format_play_option(option) -> str:
+    card, choice = option
+    label = f"{CARDS[card].name}（{CARDS[card].month}月）"
+    return label if choice is None else f"{label} → {CARDS[choice].name}を取る"
 
-        # 4. 後処理: ターンを相手（AI）に渡すことを明確にする
-    st.session_state['selected_hand_card'] = None
-    state['current_turn'] = 2  # 相手ターンへ確実に移行
 
+def collected_html(mask: int, is_player: bool) -> str:
+    """獲得した札のサマリー（枚数と種類別カウント、点数、役）と札の一覧の HTML"""
+    cards = cards_of(mask)
+    total_score, counts = HanafudaRule.calculate_score(cards)
 
-def display_collected_summary(cards: list[Card], is_player: bool):
-    """獲得した札のサマリー（枚数と種類別カウント、点数）を表示する"""
-    score_info = HanafudaRule.calculate_score(cards)
-    total_score = score_info[0]
-    counts = score_info[1]  # 種類別枚数
-
+    html = f"<div>合計枚数: <b>{len(cards)}枚</b></div>"
     if is_player:
-        st.write(f"合計枚数: **{len(cards)}枚**")
-        st.write(f"合計点数: **{total_score}点**")
-    else:
-        st.write(f"合計枚数: **{len(cards)}枚**")
-        # AIの点数は非表示
-
-    st.markdown("---")
-    st.markdown(
-        f"**⭐ 光:** {counts[BRIGHT]}枚 / **◎ タネ:** {counts[ANIMAL]}枚 / **🎗️ タン:** {counts[RIBBON]}枚 / **⚫ カス:** {counts[JUNK]}枚"
+        html += f"<div>合計点数: <b>{total_score}点</b></div>"
+        yaku = HanafudaRule.yaku(cards)
+        if yaku:
+            html += "<div>役: " + " / ".join(f"<b>{name}</b> {points}点" for name, points in yaku) + "</div>"
+    # AIの点数と役は非表示
+
+    html += (
+        f"<hr style='margin: 6px 0;'><div><b>⭐ 光:</b> {counts[BRIGHT]}枚 / <b>◎ タネ:</b> {counts[ANIMAL]}枚 /"
+        f" <b>🎗️ タン:</b> {counts[RIBBON]}枚 / <b>⚫ カス:</b> {counts[JUNK]}枚</div>"
+    )
+    return html + cards_html(mask, small=True)
+
+
+def render_table_html(state) -> str:
+    """場の札・手札・獲得札をまとめた1つの HTML（st.markdown 1回で送る）"""
+    column = "<div style='flex: 1; min-width: 280px;'>"
+    return (
+        "<h2>場の札 (Field)</h2>" + cards_html(state.field)
+        + "<h2>あなたの手札 (Your Hand)</h2>" + cards_html(state.hands[1])
+        + "<h2>獲得札 (Collected Cards)</h2><div style='display: flex; gap: 24px; flex-wrap: wrap;'>"
+        + column + "<h3>あなた</h3>" + collected_html(state.captured[1], is_player=True) + "</div>"
+        + column + "<h3>相手 (AI)</h3>" + collected_html(state.captured[2], is_player=False) + "</div>"
+        + "</div>"
     )
 
 
@@ -149,71 +169,34 @@ def main():
 
     # --- 0. ゲーム情報と山札の表示 (サイドバー) ---
     st.sidebar.header("ゲーム情報")
-    st.sidebar.write(f"現在のターン: **{'あなた' if state['current_turn'] == 1 else '相手（AI）'}**")
+    st.sidebar.write(f"現在のターン: **{'あなた' if state.turn == 1 else '相手（AI）'}**")
     st.sidebar.markdown("---")
-    st.sidebar.write(f"山札の残り: **{len(state['yama_fuda'])}枚**")
-    st.sidebar.write(f"あなたの手札: **{len(state['player1_hand'])}枚**")
-    st.sidebar.write(f"相手の手札: **{len(state['player2_hand'])}枚**")
+    st.sidebar.write(f"山札の残り: **{state.deck_left}枚**")
+    st.sidebar.write(f"あなたの手札: **{state.hands[1].bit_count()}枚**")
+    st.sidebar.write(f"相手の手札: **{state.hands[2].bit_count()}枚**")
     st.sidebar.markdown("---")
 
-    # --- 1. 場の札の表示 ---
-    st.header("場の札 (Field)")
-
-    # 場の札を月ごとにソートして表示
-    sorted_field = sorted(state['field_cards'], key=lambda card: card.month)
-    num_field_cards = len(sorted_field)
-
-    # 列数を最大12に制限し、動的に調整
-    max_cols = min(num_field_cards, 12)
-    cols = st.columns(max_cols if max_cols > 0 else 1)
-
-    if num_field_cards > 0:
-        for i, card in enumerate(sorted_field):
-            with cols[i % max_cols]:  # 12枚を超えたら次の行に表示されるように制御
-                display_card_text(card, key_prefix="field")
-
-    # --- 2. プレイヤーの手札の表示 ---
-    st.header("あなたの手札 (Your Hand)")
-
-    # プレイヤーの手札を月ごとにソートして表示
-    sorted_hand = sorted(state['player1_hand'], key=lambda card: card.month)
-    num_hand_cards = len(sorted_hand)
-    hand_cols = st.columns(num_hand_cards if num_hand_cards > 0 else 1)
-
-    # ターンチェック
-    if state['current_turn'] == 1 and num_hand_cards > 0:
-        # プレイヤーのターン: 操作可能
-        for i, card in enumerate(sorted_hand):
-            with hand_cols[i]:
-                # 札の表示
-                display_card_text(card, key_prefix="hand")
-
-                # プレイヤーがこの札を選択するボタン
-                if st.button("出す", key=f"hand_btn_{card.id}"):
-                    st.session_state['selected_hand_card'] = card
-                    st.rerun()  # これにより main() が再実行され、handle_turn_action() が動く
-    elif state['current_turn'] == 2:
-        # 相手（AI）のターン: 処理はhandle_turn_actionで完了しているため、メッセージを表示してプレイヤーのターンに戻す
-        st.info("🤖 相手（AI）のターンはスキップされました。あなたの番です。")
-        state['current_turn'] = 1  # 処理後にすぐにプレイヤーのターンに戻す
-    else:
+    # --- 1〜3. 場の札・手札・獲得札の表示 ---
+    # 札ごとに要素を分けず、1つの HTML にまとめて1回で送る
+    st.markdown(render_table_html(state), unsafe_allow_html=True)
+
+    # 出す札の選択（札ごとのボタンではなく、1つのフォームで選ぶ）
+    if state.turn == 1 and state.hands[1]:
+        with st.form("play_card"):
+            # 同じ月の場札が2枚ある札は「どちらを取るか」まで含めて選ぶ（フォームの中では選択に応じて項目を変えられないため）
+            card, choice = st.radio("出す札", play_options(state), horizontal=True, format_func=format_play_option)
+            if st.form_submit_button("出す"):
+                st.session_state['selected_hand_card'] = card
+                st.session_state['selected_field_card'] = choice
+                st.rerun()  # これにより main() が再実行され、handle_turn_action() が動く
+    elif not state.game_over:
         st.info("手札がありません。ゲーム終了までお待ちください。")
 
-    # --- 3. 獲得札の表示 ---
-    st.header("獲得札 (Collected Cards)")
-    col1, col2 = st.columns(2)
-    with col1:
-        st.subheader("あなた")
-        display_collected_summary(state['player1_collected'], is_player=True)
-    with col2:
-        st.subheader("相手 (AI)")
-        display_collected_summary(state['player2_collected'], is_player=False)
-
     # --- 4. ゲームオーバー判定 (勝敗結果の表示) ---
-    if len(state['player1_hand']) == 0 and len(state['player2_hand']) == 0 and len(state['yama_fuda']) == 0:
+    if state.game_over:
         st.header("ゲーム終了！最終結果")
-        score1, _ = HanafudaRule.calculate_score(state['player1_collected'])
-        score2, _ = HanafudaRule.calculate_score(state['player2_collected'])
+        score1, _ = HanafudaRule.calculate_score(cards_of(state.captured[1]))
+        score2, _ = HanafudaRule.calculate_score(cards_of(state.captured[2]))
 
         if score1 > score2:
             st.balloons()
@@ -0,0 +1,169 @@
+import atexit
+import math
+import multiprocessing
+import random
+import threading
+import time
+from typing import NamedTuple, Optional
+
+from hanafuda_logic00 import ALL_CARDS_DATA
+from hanafuda_engine00 import HanafudaState, ALL_MASK, MONTH, MONTH_MASK, iter_cards, capture
+
+# ----------------- 相手（AI）の思考: 確定化モンテカルロ -----------------
+# AI からは相手の手札と山札の順番が見えないので、見えていない札（全体 − 自分の手札 − 場 − 両者の獲得札）を
+# シャッフルして「相手の手札と山札の1通り」を作り（確定化）、その上で候補手を1つずつ打って
+# 終局まで速い方針（playout_move）で打ち進める。これを思考時間いっぱい繰り返し、
+# 最終的な点差（自分の役の点 − 相手の役の点）の平均が一番よい手を選ぶ。
+# 候補手はどの確定化でも全部同じ配りで試す（手の間の比較のばらつきを減らす）。
+# workers > 1 ならプロセスごとに別々のシードで確定化し、合計と回数を足し合わせる。
+
+CARD_VALUE = tuple(score for _, _, _, score in ALL_CARDS_DATA)  # 札単体の点（光 20, タネ 10, タン 5, カス 1）
+
+
+class Candidate(NamedTuple):
+    card: int  # 手札から出す札
+    choice: Optional[int]  # 同じ月の場札が2枚あるとき、どちらを取るか
+
+
+class Decision(NamedTuple):
+    card: int
+    choice: Optional[int]
+    expected: float  # 点差の期待値（AI から見た値）
+    samples: int  # 確定化の回数（全プロセスの合計）
+
+
+def candidates(state: HanafudaState, player: int) -> list[Candidate]:
+    """player が打てる手（場の取り方の違いも別の手にする）"""
+    found = []
+    for card in iter_cards(state.hands[player]):
+        matches = state.field & MONTH_MASK[MONTH[card]]
+        if matches.bit_count() == 2:
+            found.extend(Candidate(card, choice) for choice in iter_cards(matches))
+        else:
+            found.append(Candidate(card, None))
+    return found
+
+
+def playout_move(state: HanafudaState, rng: random.Random) -> int:
+    """速い方針: 取れる札の点が一番大きい手。どれも取れなければ一番点の低い札を捨てる"""
+    field = state.field
+    best, best_gain = -1, None
+    for card in iter_cards(state.hands[state.turn]):
+        taken = capture(field, card)
+        if taken:
+            gain = CARD_VALUE[card] + sum(CARD_VALUE[c] for c in iter_cards(taken))
+        else:
+            gain = -CARD_VALUE[card]
+        if best_gain is None or gain > best_gain or (gain == best_gain and rng.random() < 0.5):
+            best, best_gain = card, gain
+    return best
+
+
+def playout(state: HanafudaState, rng: random.Random) -> HanafudaState:
+    """state から両者とも playout_move で終局まで打つ（state を書き換える）"""
+    while not state.game_over:
+        state.play_turn(playout_move(state, rng))
+    return state
+
+
+def determinize(observation, rng: random.Random) -> HanafudaState:
+    """player から見えている情報（observation）と矛盾しない、相手の手札と山札の順番を1通り作る"""
+    player, hand, opponent_cards, field, captured, counts, deck_left = observation
+    unseen = ALL_MASK & ~(hand | field | captured[1] | captured[2])
+    cards = list(iter_cards(unseen))
+    rng.shuffle(cards)
+    hands = [0, 0, 0]
+    hands[player] = hand
+    hands[3 - player] = sum(1 << c for c in cards[:opponent_cards])
+    deck = bytes(cards[opponent_cards:opponent_cards + deck_left])
+    return HanafudaState(hands, field, captured, deck, 0, player, counts)
+
+
+def observe(state: HanafudaState, player: int):
+    """player から見えている情報だけを取り出す（相手の手札と山札の中身は枚数だけ）"""
+    opponent = 3 - player
+    return (player, state.hands[player], state.hands[opponent].bit_count(), state.field,
+            tuple(state.captured), tuple(state.counts), state.deck_left)
+
+
+def simulate(observation, moves: list[Candidate], deadline: float, seed: int, max_samples: Optional[int] = None):
+    """deadline（time.time()）まで確定化を繰り返し、手ごとの点差の合計と確定化の回数を返す"""
+    rng = random.Random(seed)
+    player = observation[0]
+    totals = [0.0] * len(moves)
+    samples = 0
+    # 時間が足りなくても最低1回は確定化する
+    while samples == 0 or (time.time() < deadline and (max_samples is None or samples < max_samples)):
+        world = determinize(observation, rng)
+        for i, move in enumerate(moves):
+            state = world.copy()
+            state.play_turn(move.card, move.choice)
+            playout(state, rng)
+            totals[i] += state.score(player) - state.score(3 - player)
+        samples += 1
+    return totals, samples
+
+
+def _simulate_worker(args):
+    return simulate(*args)
+
+
+class HanafudaAI:
+    """確定化モンテカルロで手を選ぶ AI
+
+    time_ms: 1手あたりの思考時間（ミリ秒）/ workers: 並列に確定化するプロセス数
+    samples: 指定すると時間ではなく確定化の回数（1プロセスあたり）で打ち切る。seed が同じなら同じ手を選ぶ。
+    プロセスプールは最初の思考で作って使い回すので、使い終わったら close() する（閉じ忘れてもプロセス終了時に閉じる）。
+    st.cache_resource で複数のセッションから同時に呼ばれてもよいように、プールと乱数はロックで守る。
+    プールの子プロセスは spawn で起動する（スレッドを持つ Streamlit のプロセスを fork しない）。
+    """
+
+    def __init__(self, time_ms: float = 500, workers: int = 1, seed: Optional[int] = None,
+                 samples: Optional[int] = None):
+        self.time_ms = time_ms
+        self.samples = samples
+        self.workers = workers
+        self.rng = random.Random(seed)
+        self.pool = None
+        self.lock = threading.Lock()
+
+    def choose(self, state: HanafudaState, player: int = 2) -> Decision:
+        moves = candidates(state, player)
+        if len(moves) == 1:
+            return Decision(moves[0].card, moves[0].choice, 0.0, 0)
+
+        observation = observe(state, player)
+        deadline = time.time() + self.time_ms / 1000 if self.samples is None else math.inf
+        with self.lock:
+            tasks = [(observation, moves, deadline, self.rng.getrandbits(32), self.samples)
+                     for _ in range(self.workers)]
+        if self.workers == 1:
+            results = [simulate(*tasks[0])]
+        else:
+            results = self._get_pool().map(_simulate_worker, tasks)
+
+        totals = [sum(r[0][i] for r in results) for i in range(len(moves))]
+        samples = sum(r[1] for r in results)
+        best = max(range(len(moves)), key=lambda i: totals[i])
+        return Decision(moves[best].card, moves[best].choice, totals[best] / max(samples, 1), samples)
+
+    def _get_pool(self):
+        with self.lock:
+            if self.pool is None:
+                self.pool = multiprocessing.get_context("spawn").Pool(self.workers)
+                atexit.register(self.close)
+            return self.pool
+
+    def close(self):
+        with self.lock:
+            pool, self.pool = self.pool, None
+        if pool is not None:
+            atexit.unregister(self.close)
+            pool.close()
+            pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,185 @@
+import random
+from typing import Iterable, List, NamedTuple, Optional
+
+from hanafuda_logic00 import ALL_CARDS_DATA, Card, BRIGHT, ANIMAL, RIBBON, JUNK, add_captures, yaku_score, yaku_list
+
+# ----------------- 札の番号とマスク -----------------
+# 札は ALL_CARDS_DATA の並び順の番号 0〜47 で表す（月ごとに4枚ずつなので、月 = 番号 // 4 + 1）。
+# 手札・場札・獲得札は 48 ビットのマスク（札 i がビット i）で持ち、
+# 場から同じ月の札を探すのは MONTH_MASK との AND 1回で済む。
+# 画面に出すときだけ CARDS の Card（id は従来どおり 1〜48）に戻して使う。
+
+N_CARDS = len(ALL_CARDS_DATA)
+ALL_MASK = (1 << N_CARDS) - 1
+CARDS = tuple(Card(i + 1, month, name, type, score) for i, (month, name, type, score) in enumerate(ALL_CARDS_DATA))
+MONTH = tuple(month for month, _, _, _ in ALL_CARDS_DATA)
+MONTH_MASK = (0,) + tuple(sum(1 << i for i in range(N_CARDS) if MONTH[i] == m) for m in range(1, 13))
+TYPE_MASK = {t: sum(1 << i for i, (_, _, type, _) in enumerate(ALL_CARDS_DATA) if type == t)
+             for t in (BRIGHT, ANIMAL, RIBBON, JUNK)}
+
+HAND_SIZE = 8
+FIELD_SIZE = 8
+
+
+def iter_cards(mask: int):
+    """マスクに含まれる札の番号を小さい順に返す（番号順は月順でもある）"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def mask_of(cards: Iterable[int]) -> int:
+    mask = 0
+    for card in cards:
+        mask |= 1 << card
+    return mask
+
+
+def cards_of(mask: int) -> List[Card]:
+    """マスクの札を Card のリスト（月順）にする（表示や HanafudaRule 用）"""
+    return [CARDS[i] for i in iter_cards(mask)]
+
+
+def capture(field: int, card: int, choice: Optional[int] = None) -> int:
+    """card を場に出したときに取れる場札のマスク（card 自身は含まない。取れなければ 0）
+
+    同じ月の場札が1枚か3枚ならすべて、2枚なら choice の札（指定がなければ番号の小さいほう）を取る。
+    """
+    matches = field & MONTH_MASK[MONTH[card]]
+    if matches.bit_count() != 2:
+        return matches
+    if choice is not None and matches >> choice & 1:
+        return 1 << choice
+    return matches & -matches
+
+
+# ----------------- ゲーム状態 -----------------
+
+class TurnResult(NamedTuple):
+    played: int  # 手札から出した札
+    taken: int  # 手札の札で取った場札のマスク（0 なら場に残った）
+    drawn: Optional[int]  # 山札から引いた札（山札がなければ None）
+    draw_taken: int  # 引いた札で取った場札のマスク（0 なら場に残った）
+
+
+class HanafudaState:
+    """1局の状態。手番・手札・獲得札の添字は 1: プレイヤー, 2: 相手（AI）
+
+    山札は配った順の bytes と、次に引く位置（cursor）で持つので、引くのも複製するのも軽い。
+    役の判定に使う枚数（hanafuda_logic00.yaku_counts）は獲得するたびに差分で更新する。
+    """
+
+    __slots__ = ("hands", "field", "captured", "deck", "cursor", "turn", "counts")
+
+    def __init__(self, hands, field: int, captured, deck: bytes, cursor: int = 0, turn: int = 1, counts=(0, 0, 0)):
+        self.hands = list(hands)  # [未使用, プレイヤー, 相手]
+        self.field = field
+        self.captured = list(captured)
+        self.deck = deck
+        self.cursor = cursor
+        self.turn = turn
+        self.counts = list(counts)
+
+    def copy(self) -> "HanafudaState":
+        return HanafudaState(self.hands, self.field, self.captured, self.deck, self.cursor, self.turn, self.counts)
+
+    def score(self, player: int) -> int:
+        """player の役の点数の合計"""
+        return yaku_score(self.counts[player])
+
+    def yaku(self, player: int) -> list[tuple[str, int]]:
+        """player の成立している役と点数のリスト"""
+        return yaku_list(self.counts[player])
+
+    @property
+    def deck_left(self) -> int:
+        return len(self.deck) - self.cursor
+
+    @property
+    def game_over(self) -> bool:
+        """両者の手札がなくなったら終局"""
+        return not self.hands[1] and not self.hands[2]
+
+    def draw(self) -> Optional[int]:
+        if self.cursor >= len(self.deck):
+            return None
+        card = self.deck[self.cursor]
+        self.cursor += 1
+        return card
+
+    def play_turn(self, card: int, choice: Optional[int] = None, draw_choice: Optional[int] = None) -> TurnResult:
+        """手番のプレイヤーが手札の card を出し、山札から1枚引いて、手番を相手に渡す
+
+        取れなかった札は場に残る。手札の札を場に出してから山札を引くので、引いた札で出した札を取ることもある。
+        """
+        player = self.turn
+        bit = 1 << card
+        if not self.hands[player] & bit:
+            raise ValueError(f"手札にない札です: {CARDS[card].name}")
+        self.hands[player] ^= bit
+        taken = capture(self.field, card, choice)
+        if taken:
+            self.field ^= taken
+            self.captured[player] |= taken | bit
+            self.counts[player] = add_captures(self.counts[player], taken | bit)
+        else:
+            self.field |= bit
+
+        drawn = self.draw()
+        draw_taken = 0
+        if drawn is not None:
+            draw_bit = 1 << drawn
+            draw_taken = capture(self.field, drawn, draw_choice)
+            if draw_taken:
+                self.field ^= draw_taken
+                self.captured[player] |= draw_taken | draw_bit
+                self.counts[player] = add_captures(self.counts[player], draw_taken | draw_bit)
+            else:
+                self.field |= draw_bit
+        self.turn = 3 - player
+        return TurnResult(card, taken, drawn, draw_taken)
+
+
+# ----------------- 配り -----------------
+# 配りの異常（こいこいでは配り直しや手役になる配り）。deal_anomalies はこれらのビットの OR を返す
+FIELD_FOUR = 1  # 場に同じ月が4枚
+HAND_FOUR = 2  # どちらかの手札に同じ月が4枚（手四）
+HAND_PAIRS = 4  # どちらかの手札が同じ月2枚ずつの4組（くっつき）
+ANOMALY_NAMES = {FIELD_FOUR: "場に同じ月4枚", HAND_FOUR: "手四", HAND_PAIRS: "くっつき"}
+
+
+def month_counts(mask: int) -> list[int]:
+    """月ごとの枚数（添字 1〜12）"""
+    return [0] + [(mask & MONTH_MASK[m]).bit_count() for m in range(1, 13)]
+
+
+def deal_anomalies(state: HanafudaState) -> int:
+    flags = 0
+    if 4 in month_counts(state.field):
+        flags |= FIELD_FOUR
+    for hand in state.hands[1:]:
+        counts = month_counts(hand)
+        if 4 in counts:
+            flags |= HAND_FOUR
+        if counts.count(2) == 4:
+            flags |= HAND_PAIRS
+    return flags
+
+
+def deal(rng: Optional[random.Random] = None, redeal: bool = False) -> HanafudaState:
+    """札をシャッフルして、プレイヤーに8枚、相手に8枚、場に8枚配る（残りが山札）
+
+    redeal=True なら、場に同じ月が4枚そろった配りは配り直す。
+    """
+    rng = rng or random
+    while True:
+        order = list(range(N_CARDS))
+        rng.shuffle(order)
+        hand1 = mask_of(order[:HAND_SIZE])
+        hand2 = mask_of(order[HAND_SIZE:HAND_SIZE * 2])
+        field = mask_of(order[HAND_SIZE * 2:HAND_SIZE * 2 + FIELD_SIZE])
+        deck = bytes(order[HAND_SIZE * 2 + FIELD_SIZE:])
+        state = HanafudaState((0, hand1, hand2), field, (0, 0, 0), deck)
+        if not redeal or 4 not in month_counts(field):
+            return state
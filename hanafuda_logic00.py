@@ -89,27 +89,140 @@ class GameState(TypedDict):
     current_turn: int  # 1: プレイヤー, 2: AI
 
 
+# ----------------- 役（こいこい） -----------------
+# 札は ALL_CARDS_DATA の並び順の番号 0〜47、札の集まりはビット i が札 i の 48 ビットマスク（hanafuda_engine00 と同じ）。
+# 役に関わる札の組（GROUPS）ごとにマスクを作っておき、獲得札のマスクとの AND の popcount で枚数を数える。
+# 枚数は組ごとに 5 ビットずつ1つの整数に詰めて持つので、札を1枚獲得するたびに CARD_INCREMENT を
+# 足すだけで更新でき（シミュレーション向け）、点数の計算は役の数だけの整数演算で済む。
+
+
+def _card_mask(predicate) -> int:
+    return sum(1 << i for i, data in enumerate(ALL_CARDS_DATA) if predicate(*data))
+
+
+def _named(*names) -> int:
+    return _card_mask(lambda month, name, type, score: name in names)
+
+
+GROUPS = {
+    "bright": _card_mask(lambda month, name, type, score: type == BRIGHT),
+    "rain": _named("柳に小野道風"),
+    "tane": _card_mask(lambda month, name, type, score: type == ANIMAL),
+    "tan": _card_mask(lambda month, name, type, score: type == RIBBON),
+    "akatan": _named("松に赤短", "梅に赤短", "桜に赤短"),
+    "aotan": _named("牡丹に青短", "菊に青短", "紅葉に青短"),
+    # 菊に盃はタネとカスのどちらにも数える
+    "kasu": _card_mask(lambda month, name, type, score: type == JUNK) | _named("菊に盃"),
+    "inoshikacho": _named("萩に猪", "紅葉に鹿", "牡丹に蝶"),
+    "sake": _named("菊に盃"),
+    "curtain": _named("桜に幕"),
+    "moon": _named("芒に月"),
+}
+GROUP_BITS = 5
+_SHIFT = {g: i * GROUP_BITS for i, g in enumerate(GROUPS)}
+_FIELD = (1 << GROUP_BITS) - 1
+(_S_BRIGHT, _S_RAIN, _S_TANE, _S_TAN, _S_AKATAN, _S_AOTAN, _S_KASU,
+ _S_INOSHIKACHO, _S_SAKE, _S_CURTAIN, _S_MOON) = _SHIFT.values()
+CARD_INCREMENT = tuple(sum(1 << _SHIFT[g] for g, mask in GROUPS.items() if mask >> i & 1)
+                       for i in range(len(ALL_CARDS_DATA)))
+
+
+def yaku_counts(mask: int) -> int:
+    """獲得札のマスクから、組ごとの枚数を詰めた整数を作る（組の数だけ AND + popcount）"""
+    return sum((mask & gmask).bit_count() << _SHIFT[g] for g, gmask in GROUPS.items())
+
+
+def add_captures(counts: int, mask: int) -> int:
+    """獲得した札（マスク）の分だけ枚数を足す"""
+    while mask:
+        low = mask & -mask
+        counts += CARD_INCREMENT[low.bit_length() - 1]
+        mask ^= low
+    return counts
+
+
+def yaku_list(counts: int) -> list[tuple[str, int]]:
+    """成立している役と点数のリスト"""
+    def n(g):
+        return counts >> _SHIFT[g] & _FIELD
+
+    yaku = []
+    bright, rain = n("bright"), n("rain")
+    if bright == 5:
+        yaku.append(("五光", 10))
+    elif bright == 4:
+        yaku.append(("雨四光", 7) if rain else ("四光", 8))
+    elif bright == 3 and not rain:
+        yaku.append(("三光", 5))
+    if n("inoshikacho") == 3:
+        yaku.append(("猪鹿蝶", 5))
+    if n("akatan") == 3:
+        yaku.append(("赤短", 5))
+    if n("aotan") == 3:
+        yaku.append(("青短", 5))
+    if n("sake"):
+        if n("curtain"):
+            yaku.append(("花見酒", 5))
+        if n("moon"):
+            yaku.append(("月見酒", 5))
+    # タネ・タン・カスは規定枚数で 1 点、1枚増えるごとに 1 点
+    if n("tane") >= 5:
+        yaku.append(("タネ", n("tane") - 4))
+    if n("tan") >= 5:
+        yaku.append(("タン", n("tan") - 4))
+    if n("kasu") >= 10:
+        yaku.append(("カス", n("kasu") - 9))
+    return yaku
+
+
+def yaku_score(counts: int) -> int:
+    """成立している役の点数の合計（yaku_list と同じ判定を、リストを作らずに計算する）"""
+    bright = counts >> _S_BRIGHT & _FIELD
+    if bright == 5:
+        score = 10
+    elif bright == 4:
+        score = 7 if counts >> _S_RAIN & _FIELD else 8
+    elif bright == 3 and not counts >> _S_RAIN & _FIELD:
+        score = 5
+    else:
+        score = 0
+    if counts >> _S_INOSHIKACHO & _FIELD == 3:
+        score += 5
+    if counts >> _S_AKATAN & _FIELD == 3:
+        score += 5
+    if counts >> _S_AOTAN & _FIELD == 3:
+        score += 5
+    if counts >> _S_SAKE & _FIELD:
+        score += 5 * ((counts >> _S_CURTAIN & _FIELD) + (counts >> _S_MOON & _FIELD))
+    score += max(0, (counts >> _S_TANE & _FIELD) - 4)
+    score += max(0, (counts >> _S_TAN & _FIELD) - 4)
+    score += max(0, (counts >> _S_KASU & _FIELD) - 9)
+    return score
+
+
 # ----------------- ルール関連 -----------------
 
 class HanafudaRule:
-    """花札のルール関連のロジック（簡易版）"""
+    """花札のルール関連のロジック"""
 
     @staticmethod
     def calculate_score(collected_cards: List[Card]) -> tuple[int, dict]:
-        """獲得札から点数と役を計算する (簡易計算: 札の単体点のみ合計)"""
-        total_score = sum(card.score for card in collected_cards)
+        """獲得札から役の点数の合計と、種類別の枚数を計算する"""
+        counts = yaku_counts(sum(1 << (card.id - 1) for card in collected_cards))
+        total_score = yaku_score(counts)
 
-        # 役のカウント（詳細な役計算は省略し、種類別枚数のみ提供）
-        counts = {BRIGHT: 0, ANIMAL: 0, RIBBON: 0, JUNK: 0}
+        # 種類別の枚数
+        type_counts = {BRIGHT: 0, ANIMAL: 0, RIBBON: 0, JUNK: 0}
         for card in collected_cards:
-            if card.type in counts:
-                counts[card.type] += 1
+            if card.type in type_counts:
+                type_counts[card.type] += 1
 
-        # カス札10枚以上を5点とする役の簡易適用
-        if counts[JUNK] >= 10:
-            total_score += 5  # 簡易的な点数加算
+        return total_score, type_counts
 
-        return total_score, counts
+    @staticmethod
+    def yaku(collected_cards: List[Card]) -> list[tuple[str, int]]:
+        """獲得札で成立している役と点数のリスト"""
+        return yaku_list(yaku_counts(sum(1 << (card.id - 1) for card in collected_cards)))
 
 
 def initialize_game() -> GameState:
@@ -0,0 +1,177 @@
+import argparse
+import os
+import random
+import time
+from collections import Counter
+from multiprocessing import Pool
+
+from hanafuda_engine00 import deal, deal_anomalies, iter_cards, ANOMALY_NAMES
+from hanafuda_ai00 import HanafudaAI, playout_move
+
+# ----------------- 花札の高速シミュレーター -----------------
+# Streamlit を使わずに、hanafuda_engine00 のルールだけで対局を最後まで打つ。
+# 対局 i は seed と i から決まる乱数で配り・打つので、同じ引数なら何度でも同じ結果になる。
+# 対局はまとめて（chunk 局ずつ）プロセスに渡し、各プロセスは集計済みの Counter だけを返す。
+#
+# 方針の指定
+#   "greedy"  : 取れる札の点が一番大きい手（hanafuda_ai00.playout_move）
+#   "random"  : 手札からランダム
+#   "mc:回数" : hanafuda_ai00 の確定化モンテカルロ（1プロセスで、1手ごとに決まった回数だけ確定化する）
+# どの方針も時間では打ち切らないので、結果は機械の速さにもよらない。
+
+
+def make_policy(spec: str):
+    """方針の指定文字列から (state, rng) → (札, 取る場札) の関数を作る"""
+    name, *params = spec.split(":")
+    if name == "greedy":
+        return lambda state, rng: (playout_move(state, rng), None)
+    if name == "random":
+        return lambda state, rng: (rng.choice(list(iter_cards(state.hands[state.turn]))), None)
+    if name == "mc":
+        ai = HanafudaAI(samples=int(params[0]) if params else 100)
+
+        def mc_policy(state, rng):
+            ai.rng = rng
+            decision = ai.choose(state, state.turn)
+            return decision.card, decision.choice
+        return mc_policy
+    raise ValueError(f"未知の方針: {spec}")
+
+
+def play_game(game_id: int, seed: int, policies, redeal: bool = False):
+    """1局を最後まで打って (状態, 配りの異常) を返す。先手は対局ごとに入れ替える"""
+    rng = random.Random(seed * 1_000_003 + game_id)
+    state = deal(rng, redeal)
+    anomalies = deal_anomalies(state)
+    state.turn = 1 + game_id % 2
+    while not state.game_over:
+        card, choice = policies[state.turn](state, rng)
+        state.play_turn(card, choice)
+    return state, anomalies
+
+
+def new_stats():
+    return {
+        "games": 0,
+        "wins": Counter(),  # 1, 2, 0（引き分け）
+        "score": (None, Counter(), Counter()),  # 点数の分布
+        "diff": Counter(),  # 点差（1 − 2）の分布
+        "captured": (None, Counter(), Counter()),  # 獲得枚数の分布
+        "yaku": (None, Counter(), Counter()),  # 役が成立した局数
+        "anomalies": Counter(),
+    }
+
+
+def add_game(stats, state, anomalies):
+    stats["games"] += 1
+    s1, s2 = state.score(1), state.score(2)
+    stats["wins"][1 if s1 > s2 else 2 if s2 > s1 else 0] += 1
+    stats["diff"][s1 - s2] += 1
+    for player in (1, 2):
+        stats["score"][player][state.score(player)] += 1
+        stats["captured"][player][state.captured[player].bit_count()] += 1
+        stats["yaku"][player].update(name for name, _ in state.yaku(player))
+    for flag, name in ANOMALY_NAMES.items():
+        if anomalies & flag:
+            stats["anomalies"][name] += 1
+
+
+def merge_stats(total, part):
+    total["games"] += part["games"]
+    for key in ("wins", "diff", "anomalies"):
+        total[key].update(part[key])
+    for key in ("score", "captured", "yaku"):
+        for player in (1, 2):
+            total[key][player].update(part[key][player])
+
+
+_policies = {}
+
+
+def _init_worker(spec1, spec2):
+    _policies[1] = make_policy(spec1)
+    _policies[2] = make_policy(spec2)
+
+
+def _play_chunk(args):
+    start, end, seed, redeal = args
+    stats = new_stats()
+    policies = (None, _policies[1], _policies[2])
+    for game_id in range(start, end):
+        add_game(stats, *play_game(game_id, seed, policies, redeal))
+    return stats
+
+
+# ----------------- 集計の表示 -----------------
+
+def _mean(hist: Counter) -> float:
+    n = sum(hist.values())
+    return sum(v * c for v, c in hist.items()) / n if n else 0.0
+
+
+def _percentiles(hist: Counter, qs=(0.1, 0.5, 0.9)) -> list:
+    """hist の分位点（1件もなければすべて None）"""
+    n = sum(hist.values())
+    if n == 0:
+        return [None] * len(qs)
+    items = iter(sorted(hist.items()))
+    value, seen = next(items)
+    result = []
+    for q in qs:
+        while seen < q * n:
+            value, count = next(items)
+            seen += count
+        result.append(value)
+    return result
+
+
+def format_stats(spec1, spec2, stats, elapsed) -> str:
+    n = stats["games"]
+    if n == 0:
+        return f"{spec1} vs {spec2}: 0 games"
+    wins = stats["wins"]
+    lines = [
+        f"{spec1} vs {spec2}: {n:,} games  {n / elapsed:,.0f} games/s",
+        f"  勝ち {wins[1] / n:.3f} / 負け {wins[2] / n:.3f} / 引き分け {wins[0] / n:.3f}"
+        f"  点差の平均 {_mean(stats['diff']):+.2f}",
+    ]
+    for player, spec in ((1, spec1), (2, spec2)):
+        p10, p50, p90 = _percentiles(stats["score"][player])
+        c10, c50, c90 = _percentiles(stats["captured"][player])
+        lines.append(f"  [{spec}] 点数 平均 {_mean(stats['score'][player]):.2f} (10/50/90% {p10}/{p50}/{p90})"
+                     f"  獲得枚数 平均 {_mean(stats['captured'][player]):.1f} (10/50/90% {c10}/{c50}/{c90})")
+        yaku = stats["yaku"][player]
+        lines.append("      役: " + "  ".join(f"{name} {count / n:.3f}" for name, count in yaku.most_common()))
+    lines.append("  配りの異常: " + "  ".join(
+        f"{name} {stats['anomalies'][name] / n:.4f}" for name in ANOMALY_NAMES.values()))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="花札（こいこい）の対局を Streamlit なしで大量に打って統計を出す")
+    parser.add_argument("policy1", nargs="?", default="greedy", help='例: "greedy", "random", "mc:50"')
+    parser.add_argument("policy2", nargs="?", default="greedy")
+    parser.add_argument("--games", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk", type=int, default=2000, help="1回にプロセスへ渡す対局数")
+    parser.add_argument("--redeal", action="store_true", help="場に同じ月が4枚そろった配りは配り直す")
+    parser.add_argument("--report-every", type=float, default=10.0, help="途中経過を表示する間隔（秒）")
+    args = parser.parse_args()
+
+    tasks = [(start, min(start + args.chunk, args.games), args.seed, args.redeal)
+             for start in range(0, args.games, args.chunk)]
+    stats = new_stats()
+    t0 = last = time.perf_counter()
+    with Pool(args.workers, _init_worker, (args.policy1, args.policy2)) as pool:
+        for part in pool.imap_unordered(_play_chunk, tasks):
+            merge_stats(stats, part)
+            now = time.perf_counter()
+            if now - last >= args.report_every and stats["games"] < args.games:
+                last = now
+                print(f"  {stats['games']:,}/{args.games:,} games  {stats['games'] / (now - t0):,.0f} games/s")
+    print(format_stats(args.policy1, args.policy2, stats, time.perf_counter() - t0))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+import argparse
+import time
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+# ----------------- m×n 盤の k 目並べ -----------------
+# 盤面は行 * n + 列 の番号で引く bytearray（0: 空き, 1: 先手 X, 2: 後手 O）。
+# 盤上の「長さ k の並び」（窓）を全部番号付けしておき、窓ごとの各プレイヤーの石数を持つ。
+# 石を置く・取り除くたびにそのマスを通る窓（高々 4k 個）の数だけを更新するので、
+# 勝ちの判定（石数が k の窓ができたか）も評価値も、最後の手の周りを見るだけで済む。
+# 探索で毎回使う「空きマス」「候補手（石の近くの空きマス）」「片方の石だけが c 個ある窓」も集合で持ち、
+# 同じく置く・戻すたびにそのマスの周りだけを更新する（盤全体を走査しない）。
+
+EMPTY, X, O = 0, 1, 2
+DRAW = 3
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))  # 横・縦・右下がり・左下がり
+WIN_SCORE = 1_000_000
+NEAR = 2  # 候補手は既にある石からこの距離以内の空きマス
+
+
+@lru_cache(maxsize=None)
+def _geometry(m: int, n: int, k: int):
+    """(窓ごとのマス番号のタプル, マスごとの窓番号のタプル, マスごとの近傍マス) を返す"""
+    windows = []
+    for r in range(m):
+        for c in range(n):
+            for dr, dc in DIRECTIONS:
+                er, ec = r + dr * (k - 1), c + dc * (k - 1)
+                if 0 <= er < m and 0 <= ec < n:
+                    windows.append(tuple((r + dr * i) * n + c + dc * i for i in range(k)))
+    cell_windows = [[] for _ in range(m * n)]
+    for w, cells in enumerate(windows):
+        for sq in cells:
+            cell_windows[sq].append(w)
+    neighbors = []
+    for r in range(m):
+        for c in range(n):
+            neighbors.append(tuple(rr * n + cc
+                                   for rr in range(max(0, r - NEAR), min(m, r + NEAR + 1))
+                                   for cc in range(max(0, c - NEAR), min(n, c + NEAR + 1))
+                                   if (rr, cc) != (r, c)))
+    return tuple(windows), tuple(tuple(ws) for ws in cell_windows), tuple(neighbors)
+
+
+def _weights(k: int) -> list[int]:
+    """相手の石がない窓に自分の石が c 個あるときの価値（c = k は勝ち）"""
+    return [0] + [8 ** (c - 1) for c in range(1, k)] + [WIN_SCORE]
+
+
+class MNKBoard:
+    """m 行 n 列の盤で k 個並べたら勝ち（五目並べなら MNKBoard(15, 15, 5)）
+
+    score: 先手から見た評価値（相手の石がない窓ごとの価値の合計）。置く・戻すたびに差分で更新する
+    """
+
+    def __init__(self, m: int = 3, n: int = 3, k: int = 3):
+        self.m, self.n, self.k = m, n, k
+        self.windows, self.cell_windows, self.neighbors = _geometry(m, n, k)
+        self.weights = _weights(k)
+        self.cells = bytearray(m * n)
+        self.counts = (None, [0] * len(self.windows), [0] * len(self.windows))  # counts[プレイヤー][窓]
+        self.near = [0] * (m * n)  # 近くにある石の数（候補手の絞り込み用）
+        self.empty = set(range(m * n))  # 空きマス
+        self.frontier: set[int] = set()  # 近くに石がある空きマス（候補手）
+        # open_windows[プレイヤー][c]: そのプレイヤーの石が c 個（1 以上）あり、相手の石がない窓
+        self.open_windows = (None, [set() for _ in range(k + 1)], [set() for _ in range(k + 1)])
+        self.history: list[int] = []
+        self.score = 0
+        self.winner = EMPTY
+
+    @property
+    def to_move(self) -> int:
+        return X if len(self.history) % 2 == 0 else O
+
+    def _count(self, sq: int, player: int, delta: int) -> bool:
+        """sq を通る窓の player の石数を delta（1: 置く, -1: 取り除く）変え、評価値と open_windows を差分で更新する
+
+        player の石だけが k 個の窓ができたら True を返す。
+        """
+        c1, c2 = self.counts[X], self.counts[O]
+        mine = self.counts[player]
+        open_x, open_o = self.open_windows[X], self.open_windows[O]
+        weights, k = self.weights, self.k
+        score = self.score
+        completed = False
+        for w in self.cell_windows[sq]:
+            # 変える前の窓の分を取り除く（相手の石がない窓だけが評価値と open_windows に入っている）
+            a, b = c1[w], c2[w]
+            if b == 0:
+                score -= weights[a]
+                if a:
+                    open_x[a].discard(w)
+            elif a == 0:
+                score += weights[b]
+                open_o[b].discard(w)
+            mine[w] += delta
+            a, b = c1[w], c2[w]
+            if b == 0:
+                score += weights[a]
+                if a:
+                    open_x[a].add(w)
+                    completed |= a == k
+            elif a == 0:
+                score -= weights[b]
+                open_o[b].add(w)
+                completed |= b == k
+        self.score = score
+        return completed
+
+    def play(self, sq: int) -> int:
+        """手番の石を sq に置き、勝者（まだなら EMPTY、引き分けなら DRAW）を返す"""
+        player = self.to_move
+        self.cells[sq] = player
+        won = self._count(sq, player, 1)
+        self.empty.discard(sq)
+        self.frontier.discard(sq)
+        cells, near, frontier = self.cells, self.near, self.frontier
+        for nb in self.neighbors[sq]:
+            near[nb] += 1
+            if cells[nb] == EMPTY:
+                frontier.add(nb)
+        self.history.append(sq)
+        if won:
+            self.winner = player
+        elif len(self.history) == self.m * self.n:
+            self.winner = DRAW
+        return self.winner
+
+    def undo(self):
+        """最後の手を取り消す"""
+        sq = self.history.pop()
+        player = self.cells[sq]
+        self.cells[sq] = EMPTY
+        self._count(sq, player, -1)
+        near, frontier = self.near, self.frontier
+        for nb in self.neighbors[sq]:
+            near[nb] -= 1
+            if not near[nb]:
+                frontier.discard(nb)
+        self.empty.add(sq)
+        if near[sq]:
+            frontier.add(sq)
+        self.winner = EMPTY
+
+    def legal_moves(self) -> list[int]:
+        return sorted(self.empty)
+
+    def candidates(self) -> list[int]:
+        """既にある石の近くの空きマス（まだ石がなければ中央）"""
+        if not self.history:
+            return [(self.m // 2) * self.n + self.n // 2]
+        return sorted(self.frontier)
+
+    def threats(self, player: int, stones: int) -> set[int]:
+        """player の石が stones 個あり相手の石がない窓の、空きマス（stones = k - 1 なら次に打てば勝つマス）"""
+        if stones <= 0:
+            # 石のない窓は集合で持っていないので、空きマスがある窓を全部調べる
+            mine, theirs = self.counts[player], self.counts[3 - player]
+            windows = (w for w in range(len(self.windows)) if mine[w] == 0 and theirs[w] == 0)
+        else:
+            windows = self.open_windows[player][stones]
+        cells = self.cells
+        found = set()
+        for w in windows:
+            found.update(sq for sq in self.windows[w] if cells[sq] == EMPTY)
+        return found
+
+    def move_value(self, sq: int, player: int) -> int:
+        """sq に打つ手の良さの目安（自分の窓が伸びる分 + 相手の窓を潰す分）"""
+        mine, theirs = self.counts[player], self.counts[3 - player]
+        value = 0
+        for w in self.cell_windows[sq]:
+            if theirs[w] == 0:
+                value += self.weights[mine[w] + 1] - self.weights[mine[w]]
+            elif mine[w] == 0:
+                value += self.weights[theirs[w]]
+        return value
+
+    def __str__(self):
+        marks = ".XO"
+        return "\n".join(" ".join(marks[self.cells[r * self.n + c]] for c in range(self.n)) for r in range(self.m))
+
+
+# ----------------- 探索 -----------------
+# 1. 打てば勝つ手があれば打つ。相手に打てば勝つ手があれば、そこを塞ぐ手だけを読む
+# 2. 脅威空間探索（VCF）: 「あと1手で勝ち」を作り続ける手順だけを読み、相手に受けを強いて勝てるか調べる
+# 3. それ以外は候補手を良さそうな順に max_candidates 手まで絞った反復深化アルファベータ
+
+
+class MNKResult(NamedTuple):
+    move: Optional[int]  # 最善手のマス番号（打てる手がなければ None）
+    score: int  # 手番側から見た評価値
+    depth: int  # 読み切った深さ（VCF で勝ちを見つけたら -1）
+    nodes: int  # 探索したノード数
+
+
+class _Timeout(Exception):
+    pass
+
+
+class MNKSearcher:
+    """m,n,k ゲームの AI
+
+    depth: 最大の読みの深さ / time_limit: 1手あたりの思考時間（秒）
+    max_candidates: 1つの局面で読む候補手の数 / vcf_depth: 脅威空間探索で読む自分の手数
+    """
+
+    CHECK_INTERVAL = 256
+
+    def __init__(self, depth: int = 8, time_limit: Optional[float] = 1.0, max_candidates: int = 12,
+                 vcf_depth: int = 8):
+        self.depth = depth
+        self.time_limit = time_limit
+        self.max_candidates = max_candidates
+        self.vcf_depth = vcf_depth
+        self.nodes = 0
+        self.deadline = None
+
+    def search(self, board: MNKBoard) -> MNKResult:
+        self.nodes = 0
+        self.deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+        if board.winner != EMPTY:
+            return MNKResult(None, 0, 0, 0)
+        player = board.to_move
+        wins = board.threats(player, board.k - 1)
+        if wins:
+            return MNKResult(min(wins), WIN_SCORE, 1, 0)
+        blocks = board.threats(3 - player, board.k - 1)
+        if len(blocks) == 1:
+            return MNKResult(blocks.pop(), 0, 1, 0)
+        if not blocks:
+            try:
+                move = self._vcf(board, player, self.vcf_depth)
+            except _Timeout:
+                move = None
+            if move is not None:
+                return MNKResult(move, WIN_SCORE, -1, self.nodes)
+
+        moves = self._ordered(board, player)
+        best = MNKResult(moves[0], 0, 0, self.nodes)
+        for depth in range(1, self.depth + 1):
+            try:
+                move, score = self._root(board, moves, depth)
+            except _Timeout:
+                break
+            best = MNKResult(move, score, depth, self.nodes)
+            moves.remove(move)
+            moves.insert(0, move)
+            if abs(score) >= WIN_SCORE // 2:
+                break  # 勝敗が読み切れた
+        return best._replace(nodes=self.nodes)
+
+    def _tick(self):
+        self.nodes += 1
+        if self.nodes % self.CHECK_INTERVAL == 0 and self.deadline is not None \
+                and time.perf_counter() > self.deadline:
+            raise _Timeout
+
+    def _ordered(self, board, player):
+        """読む候補手を良さそうな順に max_candidates 手まで返す（相手の勝ち筋があれば塞ぐ手だけ）"""
+        blocks = board.threats(3 - player, board.k - 1)
+        moves = list(blocks) if blocks else board.candidates()
+        moves.sort(key=lambda sq: -board.move_value(sq, player))
+        return moves[:self.max_candidates]
+
+    def _root(self, board, moves, depth):
+        alpha, beta = -WIN_SCORE * 2, WIN_SCORE * 2
+        best_move = moves[0]
+        for sq in moves:
+            board.play(sq)
+            try:
+                score = -self._negamax(board, depth - 1, -beta, -alpha)
+            finally:
+                board.undo()
+            if score > alpha:
+                alpha = score
+                best_move = sq
+        return best_move, alpha
+
+    def _negamax(self, board, depth, alpha, beta):
+        self._tick()
+        if board.winner == DRAW:
+            return 0
+        if board.winner != EMPTY:
+            # 直前に打った側の勝ち。早く勝つ（遅く負ける）ほうを選ぶように手数で差を付ける
+            return -WIN_SCORE + len(board.history)
+        player = board.to_move
+        if board.threats(player, board.k - 1):
+            return WIN_SCORE - len(board.history) - 1
+        if depth <= 0:
+            return board.score if player == X else -board.score
+        for sq in self._ordered(board, player):
+            board.play(sq)
+            try:
+                score = -self._negamax(board, depth - 1, -beta, -alpha)
+            finally:
+                board.undo()
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+        return alpha
+
+    def _vcf(self, board, player, depth) -> Optional[int]:
+        """「あと1手で勝ち」を作る手を続けて勝てるなら、その最初の手を返す（相手の受けは1通りに決まる）"""
+        if depth <= 0 or board.threats(3 - player, board.k - 1):
+            return None  # 相手の受けが「あと1手で勝ち」を作ったら、こちらが受けに回る
+        for sq in board.threats(player, board.k - 2):
+            self._tick()
+            board.play(sq)
+            try:
+                if board.winner == player:
+                    return sq
+                fours = board.threats(player, board.k - 1)
+                if len(fours) >= 2:
+                    return sq  # 2か所は同時に塞げない
+                if len(fours) == 1 and not board.threats(3 - player, board.k - 1):
+                    # 相手は塞ぐしかない（相手に勝ち筋があれば読まない）
+                    board.play(fours.pop())
+                    try:
+                        if board.winner == EMPTY and self._vcf(board, player, depth - 1) is not None:
+                            return sq
+                    finally:
+                        board.undo()
+            finally:
+                board.undo()
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="m,n,k ゲームで AI 同士を対局させ、1手ごとの思考時間を表示する")
+    parser.add_argument("--size", type=int, nargs=2, default=[15, 15], metavar=("M", "N"))
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--time", type=float, default=1.0, help="1手あたりの思考時間（秒）")
+    parser.add_argument("--candidates", type=int, default=12)
+    args = parser.parse_args()
+
+    board = MNKBoard(args.size[0], args.size[1], args.k)
+    searcher = MNKSearcher(time_limit=args.time, max_candidates=args.candidates)
+    while board.winner == EMPTY:
+        t0 = time.perf_counter()
+        result = searcher.search(board)
+        sec = time.perf_counter() - t0
+        r, c = divmod(result.move, board.n)
+        print(f"{len(board.history) + 1:>3}. {'.XO'[board.to_move]} ({r:>2}, {c:>2})  depth {result.depth:>2}  "
+              f"score {result.score:>8}  {result.nodes:>7} nodes  {sec:.2f}s")
+        board.play(result.move)
+    print(board)
+    print({X: "X の勝ち", O: "O の勝ち", DRAW: "引き分け"}[board.winner])
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,18 @@
+import multiprocessing
+import os
+import time
+
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.patches import Ellipse
+
+# 合法手の生成と石の反転はビットボード実装を使う（board[y, x] 形式）
+from reversi_logic00 import place_stone_yx as place_stone, iter_bits
+from reversi_ai00 import TranspositionTable, best_move
+from reversi_book00 import open_book
+from reversi_pattern00 import load_evaluator
+from reversi_cache00 import PositionCache, board_bitboards
+from reversi_mcts00 import MCTS, mcts_move
 
 EMPTY, BLACK, WHITE = 0, 1, -1
 SIZE = 8
@@ -9,96 +22,149 @@ board[3, 3], board[4, 4] = WHITE, WHITE
 board[3, 4], board[4, 3] = BLACK, BLACK
 
 turn = BLACK
-dirs = [(dx, dy) for dx in [-1, 0, 1] for dy in [-1, 0, 1] if not (dx == 0 and dy == 0)]
 
-def inside(x, y):
-    return 0 <= x < SIZE and 0 <= y < SIZE
+# AIの強さ（読みの深さ、1手あたりの思考時間[秒]、終盤完全読みに切り替える空きマス数）
+AI_DEPTH = 8
+AI_TIME_LIMIT = 1.0
+AI_ENDGAME_EMPTIES = 12
+# AI の種類（"alphabeta": 読みの深さで探索, "mcts": モンテカルロ木探索）
+AI_ENGINE = "alphabeta"
+AI_MCTS_TIME_MS = 1000
+# MCTS を並列に回すプロセス数。このスクリプトには main ガードがない（spawn だと子プロセスが盤面の画面を開く）ので、
+# fork が使える環境だけ fork を明示して並列にする（既定の起動方法は決めない・変えない）
+AI_MCTS_CONTEXT = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+AI_MCTS_WORKERS = os.cpu_count() if AI_MCTS_CONTEXT is not None else 1
+tt = TranspositionTable()
+book = open_book()  # 定石ファイル（なければ None）
+evaluator = load_evaluator()  # パターン評価の重み（なければ従来の評価関数）
+cache = PositionCache()  # 合法手と AI の手の局面キャッシュ（対称な局面も共有する）
+mcts = None
+if AI_ENGINE == "mcts":
+    # プロセスは GUI を作る前に fork しておく（描画のスレッドや接続を子プロセスに持ち込まない）
+    mcts = MCTS(playouts=None, time_ms=AI_MCTS_TIME_MS, workers=AI_MCTS_WORKERS, context=AI_MCTS_CONTEXT).start()
 
 def valid_moves(board, color):
-    moves = []
-    for y in range(SIZE):
-        for x in range(SIZE):
-            if board[y, x] != EMPTY:
-                continue
-            for dx, dy in dirs:
-                nx, ny = x + dx, y + dy
-                found = False
-                while inside(nx, ny) and board[ny, nx] == -color:
-                    found = True
-                    nx += dx
-                    ny += dy
-                if found and inside(nx, ny) and board[ny, nx] == color:
-                    moves.append((x, y))
-                    break
-    return moves
-
-def place_stone(board, x, y, color):
-    board[y, x] = color
-    for dx, dy in dirs:
-        nx, ny = x + dx, y + dy
-        flips = []
-        while inside(nx, ny) and board[ny, nx] == -color:
-            flips.append((nx, ny))
-            nx += dx
-            ny += dy
-        if inside(nx, ny) and board[ny, nx] == color:
-            for fx, fy in flips:
-                board[fy, fx] = color
+    black, white = board_bitboards(board)
+    moves = cache.legal_moves(black, white, color == WHITE)
+    return [(sq % SIZE, sq // SIZE) for sq in iter_bits(moves)]
 
 def ai_move(board, color):
-    moves = valid_moves(board, color)
-    if not moves:
+    black, white = board_bitboards(board)
+    if mcts is not None:
+        search = lambda: mcts_move(board, color, mcts)
+    else:
+        search = lambda: best_move(board, color, AI_DEPTH, AI_TIME_LIMIT, tt, book, AI_ENDGAME_EMPTIES, evaluator)
+    sq = cache.best_move(black, white, color == WHITE, search, AI_ENGINE)
+    if sq is None:
         return None
-    best = None
-    max_flips = -1
-    for (x, y) in moves:
-        temp = board.copy()
-        place_stone(temp, x, y, color)
-        flips = np.sum(temp == color) - np.sum(board == color)
-        if flips > max_flips:
-            max_flips = flips
-            best = (x, y)
-    return best
+    return sq % SIZE, sq // SIZE
+
+# --- 盤面の描画 ---
+# 升目と 64 個の石は最初に1度だけ作り、以後は変わったマスの石の色と表示だけを変える。
+# 石は animated にして通常の描画から外し、升目だけを描いた背景に石を重ねて blit する。
+DISC_SIZE = 0.8
+FLIP_FRAMES = 8  # 石が裏返るアニメーションのコマ数
+FRAME_SEC = 0.02
+
+class BoardView:
+    """matplotlib の盤面。update(board) で前回の表示との差分だけを描き直す"""
+
+    def __init__(self, ax):
+        self.ax = ax
+        self.canvas = ax.figure.canvas
+        self.blit = self.canvas.supports_blit
+        self.background = None
+
+        ax.set_xticks(range(SIZE + 1))
+        ax.set_yticks(range(SIZE + 1))
+        ax.grid(True, color='black', linewidth=1)
+
+        # 緑背景
+        ax.set_facecolor('#2e7d32')
+
+        # 茶系木目風盤面
+        brown_base = np.array([0.55, 0.42, 0.27])
+        for i in range(SIZE):
+            for j in range(SIZE):
+                variation = ((i+j)%2) * 0.05
+                color = np.clip(brown_base + variation, 0, 1)
+                ax.add_patch(plt.Rectangle((i, j), 1, 1, color=color, zorder=0))
+
+        # 石（board[y, x] と同じ並び）。裏返すときに幅を変えるので円ではなく楕円にする
+        self.discs = np.empty((SIZE, SIZE), dtype=object)
+        for y in range(SIZE):
+            for x in range(SIZE):
+                disc = Ellipse((x + 0.5, SIZE - y - 0.5), DISC_SIZE, DISC_SIZE, edgecolor='black',
+                               linewidth=1, zorder=3, visible=False, animated=self.blit)
+                ax.add_patch(disc)
+                self.discs[y, x] = disc
+        self.shown = np.zeros((SIZE, SIZE), dtype=int)
+
+        ax.set_xlim(0, SIZE)
+        ax.set_ylim(0, SIZE)
+        ax.set_aspect('equal')
+        ax.set_title("黒：あなた　白：コンピュータ")
+        # ウィンドウの大きさが変わるなどして全体を描き直したときは、背景を取り直して石を重ね直す
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, event):
+        if self.blit:
+            self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+            self._draw_discs()
+
+    def _draw_discs(self):
+        for disc in self.discs[self.shown != EMPTY]:
+            self.ax.draw_artist(disc)
+
+    def _show(self):
+        """背景の上に石を重ねて、盤の範囲だけを画面に送る"""
+        if not self.blit or self.background is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self._draw_discs()
+        self.canvas.blit(self.ax.bbox)
+        self.canvas.flush_events()
+
+    @staticmethod
+    def _paint(disc, color):
+        disc.set_facecolor('black' if color == BLACK else 'white')
+        disc.set_visible(color != EMPTY)
+
+    def update(self, board, animate=True):
+        """board と今の表示の違うマスだけを描き直す（裏返った石はアニメーションさせる）"""
+        placed = (self.shown == EMPTY) & (board != EMPTY)
+        flipped = (self.shown != EMPTY) & (board != EMPTY) & (board != self.shown)
+        removed = (self.shown != EMPTY) & (board == EMPTY)
+        if not (placed | flipped | removed).any():
+            return
+        for disc, color in zip(self.discs[placed | removed], board[placed | removed]):
+            self._paint(disc, color)
+        if animate and flipped.any():
+            discs = self.discs[flipped]
+            colors = board[flipped]
+            self.shown = np.where(placed | removed, board, self.shown)
+            for frame in range(1, FLIP_FRAMES + 1):
+                # 幅を 1 → 0 → 1 と変え、細くなりきったところで色を変える
+                width = DISC_SIZE * abs(np.cos(np.pi * frame / FLIP_FRAMES))
+                for disc, color in zip(discs, colors):
+                    disc.set_width(width)
+                    if frame == FLIP_FRAMES // 2:
+                        self._paint(disc, color)
+                self._show()
+                if frame < FLIP_FRAMES:
+                    time.sleep(FRAME_SEC)
+        else:
+            for disc, color in zip(self.discs[flipped], board[flipped]):
+                self._paint(disc, color)
+        self.shown = board.copy()
+        self._show()
 
 fig, ax = plt.subplots()
+view = BoardView(ax)
 
 def draw_board():
-    ax.clear()
-    ax.set_xticks(range(SIZE + 1))
-    ax.set_yticks(range(SIZE + 1))
-    ax.grid(True, color='black', linewidth=1)
-
-    # 緑背景
-    ax.set_facecolor('#2e7d32')
-
-    # 茶系木目風盤面
-    brown_base = np.array([0.55, 0.42, 0.27])
-    for i in range(SIZE):
-        for j in range(SIZE):
-            variation = ((i+j)%2) * 0.05
-            color = np.clip(brown_base + variation, 0, 1)
-            ax.add_patch(plt.Rectangle((i, j), 1, 1, color=color, zorder=0))
-
-    # 黒石
-    for y in range(SIZE):
-        for x in range(SIZE):
-            if board[y, x] == BLACK:
-                c = plt.Circle((x + 0.5, SIZE - y - 0.5), 0.4,
-                               facecolor='black', edgecolor='black', zorder=3)
-                ax.add_patch(c)
-    # 白石
-    for y in range(SIZE):
-        for x in range(SIZE):
-            if board[y, x] == WHITE:
-                c = plt.Circle((x + 0.5, SIZE - y - 0.5), 0.4,
-                               facecolor='white', edgecolor='black', linewidth=1, zorder=4)
-                ax.add_patch(c)
-
-    ax.set_xlim(0, SIZE)
-    ax.set_ylim(0, SIZE)
-    ax.set_aspect('equal')
-    ax.set_title("黒：あなた　白：コンピュータ")
-    plt.draw()
+    view.update(board)
 
 def onclick(event):
     global turn
@@ -111,7 +177,7 @@ def onclick(event):
         place_stone(board, x, y, turn)
         turn *= -1
         draw_board()
-        plt.pause(0.5)
+        fig.canvas.start_event_loop(0.5)  # plt.pause と違い全体を描き直さない
         ai_turn()
 
 def ai_turn():
@@ -126,3 +192,5 @@ def ai_turn():
 draw_board()
 fig.canvas.mpl_connect("button_press_event", onclick)
 plt.show()
+if mcts is not None:
+    mcts.close()
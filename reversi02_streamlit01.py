@@ -1,6 +1,15 @@
 import streamlit as st
 import numpy as np
-import random
+
+# 合法手の生成と石の反転はビットボード実装を使う（board[x, y] 形式）
+from reversi_logic00 import place_stone_xy as place_stone, symmetry_square, iter_bits, to_bitboards
+from reversi_ai00 import TranspositionTable, WIN_SCORE
+from reversi_book00 import open_book
+from reversi_pattern00 import load_evaluator
+from reversi_worker00 import AIWorker, Ponderer
+from reversi_record00 import append_game
+from reversi_cache00 import PositionCache, board_bitboards
+from reversi_hint00 import hint_pool, move_scores
 
 # --- ゲームロジック ---
 def init_board():
@@ -9,52 +18,90 @@ def init_board():
     board[3,4] = board[4,3] = -1
     return board
 
-DIRECTIONS = [(-1,-1), (-1,0), (-1,1), (0,-1), (0,1), (1,-1), (1,0), (1,1)]
+# AIの強さ: (読みの深さ, 1手あたりの思考時間[秒], 終盤完全読みに切り替える空きマス数)
+# 思考時間で打ち切るので、深く読む設定でも再実行が止まったままにならない
+LEVELS = {"よわい": (1, 0.1, 0), "ふつう": (4, 0.5, 8), "つよい": (12, 1.5, 12)}
+
+# ヒント表示: 合法手ごとの読みの深さの上限と、計算にかけてよい時間[秒]（足りなければ浅い読みで表示する）
+HINT_DEPTH = 6
+HINT_BUDGET = 1.0
+
+@st.cache_resource
+def get_book():
+    """定石ファイルをメモリマップで開く（全セッションで共有、なければ None）"""
+    return open_book()
+
+@st.cache_resource
+def get_evaluator():
+    """パターン評価の重みを読み込む（全セッションで共有、なければ None）"""
+    return load_evaluator()
+
+@st.cache_resource
+def get_cache():
+    """合法手と AI の手の局面キャッシュ（全セッションで共有、対称な局面も同じ項目になる）"""
+    return PositionCache()
+
+@st.cache_resource(on_release=lambda executor: executor.shutdown(cancel_futures=True))
+def get_hint_pool():
+    """ヒントの計算に使うプロセスプール（全セッションで共有、キャッシュから外れたら止める）"""
+    return hint_pool()
 
 def valid_moves(board, player):
-    moves = []
-    for x in range(8):
-        for y in range(8):
-            if board[x,y] != 0:
-                continue
-            for dx,dy in DIRECTIONS:
-                nx,ny = x+dx,y+dy
-                found_opponent = False
-                while 0<=nx<8 and 0<=ny<8:
-                    if board[nx,ny] == -player:
-                        found_opponent = True
-                    elif board[nx,ny] == player and found_opponent:
-                        moves.append((x,y))
-                        break
-                    else:
-                        break
-                    nx += dx
-                    ny += dy
-    return list(set(moves))
-
-def place_stone(board, x, y, player):
-    board[x,y] = player
-    for dx,dy in DIRECTIONS:
-        nx,ny = x+dx, y+dy
-        stones_to_flip = []
-        while 0<=nx<8 and 0<=ny<8:
-            if board[nx,ny] == -player:
-                stones_to_flip.append((nx,ny))
-            elif board[nx,ny] == player:
-                for fx,fy in stones_to_flip:
-                    board[fx,fy] = player
-                break
-            else:
-                break
-            nx += dx
-            ny += dy
-    return board
+    black, white = board_bitboards(board)
+    moves = get_cache().legal_moves(black, white, player == -1)
+    return [divmod(sq, 8) for sq in iter_bits(moves)]
+
+def cached_ai_move(board, level="ふつう"):
+    """同じ強さで前に考えたことのある局面なら、その AI の手 (x, y) を返す（なければ None）"""
+    black, white = board_bitboards(board)
+    sq = get_cache().peek_best_move(black, white, True, tag=level)
+    return None if sq is None else divmod(sq, 8)
 
-def ai_move(board):
-    moves = valid_moves(board, -1)
-    if moves:
-        return random.choice(moves)
-    return None
+def start_ai(worker, board, level="ふつう", tt=None):
+    """AI の手をバックグラウンドで考え始める（結果は worker.job に残る）"""
+    depth, time_limit, endgame_empties = LEVELS[level]
+    # 「よわい」は定石もパターン評価も使わない
+    book = get_book() if depth > 1 else None
+    evaluator = get_evaluator() if depth > 1 else None
+    return worker.submit(board, -1, depth, time_limit, tt, book, endgame_empties, evaluator)
+
+def move_hints(board, player):
+    """合法手ごとの評価値 {(x, y): 評価値} と読んだ深さ。同じ局面（対称な局面を含む）は再計算しない"""
+    black, white = board_bitboards(board)
+    cache = get_cache()
+    hints = cache.peek_move_scores(black, white, player == -1, tag=HINT_DEPTH)
+    if hints is None:
+        p, o = to_bitboards(board, player)
+        scores, depth = move_scores(get_hint_pool(), p, o, HINT_DEPTH, HINT_BUDGET)
+        cache.store_move_scores(black, white, player == -1, scores, depth, tag=HINT_DEPTH)
+        hints = depth, scores
+    depth, scores = hints
+    return {divmod(sq, 8): s for sq, s in scores.items()}, depth
+
+def format_score(s):
+    """評価値の表示。勝敗まで読み切れた手は最終石差で表す"""
+    if s >= WIN_SCORE:
+        return f"勝{s - WIN_SCORE:+d}"
+    if s <= -WIN_SCORE:
+        return f"負{s + WIN_SCORE:+d}"
+    return f"{s:+d}"
+
+def hint_color(t):
+    """0（一番悪い手）〜 1（一番良い手）を、暗い赤から黄色への背景色にする"""
+    r = int(140 + (240 - 140) * t)
+    g = int(40 + (210 - 40) * t)
+    return f"rgb({r},{g},40)"
+
+def start_ponder(ponderer, board, level="ふつう", tt=None):
+    """プレイヤーの候補手それぞれに対する AI の応手を、バックグラウンドで考えておく（tt はその強さの置換表）"""
+    depth, time_limit, endgame_empties = LEVELS[level]
+    book = get_book() if depth > 1 else None
+    evaluator = get_evaluator() if depth > 1 else None
+    ponderer.start(board, 1, depth, time_limit, book, endgame_empties, evaluator, tag=level, tt=tt)
+
+def record_square(x, y):
+    """棋譜に書くマス番号。この盤面の初期配置は標準の左右反転なので、左右を戻して記録する"""
+    return symmetry_square(x*8+y, 2)
 
 def score(board):
     black = np.sum(board==1)
@@ -62,7 +109,9 @@ def score(board):
     return black, white
 
 # --- HTML盤面描画（スマホ向け自動幅） ---
-def render_board_html(board, moves=None):
+def render_board_html(board, moves=None, hints=None):
+    if hints:
+        lo, hi = min(hints.values()), max(hints.values())
     html = '<div style="width:90vw; max-width:400px; margin:auto;">'
     html += '<table style="border-collapse: collapse; width:100%;">'
     cell_size = int(0.9*400/8)  # 最大400pxを想定して縮小
@@ -82,6 +131,11 @@ def render_board_html(board, moves=None):
             else:
                 index = x*8+y
                 content = f'<div style="position:absolute; top:25%; left:25%; font-weight:bold; color:white;">{index}</div>'
+                if hints and (x,y) in hints:
+                    # 評価値で色を付ける（同じ局面の中で比べた良し悪し）
+                    t = (hints[x,y] - lo) / (hi - lo) if hi > lo else 1.0
+                    style = style.replace('background-color:green', f'background-color:{hint_color(t)}')
+                    content += f'<div style="position:absolute; bottom:2px; width:100%; font-size:10px; color:white;">{format_score(hints[x,y])}</div>'
             html += f'<td style="{style}">{content}</td>'
         html += '</tr>'
     html += '</table></div>'
@@ -92,36 +146,109 @@ st.title("オセロゲーム ver2.0")
 
 if "board" not in st.session_state:
     st.session_state.board = init_board()
+if "tts" not in st.session_state:
+    # 置換表は強さごとに分ける（強さによって評価関数が違い、同じ局面でも評価値が変わる）
+    st.session_state.tts = {name: TranspositionTable() for name in LEVELS}
+if "worker" not in st.session_state:
+    st.session_state.worker = AIWorker()
+if "ponderer" not in st.session_state:
+    st.session_state.ponderer = Ponderer()  # 先読みした AI の応手（このセッションだけのキャッシュ）
+if "moves" not in st.session_state:
+    st.session_state.moves = []  # 棋譜（終局したら reversi_record00 の棋譜ファイルに追記する）
+    st.session_state.recorded = False
 
 board = st.session_state.board
+worker = st.session_state.worker
+ponderer = st.session_state.ponderer
 player = 1
-moves = valid_moves(board, player)
+moves = [] if worker.thinking else valid_moves(board, player)
+
+# ヒント（合法手の評価値で色を付ける）
+show_hints = st.checkbox("ヒントを表示する")
+hints = None
+if show_hints and moves:
+    hints, hint_depth = move_hints(board, player)
+    st.caption(f"ヒントの読みの深さ: {hint_depth}")
 
 # 盤面描画
-st.markdown(render_board_html(board, moves), unsafe_allow_html=True)
+st.markdown(render_board_html(board, moves, hints), unsafe_allow_html=True)
 
 # 注意書き（中央・白文字）
 st.markdown(
-    '<div style="text-align:center; color:white; font-weight:bold; font-size:16px;">黒の石を置くマス番号を入力して石を置くボタンは2回クリックしてください</div>',
+    '<div style="text-align:center; color:white; font-weight:bold; font-size:16px;">黒の石を置くマス番号を入力して石を置くボタンを押してください</div>',
     unsafe_allow_html=True
 )
 
+# AIの強さ
+level = st.selectbox("AIの強さ", list(LEVELS), index=1)
+ponder = st.checkbox("先読み（考えている間に AI の応手を用意しておく）", value=True)
+
 # マス番号入力
 cell_number = st.number_input("置きたいマス番号(0-63)", min_value=0, max_value=63, value=0)
-if st.button("石を置く"):
+if st.button("石を置く", disabled=worker.thinking):
     x, y = divmod(cell_number, 8)
     if (x,y) in moves:
         board = place_stone(board, x, y, player)
-        ai = ai_move(board)
+        st.session_state.board = board
+        st.session_state.moves.append(record_square(x, y))
+        ai = cached_ai_move(board, level)
+        if ai is None:
+            sq = ponderer.lookup(board, -player, tag=level)
+            ai = None if sq is None else divmod(sq, 8)
+        job = ponderer.take(board) if ai is None else None
+        ponderer.cancel()
         if ai:
-            board = place_stone(board, ai[0], ai[1], -player)
+            st.session_state.board = place_stone(board, ai[0], ai[1], -player)
+            st.session_state.moves.append(record_square(*ai))
+        else:
+            # AI はバックグラウンドで考え、下の ai_status が結果を取りに来る
+            # 先読みでこの手の応手を考え中なら、それを引き継ぐ
+            if job is not None:
+                worker.adopt(job)
+            else:
+                start_ai(worker, board, level, st.session_state.tts[level])
+            st.session_state.ai_level = level
+        st.rerun()
     else:
         st.warning("そこには置けません。")
-    st.session_state.board = board
+
+# AIの思考状況（考えている間だけ定期的に再実行して結果を取りに来る）
+@st.fragment(run_every=0.25)
+def ai_status():
+    job = worker.job
+    if job is None:
+        return
+    if job.done():
+        sq = job.result()
+        worker.job = None
+        if not job.cancelled():
+            # 途中で打ち切った手は浅い読みの結果なので入れない
+            black, white = board_bitboards(st.session_state.board)
+            get_cache().store_best_move(black, white, True, sq, tag=st.session_state.ai_level)
+        if sq is not None:
+            x, y = divmod(sq, 8)
+            st.session_state.board = place_stone(st.session_state.board, x, y, -player)
+            st.session_state.moves.append(record_square(x, y))
+        st.rerun()
+    depth, nodes, elapsed = job.progress()
+    status = "打ち切り中…" if job.cancelled() else "AIが考えています…"
+    st.info(f"{status} 深さ {depth} / {nodes:,} 局面 / {elapsed:.1f} 秒")
+    if st.button("ここで打たせる", disabled=job.cancelled()):
+        # 探索を打ち切り、そこまでの最善手を打たせる
+        job.cancel()
+
+if worker.thinking:
+    ai_status()
+elif ponder and moves:
+    start_ponder(ponderer, board, level, st.session_state.tts[level])
+else:
+    ponderer.cancel()
 
 # スコア表示
 black, white = score(board)
 st.markdown(f"<div style='text-align:center;font-size:20px;'>プレイヤー(黒): {black} / AI(白): {white}</div>", unsafe_allow_html=True)
+stats = get_cache().stats()
+st.caption(f"局面キャッシュ: {stats['size']} 件 / ヒット {stats['hits']} / ミス {stats['misses']}")
 
 # 勝敗判定
 if not valid_moves(board,1) and not valid_moves(board,-1):
@@ -131,7 +258,14 @@ if not valid_moves(board,1) and not valid_moves(board,-1):
         st.success("AIの勝ち！")
     else:
         st.info("引き分け！")
+    if not st.session_state.recorded:
+        append_game(st.session_state.moves)
+        st.session_state.recorded = True
 
 # リセット
 if st.button("リセット"):
+    worker.cancel()
+    ponderer.cancel()
     st.session_state.board = init_board()
+    st.session_state.moves = []
+    st.session_state.recorded = False
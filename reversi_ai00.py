@@ -0,0 +1,295 @@
+import time
+from typing import NamedTuple, Optional
+
+from reversi_logic00 import (
+    legal_moves_bb, flips_bb, to_bitboards, iter_bits, ZOBRIST_SIDE, zobrist_hash, zobrist_update,
+)
+from reversi_endgame00 import EndgameSolver
+
+# ----------------- 評価関数 -----------------
+# マスの種類ごとの重み（隅を重視し、隅の隣の X・C マスを嫌う）
+CORNERS = 0x8100000000000081
+X_SQUARES = 0x0042000000004200
+C_SQUARES = 0x4281000000008142
+A_SQUARES = 0x2400810000810024
+B_SQUARES = 0x1800008181000018
+EDGES_INNER = 0x003C424242423C00
+SQUARE_WEIGHTS = (
+    (CORNERS, 100),
+    (X_SQUARES, -50),
+    (C_SQUARES, -20),
+    (A_SQUARES, 10),
+    (B_SQUARES, 5),
+    (EDGES_INNER, -2),
+)
+MOBILITY_WEIGHT = 8
+WIN_SCORE = 10000  # 終局時は石差にこの値を加減して、通常の評価値より必ず大きくする
+ENDGAME_EMPTIES = 12  # 空きマスがこの数以下になったら終盤完全読みに切り替える
+
+
+def evaluate(p: int, o: int) -> int:
+    """手番側から見た局面の評価値（マスの重み + 着手可能数の差）"""
+    score = 0
+    for mask, w in SQUARE_WEIGHTS:
+        score += w * ((p & mask).bit_count() - (o & mask).bit_count())
+    mobility = legal_moves_bb(p, o).bit_count() - legal_moves_bb(o, p).bit_count()
+    return score + MOBILITY_WEIGHT * mobility
+
+
+def final_score(p: int, o: int) -> int:
+    """終局時の評価値（石差に勝敗ボーナスを付ける）"""
+    return diff_score(p.bit_count() - o.bit_count())
+
+
+def diff_score(diff: int) -> int:
+    """最終石差を評価値に直す"""
+    if diff > 0:
+        return WIN_SCORE + diff
+    if diff < 0:
+        return -WIN_SCORE + diff
+    return 0
+
+
+# ----------------- 置換表 -----------------
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class TranspositionTable:
+    """固定長のスロット配列による置換表（キーの下位ビットで位置を決める）
+
+    同じスロットが衝突したときは、古い探索の結果か、より浅い探索の結果を上書きする。
+    スロット数は最初に決めた 2**bits から増えないので、メモリ使用量は一定になる。
+    """
+
+    def __init__(self, bits: int = 18):
+        self.mask = (1 << bits) - 1
+        self.keys = [0] * (1 << bits)
+        self.entries = [None] * (1 << bits)  # (深さ, 種別, 評価値, 最善手, 世代)
+        self.generation = 0
+
+    def new_search(self):
+        """探索のたびに世代を進め、前回までの結果を置き換えやすくする"""
+        self.generation = (self.generation + 1) & 0xFF
+
+    def probe(self, key: int):
+        i = key & self.mask
+        if self.keys[i] == key:
+            return self.entries[i]
+        return None
+
+    def store(self, key: int, depth: int, flag: int, value: int, move: int):
+        i = key & self.mask
+        old = self.entries[i]
+        if old is None or self.keys[i] == key or old[4] != self.generation or depth >= old[0]:
+            self.keys[i] = key
+            self.entries[i] = (depth, flag, value, move, self.generation)
+
+    def clear(self):
+        self.keys = [0] * len(self.keys)
+        self.entries = [None] * len(self.entries)
+
+
+# ----------------- 探索 -----------------
+
+class SearchResult(NamedTuple):
+    move: Optional[int]  # 最善手のマス番号（打てる手がなければ None）
+    score: int  # 手番側から見た評価値
+    depth: int  # 読み切った深さ
+    nodes: int  # 探索したノード数
+
+
+class _Timeout(Exception):
+    pass
+
+
+class Searcher:
+    """反復深化・アルファベータ（ネガマックス）探索
+
+    depth: 最大の読みの深さ
+    time_limit: 1手あたりの思考時間（秒）。None なら時間制限なし
+    endgame_empties: 空きマスがこの数以下なら終盤完全読み（reversi_endgame00）を使う
+    stop_event: 別スレッドから探索を打ち切るための threading.Event
+    evaluator: 末端の評価関数（手番側 p・相手側 o → 評価値）。None なら evaluate を使う
+    時間切れ・打ち切りの場合は、最後に読み切った深さの最善手を返す。
+    """
+
+    CHECK_INTERVAL = 1024  # 何ノードごとに時間を確認するか
+
+    def __init__(self, depth: int = 6, time_limit: Optional[float] = None, tt: Optional[TranspositionTable] = None,
+                 endgame_empties: int = ENDGAME_EMPTIES, stop_event=None, evaluator=None):
+        self.depth = depth
+        self.time_limit = time_limit
+        self.tt = tt if tt is not None else TranspositionTable()
+        self.endgame_empties = endgame_empties
+        self.stop_event = stop_event
+        self.evaluate = evaluator if evaluator is not None else evaluate
+        self.nodes = 0
+        self.completed_depth = 0
+        self.solver = None
+        self.deadline = None
+
+    def progress(self) -> tuple[int, int]:
+        """(読み切った深さ, 探索したノード数) を返す。別スレッドから探索中に呼んでよい"""
+        solver_nodes = self.solver.nodes if self.solver is not None else 0
+        return self.completed_depth, self.nodes + solver_nodes
+
+    def _stopped(self) -> bool:
+        if self.stop_event is not None and self.stop_event.is_set():
+            return True
+        return self.deadline is not None and time.perf_counter() > self.deadline
+
+    def search(self, p: int, o: int, color: int = 0) -> SearchResult:
+        """手番側 p・相手側 o の局面を探索する。color は手番の色（0: 黒, 1: 白）"""
+        moves = legal_moves_bb(p, o)
+        if not moves:
+            return SearchResult(None, 0, 0, 0)
+        self.nodes = 0
+        self.completed_depth = 0
+        self.solver = None
+        self.tt.new_search()
+        self.deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+
+        empties = 64 - (p | o).bit_count()
+        if empties <= self.endgame_empties:
+            # 読み切りには思考時間の半分まで使い、間に合わなければ残りの時間で通常の探索をする
+            self.solver = EndgameSolver(None if self.time_limit is None else self.time_limit / 2, self.stop_event)
+            solved = self.solver.solve(p, o)
+            if solved is not None:
+                move, diff = solved
+                self.completed_depth = empties
+                return SearchResult(move, diff_score(diff), empties, self.solver.nodes)
+
+        black, white = (p, o) if color == 0 else (o, p)
+        key = zobrist_hash(black, white, color == 1)
+        root_moves = list(iter_bits(moves))
+        best = SearchResult(root_moves[0], 0, 0, 0)
+        for depth in range(1, self.depth + 1):
+            try:
+                move, score = self._root(p, o, color, key, depth, root_moves)
+            except _Timeout:
+                break
+            best = SearchResult(move, score, depth, self.nodes)
+            self.completed_depth = depth
+            # 前回の最善手から調べると枝刈りが効きやすい
+            root_moves.remove(move)
+            root_moves.insert(0, move)
+            if abs(score) >= WIN_SCORE:
+                break  # 勝敗が読み切れた
+        return best._replace(nodes=self.nodes)
+
+    def score_move(self, p: int, o: int, sq: int, depth: int, color: int = 0) -> Optional[int]:
+        """sq に打った手の評価値（手番側から見た値）を depth 手先まで読んで返す。時間切れ・打ち切りなら None
+
+        最善手だけを求める search と違い、悪い手でも枝刈りせずに正確な値を出す（ヒント表示用）。
+        """
+        self.nodes = 0
+        self.tt.new_search()
+        self.deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+        black, white = (p, o) if color == 0 else (o, p)
+        f = flips_bb(p, o, sq)
+        key = zobrist_update(zobrist_hash(black, white, color == 1), color, sq, f)
+        try:
+            return -self._negamax(o ^ f, p | f | (1 << sq), 1 - color, key, depth - 1,
+                                  -WIN_SCORE * 2, WIN_SCORE * 2, False)
+        except _Timeout:
+            return None
+
+    def _root(self, p, o, color, key, depth, root_moves):
+        alpha, beta = -WIN_SCORE * 2, WIN_SCORE * 2
+        best_move = root_moves[0]
+        for sq in root_moves:
+            f = flips_bb(p, o, sq)
+            child_key = zobrist_update(key, color, sq, f)
+            score = -self._negamax(o ^ f, p | f | (1 << sq), 1 - color, child_key, depth - 1, -beta, -alpha, False)
+            if score > alpha:
+                alpha = score
+                best_move = sq
+        self.tt.store(key, depth, EXACT, alpha, best_move)
+        return best_move, alpha
+
+    def _negamax(self, p, o, color, key, depth, alpha, beta, passed):
+        self.nodes += 1
+        if self.nodes % self.CHECK_INTERVAL == 0 and self._stopped():
+            raise _Timeout
+
+        moves = legal_moves_bb(p, o)
+        if not moves:
+            if passed:
+                return final_score(p, o)
+            return -self._negamax(o, p, 1 - color, key ^ ZOBRIST_SIDE, depth, -beta, -alpha, True)
+        if depth <= 0:
+            return self.evaluate(p, o)
+
+        alpha_orig = alpha
+        tt_move = -1
+        entry = self.tt.probe(key)
+        if entry is not None:
+            tt_depth, flag, value, tt_move, _ = entry
+            if tt_depth >= depth:
+                if flag == EXACT:
+                    return value
+                if flag == LOWER and value > alpha:
+                    alpha = value
+                elif flag == UPPER and value < beta:
+                    beta = value
+                if alpha >= beta:
+                    return value
+
+        best_score = -WIN_SCORE * 2
+        best_move = -1
+        for sq, f in self._ordered_moves(p, o, moves, tt_move, depth):
+            score = -self._negamax(o ^ f, p | f | (1 << sq), 1 - color,
+                                   zobrist_update(key, color, sq, f), depth - 1, -beta, -alpha, False)
+            if score > best_score:
+                best_score = score
+                best_move = sq
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        if best_score <= alpha_orig:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.tt.store(key, depth, flag, best_score, best_move)
+        return best_score
+
+    @staticmethod
+    def _ordered_moves(p, o, moves, tt_move, depth):
+        """置換表の手 → 隅 → 相手の着手可能数が少ない手 の順に並べた (マス, 裏返る石) を返す"""
+        ordered = []
+        for sq in iter_bits(moves):
+            f = flips_bb(p, o, sq)
+            bit = 1 << sq
+            if sq == tt_move:
+                rank = -1000
+            elif bit & CORNERS:
+                rank = -100
+            elif depth >= 3:
+                # 浅いところでは着手可能数の計算を省く
+                rank = legal_moves_bb(o ^ f, p | f | bit).bit_count()
+            else:
+                rank = 0
+            ordered.append((rank, sq, f))
+        ordered.sort()
+        return [(sq, f) for _, sq, f in ordered]
+
+
+def best_move(board, color: int, depth: int = 6, time_limit: Optional[float] = None,
+              tt: Optional[TranspositionTable] = None, book=None,
+              endgame_empties: int = ENDGAME_EMPTIES, evaluator=None) -> Optional[int]:
+    """NumPy 盤面で color（1: 黒, -1: 白）の最善手のマス番号を返す（行 * 8 + 列）
+
+    book（reversi_book00.OpeningBook）を渡すと、定石にある局面では探索せずに定石手を返す。
+    evaluator（reversi_pattern00.PatternEvaluator など）を渡すと、末端の評価にそれを使う。
+    """
+    p, o = to_bitboards(board, color)
+    if book is not None:
+        sq = book.move(p, o)
+        if sq is not None:
+            return sq
+    searcher = Searcher(depth, time_limit, tt, endgame_empties, evaluator=evaluator)
+    return searcher.search(p, o, 0 if color == 1 else 1).move
@@ -0,0 +1,243 @@
+import time
+
+import numpy as np
+
+# ----------------- 複数盤面の一括処理 -----------------
+# init_board() と同じ形式の盤面を N 枚まとめた (N, 8, 8) 配列を受け取り、
+# 盤面ごとの Python ループを使わずに NumPy の uint64 演算で合法手・裏返る石・打った後の盤面を求める。
+# マス番号は reversi_logic00 と同じく board[i, j] → i * 8 + j（-1 はパス）。
+
+SIZE = 8
+
+_SHIFTS = (
+    (1, np.uint64(0x7E7E7E7E7E7E7E7E)),
+    (8, np.uint64(0xFFFFFFFFFFFFFFFF)),
+    (7, np.uint64(0x007E7E7E7E7E7E00)),
+    (9, np.uint64(0x007E7E7E7E7E7E00)),
+)
+
+
+def _colors(color, n):
+    """スカラーまたは長さ N の手番配列を (N,) の int8 配列にそろえる"""
+    return np.broadcast_to(np.asarray(color, dtype=np.int8), (n,))
+
+
+def pack(boards, color):
+    """(N, 8, 8) の盤面を (手番側, 相手側) の uint64 配列 2 つに変換する"""
+    boards = np.asarray(boards)
+    n = boards.shape[0]
+    flat = boards.reshape(n, SIZE * SIZE)
+    c = _colors(color, n)[:, None]
+    p = np.packbits(flat == c, axis=1, bitorder='little').view('<u8').ravel()
+    o = np.packbits(flat == -c, axis=1, bitorder='little').view('<u8').ravel()
+    return p, o
+
+
+def unpack(bb):
+    """uint64 配列を (N, 8, 8) の bool 配列に変換する"""
+    bb = np.ascontiguousarray(bb, dtype='<u8')
+    bits = np.unpackbits(bb.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+    return bits.view(bool).reshape(-1, SIZE, SIZE)
+
+
+def to_boards(p, o, color):
+    """(手番側, 相手側) の uint64 配列から int8 の (N, 8, 8) 盤面を作る"""
+    c = _colors(color, len(p))[:, None, None]
+    return (unpack(p) * c - unpack(o) * c).astype(np.int8)
+
+
+def _move_bits(squares):
+    """マス番号の配列を1ビットだけ立てた uint64 配列にする（-1 は 0）"""
+    squares = np.asarray(squares)
+    bits = np.left_shift(np.uint64(1), np.clip(squares, 0, 63).astype(np.uint64))
+    return np.where(squares >= 0, bits, np.uint64(0))
+
+
+def legal_moves(p, o):
+    """各盤面の合法手を uint64 のビットマスクで返す"""
+    empty = ~(p | o)
+    moves = np.zeros_like(p)
+    for sh, m in _SHIFTS:
+        om = o & m
+        sh = np.uint64(sh)
+        for shift in (np.left_shift, np.right_shift):
+            t = om & shift(p, sh)
+            for _ in range(5):
+                t |= om & shift(t, sh)
+            moves |= shift(t, sh)
+    return moves & empty
+
+
+def flips(p, o, squares):
+    """各盤面で squares[i] に打ったときに裏返る石のビットマスクを返す（パスなら 0）"""
+    x = _move_bits(squares)
+    result = np.zeros_like(p)
+    for sh, m in _SHIFTS:
+        om = o & m
+        sh = np.uint64(sh)
+        for shift in (np.left_shift, np.right_shift):
+            # 打った位置から相手石が続く範囲を 6 マス分たどり、その先に自分の石があれば裏返す
+            b = om & shift(x, sh)
+            run = b
+            for _ in range(5):
+                b = om & shift(b, sh)
+                run |= b
+            bracketed = (shift(run | x, sh) & p) != 0
+            result |= np.where(bracketed, run, np.uint64(0))
+    return result
+
+
+def play(p, o, squares):
+    """squares に打った後の (手番側, 相手側, 裏返った石) を返す。手番は入れ替えない"""
+    f = flips(p, o, squares)
+    return p | f | _move_bits(squares), o ^ f, f
+
+
+def perft(p: int, o: int, depth: int) -> int:
+    """reversi_logic00.perft の一括版。1手ごとに全局面の子をまとめて作る（幅優先）
+
+    数え方は reversi_logic00.perft と同じ（パスも1手、終局した局面は葉）。
+    深さ depth − 1 の局面をすべてメモリに持つので、depth は 11 くらいまでにする。
+    """
+    p = np.array([p], dtype=np.uint64)
+    o = np.array([o], dtype=np.uint64)
+    leaves = 0
+    for remaining in range(depth, 0, -1):
+        moves = legal_moves(p, o)
+        has = moves != 0
+        # 打てない局面: 相手も打てなければ終局（葉）、打てればパスして相手の番
+        stuck_p, stuck_o = o[~has], p[~has]
+        can_pass = legal_moves(stuck_p, stuck_o) != 0
+        leaves += int((~can_pass).sum())
+        if remaining == 1:
+            return leaves + int(np.bitwise_count(moves).sum()) + int(can_pass.sum())
+        next_p, next_o = [stuck_p[can_pass]], [stuck_o[can_pass]]
+        # 合法手を下位ビットから1つずつ取り出して打つ（手が残っている局面だけに詰めながら）
+        m, p, o = moves[has], p[has], o[has]
+        while len(m):
+            lsb = m & (~m + np.uint64(1))
+            squares = np.log2(lsb.astype(np.float64)).astype(np.int64)
+            p2, o2, _ = play(p, o, squares)
+            next_p.append(o2)
+            next_o.append(p2)
+            m ^= lsb
+            left = m != 0
+            m, p, o = m[left], p[left], o[left]
+        p, o = np.concatenate(next_p), np.concatenate(next_o)
+    return leaves + len(p)
+
+
+# ----------------- NumPy 盤面向けの窓口 -----------------
+
+def batch_valid_moves(boards, color):
+    """valid_moves の一括版。各盤面の合法手を (N, 8, 8) の bool 配列で返す"""
+    p, o = pack(boards, color)
+    return unpack(legal_moves(p, o))
+
+
+def batch_place_stone(boards, squares, color):
+    """place_stone の一括版。(裏返る石の (N, 8, 8) bool 配列, 打った後の int8 盤面) を返す
+
+    squares はマス番号の配列（-1 はパス）。元の boards は変更しない。
+    """
+    p, o = pack(boards, color)
+    p2, o2, f = play(p, o, squares)
+    return unpack(f), to_boards(p2, o2, color)
+
+
+def random_moves(moves, rng):
+    """各盤面の合法手から一様に1手を選んでマス番号を返す（合法手がなければ -1）"""
+    legal = unpack(moves).reshape(-1, SIZE * SIZE)
+    keys = rng.random(legal.shape)
+    keys[~legal] = -1.0
+    squares = keys.argmax(axis=1)
+    return np.where(legal.any(axis=1), squares, -1)
+
+
+def random_positions(n, plies, seed=0):
+    """初期配置から plies 手ランダムに打った N 局面を作る（黒番・白番が混在する）"""
+    rng = np.random.default_rng(seed)
+    board = np.zeros((SIZE, SIZE), dtype=np.int8)
+    board[3, 3] = board[4, 4] = 1
+    board[3, 4] = board[4, 3] = -1
+    boards = np.broadcast_to(board, (n, SIZE, SIZE)).copy()
+    color = np.ones(n, dtype=np.int8)
+    for _ in range(plies):
+        p, o = pack(boards, color)
+        squares = random_moves(legal_moves(p, o), rng)
+        p, o, _ = play(p, o, squares)
+        boards = to_boards(p, o, color)
+        color = -color
+    return boards, color
+
+
+def playout(p, o, rng):
+    """各盤面 (手番側, 相手側) から終局まで両者ランダムに打ち、最初の手番側から見た最終石差を返す"""
+    p, o = p.copy(), o.copy()
+    n = len(p)
+    swapped = np.zeros(n, dtype=bool)  # 今の手番側が最初の相手側か
+    active = np.ones(n, dtype=bool)
+    passed = np.zeros(n, dtype=bool)
+    while active.any():
+        moves = legal_moves(p, o)
+        none = moves == 0
+        active &= ~(none & passed)  # 2回続けてパスなら終局
+        passed = none
+        squares = np.where(active, random_moves(moves, rng), -1)
+        p2, o2, _ = play(p, o, squares)
+        # 打った盤面もパスした盤面も手番を入れ替える
+        p, o = np.where(active, o2, p2), np.where(active, p2, o2)
+        swapped ^= active
+    diff = np.bitwise_count(p).astype(np.int64) - np.bitwise_count(o).astype(np.int64)
+    return np.where(swapped, -diff, diff)
+
+
+def main():
+    import argparse
+    from reversi_logic00 import valid_moves_xy, place_stone_xy
+
+    parser = argparse.ArgumentParser(description="複数盤面の一括手生成ベンチマーク")
+    parser.add_argument("--max-n", type=int, default=100_000)
+    parser.add_argument("--plies", type=int, default=20, help="計測用局面を作るときのランダム手数")
+    args = parser.parse_args()
+
+    boards, color = random_positions(args.max_n, args.plies)
+
+    # 1局面ずつの処理と結果が一致することを確認
+    k = min(200, args.max_n)
+    legal = batch_valid_moves(boards[:k], color[:k])
+    squares = random_moves(legal_moves(*pack(boards[:k], color[:k])), np.random.default_rng(1))
+    _, placed = batch_place_stone(boards[:k], squares, color[:k])
+    for i in range(k):
+        b, c, sq = boards[i].astype(int), int(color[i]), int(squares[i])
+        assert sorted(valid_moves_xy(b, c)) == sorted(zip(*np.nonzero(legal[i])))
+        if sq >= 0:
+            place_stone_xy(b, sq // SIZE, sq % SIZE, c)
+        assert (b == placed[i]).all()
+
+    print(f"{'N':>8} {'valid_moves/s':>15} {'place_stone/s':>15} {'loop valid_moves/s':>20}")
+    n = 1
+    while n <= args.max_n:
+        sub, c = boards[:n], color[:n]
+        reps = max(1, 10_000 // n)
+        t0 = time.perf_counter()
+        for _ in range(reps):
+            legal = batch_valid_moves(sub, c)
+        legal_rate = n * reps / (time.perf_counter() - t0)
+        squares = random_moves(legal_moves(*pack(sub, c)), np.random.default_rng(2))
+        t0 = time.perf_counter()
+        for _ in range(reps):
+            batch_place_stone(sub, squares, c)
+        place_rate = n * reps / (time.perf_counter() - t0)
+        loop = ""
+        if n <= 1000:
+            t0 = time.perf_counter()
+            for i in range(n):
+                valid_moves_xy(sub[i], c[i])
+            loop = f"{n / (time.perf_counter() - t0):20,.0f}"
+        print(f"{n:>8} {legal_rate:15,.0f} {place_rate:15,.0f} {loop}")
+        n *= 10
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from reversi_logic00 import (
+    BLACK, WHITE, PERFT, legal_moves_bb, flips_bb, iter_bits, init_bitboards, bits_to_mask, to_bitboards, perft,
+    valid_moves_yx, place_stone_yx, valid_moves_xy, place_stone_xy, _valid_moves_array,
+)
+from reversi_ai00 import Searcher, TranspositionTable, best_move, evaluate
+from reversi_pattern00 import load_evaluator
+
+# ----------------- リバーシのエンジン ベンチマーク -----------------
+# 1) 初期局面からの perft で手生成の正しさを確認する
+# 2) 固定局面集で、手生成・石の反転・探索の速度を計る
+# reversi02.py（board[y, x]）と reversi02_streamlit01.py（board[x, y]）の両方の窓口を計測する。
+# --json を付けると結果を1行の JSON として追記するので、変更前後の比較に使える。
+
+# perft の正しい値は reversi_logic00.PERFT（既知の深さだけ確かめ、それより深ければ局面数だけを記録する）
+
+# 比較用: reversi02_streamlit01.py の従来の valid_moves（board[x, y]）。board[y, x] 版は reversi_logic00._valid_moves_array
+_DIRECTIONS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+
+def baseline_valid_moves_xy(board, player):
+    moves = []
+    for x in range(8):
+        for y in range(8):
+            if board[x, y] != 0:
+                continue
+            for dx, dy in _DIRECTIONS:
+                nx, ny = x + dx, y + dy
+                found_opponent = False
+                while 0 <= nx < 8 and 0 <= ny < 8:
+                    if board[nx, ny] == -player:
+                        found_opponent = True
+                    elif board[nx, ny] == player and found_opponent:
+                        moves.append((x, y))
+                        break
+                    else:
+                        break
+                    nx += dx
+                    ny += dy
+    return list(set(moves))
+
+
+def make_corpus(count: int, seed: int = 0):
+    """固定シードのランダム対局から、序盤〜終盤の局面 (黒, 白, 手番) を count 個作る"""
+    rng = random.Random(seed)
+    corpus = []
+    while len(corpus) < count:
+        black, white = init_bitboards()
+        color = BLACK
+        stop = rng.randrange(4, 56)
+        for _ in range(stop):
+            p, o = (black, white) if color == BLACK else (white, black)
+            moves = legal_moves_bb(p, o)
+            if not moves:
+                if not legal_moves_bb(o, p):
+                    break
+                color = -color
+                continue
+            sq = rng.choice(list(iter_bits(moves)))
+            f = flips_bb(p, o, sq)
+            p, o = p | f | (1 << sq), o ^ f
+            black, white = (p, o) if color == BLACK else (o, p)
+            color = -color
+        p, o = (black, white) if color == BLACK else (white, black)
+        if legal_moves_bb(p, o):
+            corpus.append((black, white, color))
+    return corpus
+
+
+def to_board(black: int, white: int):
+    """ビットボードから NumPy 盤面を作る（どちらの形式でもビット番号 = 1次元の添字）"""
+    return bits_to_mask(black).astype(int) - bits_to_mask(white).astype(int)
+
+
+def perft_array(board, color, depth, valid_moves, place_stone):
+    """フロントエンドの valid_moves / place_stone だけを使った perft"""
+    if depth == 0:
+        return 1
+    moves = valid_moves(board, color)
+    if not moves:
+        if not valid_moves(board, -color):
+            return 1
+        return perft_array(board, -color, depth - 1, valid_moves, place_stone)
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for x, y in moves:
+        child = board.copy()
+        place_stone(child, x, y, color)
+        nodes += perft_array(child, -color, depth - 1, valid_moves, place_stone)
+    return nodes
+
+
+def timed(fn, repeat: int):
+    """fn を repeat 回実行した中で最短の時間（秒）と戻り値を返す"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def run(args):
+    results = {}
+
+    def record(name, ops, sec, unit):
+        results[name] = {"ops": ops, "sec": round(sec, 6), f"{unit}_per_sec": round(ops / sec, 1)}
+        print(f"{name:<28} {ops:>10} {unit:<6} {sec:9.4f}s {ops / sec:14,.0f} {unit}/s")
+
+    # ---- 1) perft ----
+    black, white = init_bitboards()
+    yx_board = np.zeros((8, 8), dtype=int)
+    yx_board[3, 3], yx_board[4, 4] = WHITE, WHITE
+    yx_board[3, 4], yx_board[4, 3] = BLACK, BLACK
+    xy_board = np.zeros((8, 8), dtype=int)
+    xy_board[3, 3] = xy_board[4, 4] = 1
+    xy_board[3, 4] = xy_board[4, 3] = -1
+
+    ok = True
+    for depth in range(1, args.perft_depth + 1):
+        sec, nodes = timed(lambda: perft(black, white, depth), 1)
+        ok &= nodes == PERFT.get(depth, nodes)
+        record(f"perft.bitboard.d{depth}", nodes, sec, "nodes")
+    for name, board, vm, ps in (("yx", yx_board, valid_moves_yx, place_stone_yx),
+                                ("xy", xy_board, valid_moves_xy, place_stone_xy)):
+        depth = args.array_perft_depth
+        sec, nodes = timed(lambda: perft_array(board, BLACK, depth, vm, ps), 1)
+        ok &= nodes == PERFT.get(depth, nodes)
+        record(f"perft.{name}.d{depth}", nodes, sec, "nodes")
+    unknown = sorted({d for d in (args.perft_depth, args.array_perft_depth) if d not in PERFT})
+    print("perft:", "OK" if ok else "MISMATCH",
+          f"（深さ {', '.join(map(str, unknown))} は既知の値がないので確かめていない）" if unknown else "")
+
+    # ---- 2) 固定局面集での速度 ----
+    corpus = make_corpus(args.positions, args.seed)
+    bbs = [((b, w) if c == BLACK else (w, b)) for b, w, c in corpus]
+    boards = [(to_board(b, w), c) for b, w, c in corpus]
+    n_moves = sum(legal_moves_bb(p, o).bit_count() for p, o in bbs)
+
+    sec, _ = timed(lambda: [legal_moves_bb(p, o) for p, o in bbs], args.repeat)
+    record("movegen.bitboard", n_moves, sec, "moves")
+    sec, yx = timed(lambda: [valid_moves_yx(b, c) for b, c in boards], args.repeat)
+    record("movegen.yx", n_moves, sec, "moves")
+    sec, xy = timed(lambda: [valid_moves_xy(b, c) for b, c in boards], args.repeat)
+    record("movegen.xy", n_moves, sec, "moves")
+    # それぞれの形式で、従来の実装（別に書かれた 64 マス × 8 方向の走査）と同じ合法手が返ることを確認
+    same_yx = all(sorted(a) == sorted(_valid_moves_array(b, c)) for a, (b, c) in zip(yx, boards))
+    same_xy = all(sorted(a) == sorted(baseline_valid_moves_xy(b, c)) for a, (b, c) in zip(xy, boards))
+    ok &= same_yx and same_xy
+    print("yx moves vs baseline:", "OK" if same_yx else "MISMATCH",
+          " xy moves vs baseline:", "OK" if same_xy else "MISMATCH")
+
+    plays = [(p, o, sq) for p, o in bbs for sq in iter_bits(legal_moves_bb(p, o))]
+    sec, _ = timed(lambda: [flips_bb(p, o, sq) for p, o, sq in plays], args.repeat)
+    record("flip.bitboard", len(plays), sec, "moves")
+    board_plays = [(b, c, x, y) for b, c in boards for x, y in valid_moves_yx(b, c)]
+    sec, _ = timed(lambda: [place_stone_yx(b.copy(), x, y, c) for b, c, x, y in board_plays], args.repeat)
+    record("flip.yx", len(board_plays), sec, "moves")
+    sec, _ = timed(lambda: [place_stone_xy(b.copy(), y, x, c) for b, c, x, y in board_plays], args.repeat)
+    record("flip.xy", len(board_plays), sec, "moves")
+
+    sec, _ = timed(lambda: [evaluate(p, o) for p, o in bbs], args.repeat)
+    record("eval.simple", len(bbs), sec, "evals")
+    pattern = load_evaluator()
+    if pattern is not None:
+        sec, _ = timed(lambda: [pattern(p, o) for p, o in bbs], args.repeat)
+        record("eval.pattern", len(bbs), sec, "evals")
+
+    # 探索: 固定深さ（時間制限なし）なので結果は実行ごとに変わらない
+    search_set = boards[:args.search_positions]
+
+    def search_all():
+        nodes = 0
+        for b, c in search_set:
+            searcher = Searcher(args.search_depth, None, TranspositionTable(16), endgame_empties=0)
+            nodes += searcher.search(*to_bitboards(b, c), 0 if c == BLACK else 1).nodes
+        return nodes
+
+    sec, nodes = timed(search_all, 1)
+    record(f"search.d{args.search_depth}", nodes, sec, "nodes")
+    # フロントエンドの ai_move と同じ呼び出し（board[y, x] は任意の色、board[x, y] は白番）
+    sec, _ = timed(lambda: [best_move(b, c, args.search_depth, None, TranspositionTable(16), None, 0)
+                            for b, c in search_set], 1)
+    record(f"ai_move.d{args.search_depth}", len(search_set), sec, "moves")
+
+    return ok, results
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="リバーシのエンジン ベンチマーク")
+    parser.add_argument("--perft-depth", type=int, default=7)
+    parser.add_argument("--array-perft-depth", type=int, default=5)
+    parser.add_argument("--positions", type=int, default=200, help="固定局面集の局面数")
+    parser.add_argument("--search-positions", type=int, default=10)
+    parser.add_argument("--search-depth", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="結果を JSON Lines で追記するファイル")
+    args = parser.parse_args()
+
+    ok, results = run(args)
+    if args.json:
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "args": vars(args),
+            "ok": ok,
+            "results": results,
+        }
+        with open(args.json, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import argparse
+import os
+import struct
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from reversi_logic00 import (
+    legal_moves_bb, flips_bb, iter_bits, init_bitboards, canonical, inverse_symmetry_square, zobrist_hash,
+)
+from reversi_ai00 import Searcher
+
+# ----------------- 定石ファイル -----------------
+# 16 バイトのヘッダ（マジック 8 バイト + レコード数 uint64）のあとに、
+# キー昇順に並べた 12 バイト固定長のレコードが続く。
+#   key:   対称変換で代表にそろえた局面（手番側, 相手側）の Zobrist キー
+#   move:  代表局面での最善手のマス番号
+#   depth: 最善手を求めたときの読みの深さ
+#   score: 手番側から見た評価値
+BOOK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reversi_book.bin")
+BOOK_MAGIC = b"RVBOOK01"
+HEADER = struct.Struct("<8sQ")
+RECORD_DTYPE = np.dtype([("key", "<u8"), ("move", "u1"), ("depth", "u1"), ("score", "<i2")])
+
+
+class OpeningBook:
+    """定石ファイルをメモリマップで開き、局面のキーを二分探索で引く（読み込み時の解析は不要）"""
+
+    def __init__(self, path: str = BOOK_FILE):
+        with open(path, "rb") as f:
+            magic, count = HEADER.unpack(f.read(HEADER.size))
+        if magic != BOOK_MAGIC:
+            raise ValueError(f"定石ファイルではありません: {path}")
+        self.table = np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER.size, shape=(count,))
+        self.keys = self.table["key"]
+
+    def __len__(self):
+        return len(self.table)
+
+    def move(self, p: int, o: int):
+        """手番側 p・相手側 o の局面の定石手（マス番号）を返す。定石になければ None"""
+        cp, co, k = canonical(p, o)
+        key = np.uint64(zobrist_hash(cp, co))
+        i = int(np.searchsorted(self.keys, key))
+        if i < len(self.keys) and self.keys[i] == key:
+            return inverse_symmetry_square(int(self.table["move"][i]), k)
+        return None
+
+
+def open_book(path: str = BOOK_FILE):
+    """定石ファイルがあれば OpeningBook を、なければ None を返す"""
+    if not os.path.exists(path):
+        return None
+    return OpeningBook(path)
+
+
+# ----------------- 定石の作成 -----------------
+
+def collect_positions(plies: int):
+    """初期局面から plies 手未満で現れる局面を、対称変換で代表にそろえて重複なく集める"""
+    root = canonical(*init_bitboards())[:2]
+    seen = {root}
+    frontier = [root]
+    for _ in range(plies - 1):
+        nxt = []
+        for p, o in frontier:
+            for sq in iter_bits(legal_moves_bb(p, o)):
+                f = flips_bb(p, o, sq)
+                cp, co = o ^ f, p | f | (1 << sq)
+                if not legal_moves_bb(cp, co):
+                    if not legal_moves_bb(co, cp):
+                        continue  # 終局
+                    cp, co = co, cp  # パス
+                child = canonical(cp, co)[:2]
+                if child not in seen:
+                    seen.add(child)
+                    nxt.append(child)
+        frontier = nxt
+    return list(seen)
+
+
+_depth = 0
+
+
+def _init_worker(depth):
+    global _depth
+    _depth = depth
+
+
+def _search(pos):
+    p, o = pos
+    result = Searcher(_depth).search(p, o)
+    return zobrist_hash(p, o), result.move, result.depth, result.score
+
+
+def build_book(path: str, plies: int, depth: int, workers: int):
+    positions = collect_positions(plies)
+    print(f"{len(positions)} positions (plies < {plies}), searching at depth {depth} ...")
+    t0 = time.perf_counter()
+    records = {}
+    with Pool(workers, _init_worker, (depth,)) as pool:
+        for i, (key, move, d, score) in enumerate(pool.imap_unordered(_search, positions, chunksize=8), 1):
+            records[key] = (key, move, d, max(-32768, min(32767, score)))
+            if i % 500 == 0:
+                print(f"  {i}/{len(positions)}  {time.perf_counter() - t0:.1f}s")
+
+    table = np.array(sorted(records.values()), dtype=RECORD_DTYPE)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(BOOK_MAGIC, len(table)))
+        f.write(table.tobytes())
+    print(f"wrote {len(table)} records to {path} ({time.perf_counter() - t0:.1f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="リバーシの定石ファイルを作成する")
+    parser.add_argument("--plies", type=int, default=6, help="初期局面から何手目までを定石にするか")
+    parser.add_argument("--depth", type=int, default=8, help="各局面の読みの深さ")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", default=BOOK_FILE)
+    args = parser.parse_args()
+    build_book(args.output, args.plies, args.depth, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import threading
+from collections import OrderedDict
+
+from reversi_logic00 import (
+    BLACK, legal_moves_bb, symmetry, inverse_symmetry, symmetry_square, inverse_symmetry_square,
+    symmetric_keys, canonical_key, to_bitboards,
+)
+
+# ----------------- 局面キャッシュ -----------------
+# 8 通りの対称で正規化した Zobrist キーで結果を引く LRU キャッシュ。
+# 対称な局面は同じ項目になるので、値は正規化した向き（代表の局面）のマス番号・ビットボードで持ち、
+# 引くときに元の向きへ戻す。Streamlit では全セッションで共有するのでロックを取る。
+
+
+class PositionCache:
+    """正規化したキーで引く、大きさに上限のある LRU キャッシュ
+
+    hits / misses: 引いた回数のうち、見つかった回数と見つからなかった回数
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def get(self, key):
+        """key の値を返す（なければ None）。見つかった項目は最近使ったものとして後ろへ回す"""
+        with self.lock:
+            value = self.data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            if len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self.data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    # ---- 局面ごとの窓口 ----
+
+    def legal_moves(self, black: int, white: int, white_to_move: bool) -> int:
+        """手番側の合法手のビットボード（見つからなければ計算して入れる）"""
+        key, k = canonical_key(symmetric_keys(black, white, white_to_move))
+        moves = self.get(("moves", key))
+        if moves is None:
+            p, o = (white, black) if white_to_move else (black, white)
+            moves = legal_moves_bb(p, o)
+            self.put(("moves", key), symmetry(moves, k))
+            return moves
+        return inverse_symmetry(moves, k)
+
+    def best_move(self, black: int, white: int, white_to_move: bool, search, tag=None):
+        """手番側の最善手のマス番号。見つからなければ search() で求めて入れる
+
+        tag には AI の強さなど、同じ局面でも結果が変わる条件を渡す（条件ごとに別の項目になる）。
+        """
+        key, k = canonical_key(symmetric_keys(black, white, white_to_move))
+        sq = self.get(("best", tag, key))
+        if sq is None:
+            sq = search()
+            self.store_best_move(black, white, white_to_move, sq, tag)
+            return sq
+        return inverse_symmetry_square(sq, k)
+
+    def store_best_move(self, black: int, white: int, white_to_move: bool, sq, tag=None):
+        """別の場所（バックグラウンドの探索など）で求めた最善手を入れる。打てる手がない (None) 場合は入れない"""
+        if sq is None:
+            return
+        key, k = canonical_key(symmetric_keys(black, white, white_to_move))
+        self.put(("best", tag, key), symmetry_square(sq, k))
+
+    def peek_best_move(self, black: int, white: int, white_to_move: bool, tag=None):
+        """最善手が入っていれば元の向きのマス番号を、なければ None を返す"""
+        key, k = canonical_key(symmetric_keys(black, white, white_to_move))
+        sq = self.get(("best", tag, key))
+        return None if sq is None else inverse_symmetry_square(sq, k)
+
+    def store_move_scores(self, black: int, white: int, white_to_move: bool, scores: dict, depth: int, tag=None):
+        """合法手ごとの評価値 {マス番号: 評価値} と、それを読んだ深さを入れる"""
+        key, k = canonical_key(symmetric_keys(black, white, white_to_move))
+        self.put(("scores", tag, key), (depth, {symmetry_square(sq, k): s for sq, s in scores.items()}))
+
+    def peek_move_scores(self, black: int, white: int, white_to_move: bool, tag=None):
+        """入っていれば (深さ, 元の向きの {マス番号: 評価値}) を、なければ None を返す"""
+        key, k = canonical_key(symmetric_keys(black, white, white_to_move))
+        value = self.get(("scores", tag, key))
+        if value is None:
+            return None
+        depth, scores = value
+        return depth, {inverse_symmetry_square(sq, k): s for sq, s in scores.items()}
+
+
+def board_bitboards(board):
+    """NumPy 盤面の (黒, 白) のビットボード（黒 = 1, 白 = -1）"""
+    return to_bitboards(board, BLACK)
@@ -0,0 +1,202 @@
+import argparse
+import random
+import time
+from typing import Optional
+
+from reversi_logic00 import legal_moves_bb, flips_bb, iter_bits, init_bitboards, FULL
+
+# ----------------- 終盤完全読み -----------------
+# 残りの空きマスが少ない局面を最後まで読み切り、正確な石差を求める。
+#   - 偶数理論: 空きマスが奇数個残っている象限（4x4 の区画）の手を先に読む
+#   - 速さ優先: 打った後の相手の着手可能数が少ない手から読む
+#   - 残り数マス: 合法手の生成や並べ替えをせず、空きマスを直接試す（最後の1マスは専用処理）
+
+QUADRANTS = (0x000000000F0F0F0F, 0x00000000F0F0F0F0, 0x0F0F0F0F00000000, 0xF0F0F0F000000000)
+CORNERS = 0x8100000000000081
+LAST_FEW = 4  # 空きマスがこの数以下なら並べ替えをしない
+ORDER_BY_MOBILITY = 7  # 空きマスがこの数以上なら速さ優先で並べ替える
+
+
+class _Timeout(Exception):
+    pass
+
+
+class EndgameSolver:
+    """アルファベータ（ネガマックス）で終局まで読み切る
+
+    time_limit: 読み切りにかける時間（秒）。時間切れなら solve() は None を返す
+    stop_event: 別スレッドから打ち切るための threading.Event。打ち切られた場合も None を返す
+    """
+
+    CHECK_INTERVAL = 4096
+
+    def __init__(self, time_limit: Optional[float] = None, stop_event=None):
+        self.time_limit = time_limit
+        self.stop_event = stop_event
+        self.nodes = 0
+        self.next_check = 0
+        self.deadline = None
+
+    def solve(self, p: int, o: int):
+        """(最善手のマス番号, 手番側から見た最終石差) を返す。打てる手がなければ最善手は None"""
+        self.nodes = 0
+        self.next_check = self.CHECK_INTERVAL
+        self.deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+        try:
+            moves = legal_moves_bb(p, o)
+            if not moves:
+                return None, self._solve(p, o, -64, 64, False)
+            empties = ~(p | o) & FULL
+            best_move, alpha = None, -65
+            for sq, f in self._ordered(p, o, moves, empties):
+                score = -self._solve(o ^ f, p | f | (1 << sq), -64, -alpha, False)
+                if score > alpha:
+                    best_move, alpha = sq, score
+            return best_move, alpha
+        except _Timeout:
+            return None
+
+    def _solve(self, p, o, alpha, beta, passed):
+        empties = ~(p | o) & FULL
+        if empties.bit_count() <= LAST_FEW:
+            return self._solve_last(p, o, alpha, beta, empties, passed)
+
+        self.nodes += 1
+        if self.nodes >= self.next_check:
+            # 残り数マスの読みでもノード数が増えるので、剰余ではなく次の確認点で判定する
+            self.next_check = self.nodes + self.CHECK_INTERVAL
+            if self.stop_event is not None and self.stop_event.is_set():
+                raise _Timeout
+            if self.deadline is not None and time.perf_counter() > self.deadline:
+                raise _Timeout
+
+        moves = legal_moves_bb(p, o)
+        if not moves:
+            if passed or not legal_moves_bb(o, p):
+                return p.bit_count() - o.bit_count()
+            return -self._solve(o, p, -beta, -alpha, True)
+
+        best = -65
+        for sq, f in self._ordered(p, o, moves, empties):
+            score = -self._solve(o ^ f, p | f | (1 << sq), -beta, -alpha, False)
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best
+
+    def _solve_last(self, p, o, alpha, beta, empties, passed):
+        """残り数マス用: 空きマスを直接試す"""
+        if not empties:
+            return p.bit_count() - o.bit_count()
+        if empties & (empties - 1) == 0:
+            return self._solve_one(p, o, empties.bit_length() - 1)
+        self.nodes += 1
+        best = -65
+        played = False
+        for sq in iter_bits(empties):
+            f = flips_bb(p, o, sq)
+            if not f:
+                continue
+            played = True
+            bit = 1 << sq
+            score = -self._solve_last(o ^ f, p | f | bit, -beta, -alpha, empties ^ bit, False)
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        if not played:
+            if passed:
+                return p.bit_count() - o.bit_count()
+            return -self._solve_last(o, p, -beta, -alpha, empties, True)
+        return best
+
+    def _solve_one(self, p, o, sq):
+        """最後の1マス: 打てる側が打って終局する"""
+        self.nodes += 1
+        diff = p.bit_count() - o.bit_count()
+        n = flips_bb(p, o, sq).bit_count()
+        if n:
+            return diff + 2 * n + 1
+        n = flips_bb(o, p, sq).bit_count()
+        if n:
+            return diff - 2 * n - 1
+        return diff
+
+    @staticmethod
+    def _ordered(p, o, moves, empties):
+        """偶数理論と速さ優先で並べた (マス, 裏返る石) を返す"""
+        odd = 0
+        for q in QUADRANTS:
+            if (empties & q).bit_count() & 1:
+                odd |= q
+        use_mobility = empties.bit_count() >= ORDER_BY_MOBILITY
+        ordered = []
+        for sq in iter_bits(moves):
+            f = flips_bb(p, o, sq)
+            bit = 1 << sq
+            rank = 0 if bit & odd else 1
+            if bit & CORNERS:
+                rank -= 2
+            if use_mobility:
+                rank += 4 * legal_moves_bb(o ^ f, p | f | bit).bit_count()
+            ordered.append((rank, sq, f))
+        ordered.sort()
+        return [(sq, f) for _, sq, f in ordered]
+
+
+def solve(p: int, o: int, time_limit: Optional[float] = None):
+    """EndgameSolver の簡易窓口。(最善手, 石差) または時間切れなら None を返す"""
+    return EndgameSolver(time_limit).solve(p, o)
+
+
+# ----------------- ベンチマーク -----------------
+
+def endgame_positions(empties: int, count: int, seed: int = 0):
+    """固定シードのランダム対局から、空きマスが empties 個で手番側に合法手がある局面を count 個作る"""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        p, o = init_bitboards()
+        while 64 - (p | o).bit_count() > empties:
+            moves = legal_moves_bb(p, o)
+            if not moves:
+                if not legal_moves_bb(o, p):
+                    break
+                p, o = o, p
+                continue
+            sq = rng.choice(list(iter_bits(moves)))
+            f = flips_bb(p, o, sq)
+            p, o = o ^ f, p | f | (1 << sq)
+        if 64 - (p | o).bit_count() == empties and legal_moves_bb(p, o):
+            positions.append((p, o))
+    return positions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="終盤完全読みのベンチマーク（固定局面集）")
+    parser.add_argument("--empties", type=int, nargs="+", default=[10, 12, 14])
+    parser.add_argument("--count", type=int, default=5, help="空きマス数ごとの局面数")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    total_nodes, total_sec = 0, 0.0
+    print(f"{'empties':>7} {'#':>3} {'move':>5} {'score':>6} {'nodes':>10} {'sec':>8} {'nodes/s':>10}")
+    for empties in args.empties:
+        for i, (p, o) in enumerate(endgame_positions(empties, args.count, args.seed)):
+            solver = EndgameSolver()
+            t0 = time.perf_counter()
+            move, score = solver.solve(p, o)
+            sec = time.perf_counter() - t0
+            total_nodes += solver.nodes
+            total_sec += sec
+            print(f"{empties:>7} {i:>3} {move:>5} {score:>+6} {solver.nodes:>10} {sec:>8.3f} {solver.nodes / sec:>10,.0f}")
+    print(f"total: {total_nodes} nodes  {total_sec:.2f}s  {total_nodes / total_sec:,.0f} nodes/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from reversi_logic00 import legal_moves_bb, iter_bits
+from reversi_ai00 import Searcher, TranspositionTable, WIN_SCORE
+from reversi_pattern00 import load_evaluator
+
+# ----------------- 着手ヒント -----------------
+# 合法手それぞれの評価値を、手ごとに別プロセスで同じ深さまで読んで求める。
+# 深さ 1 から1段ずつ深くし、全部の手が制限時間内に読み切れた一番深い段の値を使う
+# （時間が足りなければ浅い読みの値に落ちる）。深さ 1 は末端評価だけなので必ず読み切る。
+# 締め切りはプロセスをまたいで比べるので time.time() で持つ。
+
+_evaluator = None
+
+
+def _init_worker():
+    global _evaluator
+    _evaluator = load_evaluator()
+
+
+def _score_task(p: int, o: int, sq: int, depth: int, deadline: Optional[float]):
+    time_limit = None
+    if deadline is not None:
+        time_limit = deadline - time.time()
+        if time_limit <= 0:
+            return sq, None  # 順番待ちの間に締め切りを過ぎた
+    searcher = Searcher(depth, time_limit, TranspositionTable(14), evaluator=_evaluator)
+    return sq, searcher.score_move(p, o, sq, depth)
+
+
+def hint_pool(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """ヒントの計算に使うプロセスプール（各プロセスがパターン評価の重みを読み込む）
+
+    子プロセスは spawn で起動する（スレッドを持つ Streamlit のプロセスを fork しない）。使い終わったら shutdown() する。
+    """
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker,
+                               mp_context=multiprocessing.get_context("spawn"))
+
+
+def move_scores(executor: ProcessPoolExecutor, p: int, o: int, max_depth: int = 6,
+                budget: float = 1.0) -> tuple[dict, int]:
+    """手番側 p・相手側 o の合法手ごとの評価値 {マス番号: 評価値} と、読み切った深さを返す
+
+    budget（秒）を使い切ったら、そこまでに全部の手を読み切れた一番深い段の値を返す。
+    """
+    moves = list(iter_bits(legal_moves_bb(p, o)))
+    if not moves:
+        return {}, 0
+    deadline = time.time() + budget
+    scores, done = {}, 0
+    for depth in range(1, max_depth + 1):
+        if depth > 1 and time.time() >= deadline:
+            break
+        futures = [executor.submit(_score_task, p, o, sq, depth, None if depth == 1 else deadline)
+                   for sq in moves]
+        results = dict(f.result() for f in futures)
+        if any(s is None for s in results.values()):
+            break
+        scores, done = results, depth
+        if all(abs(s) >= WIN_SCORE for s in scores.values()):
+            break  # どの手も勝敗まで読み切れた
+    return scores, done
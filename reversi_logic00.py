@@ -0,0 +1,599 @@
+import random
+import time
+
+import numpy as np
+
+# ----------------- ビットボード定義 -----------------
+# 盤面を「手番側の石」と「相手の石」の2つの64bit整数で表現する。
+# ビット番号は NumPy 盤面を 1 次元にしたときの添字 (行 * 8 + 列) と一致させる。
+#   reversi02.py           : board[y, x] → ビット番号 y * 8 + x
+#   reversi02_streamlit01.py: board[x, y] → ビット番号 x * 8 + y
+
+EMPTY, BLACK, WHITE = 0, 1, -1
+SIZE = 8
+
+FULL = 0xFFFFFFFFFFFFFFFF
+
+
+def legal_moves_bb(p: int, o: int) -> int:
+    """手番側 p・相手側 o のビットボードから合法手のビットマスクを返す"""
+    empty = ~(p | o) & FULL
+    # 横・右向き: 加算の繰り上がりが相手石の連続を通り抜けて、その先のマスに立つ
+    # （相手石以外のビットは最後に空きマスとの AND で落ちる）
+    om = o & 0x7E7E7E7E7E7E7E7E
+    moves = om + (om & (p << 1))
+    # その他の方向: 相手石の連続を 1, 1, 2, 2 マスずつ伸ばして最大6マス分たどる
+    pre = om & (om >> 1)
+    t = om & (p >> 1)
+    t |= om & (t >> 1)
+    t |= pre & (t >> 2)
+    t |= pre & (t >> 2)
+    moves |= t >> 1
+    # 縦
+    pre = o & (o << 8)
+    t = o & (p << 8)
+    t |= o & (t << 8)
+    t |= pre & (t << 16)
+    t |= pre & (t << 16)
+    moves |= t << 8
+    pre = o & (o >> 8)
+    t = o & (p >> 8)
+    t |= o & (t >> 8)
+    t |= pre & (t >> 16)
+    t |= pre & (t >> 16)
+    moves |= t >> 8
+    # 斜め
+    om = o & 0x007E7E7E7E7E7E00
+    pre = om & (om << 7)
+    t = om & (p << 7)
+    t |= om & (t << 7)
+    t |= pre & (t << 14)
+    t |= pre & (t << 14)
+    moves |= t << 7
+    pre = om & (om >> 7)
+    t = om & (p >> 7)
+    t |= om & (t >> 7)
+    t |= pre & (t >> 14)
+    t |= pre & (t >> 14)
+    moves |= t >> 7
+    pre = om & (om << 9)
+    t = om & (p << 9)
+    t |= om & (t << 9)
+    t |= pre & (t << 18)
+    t |= pre & (t << 18)
+    moves |= t << 9
+    pre = om & (om >> 9)
+    t = om & (p >> 9)
+    t |= om & (t >> 9)
+    t |= pre & (t >> 18)
+    t |= pre & (t >> 18)
+    moves |= t >> 9
+    return moves & empty
+
+
+def flips_bb(p: int, o: int, sq: int) -> int:
+    """マス sq に打ったときに裏返る石のビットマスクを返す（打った石自身は含まない）"""
+    x = 1 << sq
+    flips = 0
+    om = o & 0x7E7E7E7E7E7E7E7E
+    b = x << 1
+    if b & om:
+        f = 0
+        while b & om:
+            f |= b
+            b <<= 1
+        if b & p:
+            flips = f
+    b = x >> 1
+    if b & om:
+        f = 0
+        while b & om:
+            f |= b
+            b >>= 1
+        if b & p:
+            flips |= f
+    b = x << 8
+    if b & o:
+        f = 0
+        while b & o:
+            f |= b
+            b <<= 8
+        if b & p:
+            flips |= f
+    b = x >> 8
+    if b & o:
+        f = 0
+        while b & o:
+            f |= b
+            b >>= 8
+        if b & p:
+            flips |= f
+    om = o & 0x007E7E7E7E7E7E00
+    b = x << 7
+    if b & om:
+        f = 0
+        while b & om:
+            f |= b
+            b <<= 7
+        if b & p:
+            flips |= f
+    b = x >> 7
+    if b & om:
+        f = 0
+        while b & om:
+            f |= b
+            b >>= 7
+        if b & p:
+            flips |= f
+    b = x << 9
+    if b & om:
+        f = 0
+        while b & om:
+            f |= b
+            b <<= 9
+        if b & p:
+            flips |= f
+    b = x >> 9
+    if b & om:
+        f = 0
+        while b & om:
+            f |= b
+            b >>= 9
+        if b & p:
+            flips |= f
+    return flips
+
+
+def play_bb(p: int, o: int, sq: int) -> tuple[int, int]:
+    """sq に打った後の (相手側, 手番側) を返す。次の手番から見た並びになる"""
+    f = flips_bb(p, o, sq)
+    return o ^ f, p | f | (1 << sq)
+
+
+def iter_bits(bb: int):
+    """立っているビットの番号を小さい順に返す"""
+    while bb:
+        lsb = bb & -bb
+        yield lsb.bit_length() - 1
+        bb ^= lsb
+
+
+def init_bitboards() -> tuple[int, int]:
+    """標準の初期配置 (黒, 白) を返す（d5・e4 が黒、d4・e5 が白）"""
+    black = (1 << 28) | (1 << 35)
+    white = (1 << 27) | (1 << 36)
+    return black, white
+
+
+# ----------------- 盤面の対称変換 -----------------
+# 盤面の 8 通りの対称（回転・鏡映）。番号 k のビット 0: 上下反転, 1: 左右反転, 2: 転置
+
+_REVERSE_BITS = bytes(int(f"{i:08b}"[::-1], 2) for i in range(256))
+
+
+def flip_vertical(bb: int) -> int:
+    """上下反転（行の並びを逆にする）"""
+    return int.from_bytes(bb.to_bytes(8, 'little'), 'big')
+
+
+def mirror_horizontal(bb: int) -> int:
+    """左右反転（各行の中で列の並びを逆にする）"""
+    return int.from_bytes(bb.to_bytes(8, 'little').translate(_REVERSE_BITS), 'little')
+
+
+def transpose(bb: int) -> int:
+    """転置（行と列を入れ替える）"""
+    t = 0x0F0F0F0F00000000 & (bb ^ (bb << 28))
+    bb ^= t ^ (t >> 28)
+    t = 0x3333000033330000 & (bb ^ (bb << 14))
+    bb ^= t ^ (t >> 14)
+    t = 0x5500550055005500 & (bb ^ (bb << 7))
+    bb ^= t ^ (t >> 7)
+    return bb & FULL
+
+
+def symmetry(bb: int, k: int) -> int:
+    """8 通りの対称のうち k 番目を適用する"""
+    if k & 1:
+        bb = flip_vertical(bb)
+    if k & 2:
+        bb = mirror_horizontal(bb)
+    if k & 4:
+        bb = transpose(bb)
+    return bb
+
+
+def symmetry_square(sq: int, k: int) -> int:
+    """マス番号に k 番目の対称を適用する"""
+    row, col = sq >> 3, sq & 7
+    if k & 1:
+        row = 7 - row
+    if k & 2:
+        col = 7 - col
+    if k & 4:
+        row, col = col, row
+    return row * 8 + col
+
+
+def inverse_symmetry_square(sq: int, k: int) -> int:
+    """symmetry_square の逆変換"""
+    row, col = sq >> 3, sq & 7
+    if k & 4:
+        row, col = col, row
+    if k & 2:
+        col = 7 - col
+    if k & 1:
+        row = 7 - row
+    return row * 8 + col
+
+
+def canonical(p: int, o: int) -> tuple[int, int, int]:
+    """8 通りの対称のうち (p, o) が最小になるものを代表とし、(p, o, k) を返す"""
+    best = (p, o, 0)
+    for k in range(1, 8):
+        cand = (symmetry(p, k), symmetry(o, k), k)
+        if cand < best:
+            best = cand
+    return best
+
+
+# ----------------- Zobrist ハッシュ -----------------
+# 乱数は固定シードで作るので、同じ局面は実行をまたいでも同じキーになる（定石ファイルのキーもこれで作る）
+_rng = random.Random(20240601)
+ZOBRIST = [[_rng.getrandbits(64) for _ in range(64)] for _ in range(2)]  # [0]: 黒, [1]: 白
+ZOBRIST_FLIP = [ZOBRIST[0][sq] ^ ZOBRIST[1][sq] for sq in range(64)]  # 石の色が反転したときの差分
+ZOBRIST_SIDE = _rng.getrandbits(64)  # 白番のときに XOR する
+
+
+def zobrist_hash(black: int, white: int, white_to_move: bool = False) -> int:
+    """黒・白のビットボードと手番から局面のキーを計算する"""
+    key = ZOBRIST_SIDE if white_to_move else 0
+    for sq in iter_bits(black):
+        key ^= ZOBRIST[0][sq]
+    for sq in iter_bits(white):
+        key ^= ZOBRIST[1][sq]
+    return key
+
+
+def zobrist_update(key: int, color: int, sq: int, flips: int) -> int:
+    """color（0: 黒, 1: 白）が sq に打って flips を裏返した後のキーを差分で求める"""
+    key ^= ZOBRIST[color][sq] ^ ZOBRIST_SIDE
+    while flips:
+        lsb = flips & -flips
+        key ^= ZOBRIST_FLIP[lsb.bit_length() - 1]
+        flips ^= lsb
+    return key
+
+
+# 対称な局面を同じものとして扱うためのキー。8 通りの対称それぞれで局面を変換したときのキーを持ち、
+# 最小のものを代表（正規化したキー）とする。盤面を変換しなくても、表を引く位置を変えるだけで求まる。
+ZOBRIST_SYM = [[[ZOBRIST[c][symmetry_square(sq, k)] for sq in range(64)] for c in range(2)] for k in range(8)]
+ZOBRIST_FLIP_SYM = [[ZOBRIST_FLIP[symmetry_square(sq, k)] for sq in range(64)] for k in range(8)]
+
+
+def symmetric_keys(black: int, white: int, white_to_move: bool = False) -> list[int]:
+    """8 通りの対称のそれぞれで変換した局面のキー（k 番目 = zobrist_hash(symmetry(黒, k), symmetry(白, k))）"""
+    keys = [ZOBRIST_SIDE if white_to_move else 0] * 8
+    for sq in iter_bits(black):
+        keys = [key ^ table[0][sq] for key, table in zip(keys, ZOBRIST_SYM)]
+    for sq in iter_bits(white):
+        keys = [key ^ table[1][sq] for key, table in zip(keys, ZOBRIST_SYM)]
+    return keys
+
+
+def update_symmetric_keys(keys: list[int], color: int, sq: int, flips: int) -> list[int]:
+    """symmetric_keys を、color（0: 黒, 1: 白）が sq に打って flips を裏返した後のものに差分で更新する"""
+    out = []
+    for key, table, flip_table in zip(keys, ZOBRIST_SYM, ZOBRIST_FLIP_SYM):
+        key ^= table[color][sq] ^ ZOBRIST_SIDE
+        f = flips
+        while f:
+            lsb = f & -f
+            key ^= flip_table[lsb.bit_length() - 1]
+            f ^= lsb
+        out.append(key)
+    return out
+
+
+def canonical_key(keys: list[int]) -> tuple[int, int]:
+    """symmetric_keys から (正規化したキー, その対称の番号) を返す"""
+    key = min(keys)
+    return key, keys.index(key)
+
+
+def play_bb_keyed(p: int, o: int, sq: int, color: int, keys: list[int]):
+    """play_bb と同じく打った後の (手番側, 相手側) を返し、あわせて対称ごとのキーも差分で更新する"""
+    f = flips_bb(p, o, sq)
+    return o ^ f, p | f | (1 << sq), update_symmetric_keys(keys, color, sq, f)
+
+
+def inverse_symmetry(bb: int, k: int) -> int:
+    """symmetry の逆変換"""
+    if k & 4:
+        bb = transpose(bb)
+    if k & 2:
+        bb = mirror_horizontal(bb)
+    if k & 1:
+        bb = flip_vertical(bb)
+    return bb
+
+
+# ----------------- NumPy 盤面との変換 -----------------
+
+# 石の値（1 / -1）の下位バイト → "1"（その色の石）/ "0" の変換表
+_CELL_TO_BIT = {
+    color: bytes(ord("1") if i == color & 0xFF else ord("0") for i in range(256))
+    for color in (BLACK, WHITE)
+}
+
+
+# 下位バイトを先頭に置く（リトルエンディアンの）整数の dtype → 1マスのバイト数
+_INT_ITEMSIZE = {np.dtype(t): np.dtype(t).itemsize for t in ("i1", "<i2", "<i4", "<i8", "u1", "<u2", "<u4", "<u8")}
+
+
+def to_bitboards(board, color: int) -> tuple[int, int]:
+    """NumPy 盤面を (color側, 相手側) のビットボードに変換する
+
+    整数の盤面は、各マスの下位バイトを "0"/"1" の文字に置き換えて int(…, 2) で読む。
+    NumPy の比較と packbits を2回ずつ呼ぶより速く、手生成を盤面から呼ぶとき（画面側）の変換の手間が減る。
+    """
+    board = np.asarray(board)
+    color = int(color)
+    itemsize = _INT_ITEMSIZE.get(board.dtype)
+    if itemsize is not None and color in _CELL_TO_BIT:
+        # 下位バイトを マス 63 → 0 の順に（後ろから1マスおきに）取り出すと、そのまま2進数の上位桁からになる
+        cells = board.tobytes()[-itemsize::-itemsize]
+        return int(cells.translate(_CELL_TO_BIT[color]), 2), int(cells.translate(_CELL_TO_BIT[-color]), 2)
+    flat = board.reshape(SIZE * SIZE)
+    p = int.from_bytes(np.packbits(flat == color, bitorder='little').tobytes(), 'little')
+    o = int.from_bytes(np.packbits(flat == -color, bitorder='little').tobytes(), 'little')
+    return p, o
+
+
+def bits_to_mask(bb: int) -> np.ndarray:
+    """ビットボードを 8x8 の bool 配列に変換する"""
+    bytes_ = np.frombuffer(bb.to_bytes(8, 'little'), dtype=np.uint8)
+    return np.unpackbits(bytes_, bitorder='little').astype(bool).reshape(SIZE, SIZE)
+
+
+def _place(board, sq: int, color: int):
+    p, o = to_bitboards(board, color)
+    f = flips_bb(p, o, sq)
+    # 変わるマス（1次元の添字）にだけ書く。8x8 の bool 配列を作ってマスクで書くより速い
+    board.put(list(iter_bits(f | (1 << sq))), color)
+    return board
+
+
+# 合法手のマスクを1行（8ビット）ずつ表で引いて手のリストにする。[行][その行のビット] → その行の手の並び
+_ROW_MOVES_YX = [[[(col, row) for col in range(SIZE) if bits >> col & 1] for bits in range(256)] for row in range(SIZE)]
+_ROW_MOVES_XY = [[[(row, col) for col in range(SIZE) if bits >> col & 1] for bits in range(256)] for row in range(SIZE)]
+
+
+def _move_list(moves: int, table) -> list[tuple[int, int]]:
+    """合法手のマスクをマス番号の小さい順の手のリストにする"""
+    out = []
+    for row, bits in enumerate(moves.to_bytes(8, 'little')):
+        if bits:
+            out += table[row][bits]
+    return out
+
+
+# reversi02.py 用: board[y, x] で参照し、手は (x, y) で表す
+def valid_moves_yx(board, color: int) -> list[tuple[int, int]]:
+    """board[y, x] 形式の盤面で合法手 (x, y) のリストを返す（y 優先・x 昇順）"""
+    p, o = to_bitboards(board, color)
+    return _move_list(legal_moves_bb(p, o), _ROW_MOVES_YX)
+
+
+def place_stone_yx(board, x: int, y: int, color: int):
+    """board[y, x] 形式の盤面に石を置き、挟んだ石を裏返す（盤面をその場で更新）"""
+    return _place(board, y * SIZE + x, color)
+
+
+# reversi02_streamlit01.py 用: board[x, y] で参照し、手は (x, y) で表す
+def valid_moves_xy(board, player: int) -> list[tuple[int, int]]:
+    """board[x, y] 形式の盤面で合法手 (x, y) のリストを返す"""
+    p, o = to_bitboards(board, player)
+    return _move_list(legal_moves_bb(p, o), _ROW_MOVES_XY)
+
+
+def place_stone_xy(board, x: int, y: int, player: int):
+    """board[x, y] 形式の盤面に石を置き、挟んだ石を裏返す（盤面をその場で更新）"""
+    return _place(board, x * SIZE + y, player)
+
+
+# ----------------- perft（手生成の検証・計測） -----------------
+
+# 初期局面からの perft の既知の値（パスも1手と数える。公開されているオセロの perft 表と同じ）
+PERFT = {1: 4, 2: 12, 3: 56, 4: 244, 5: 1396, 6: 8200, 7: 55092, 8: 390216, 9: 3005288,
+         10: 24571284, 11: 212258800}
+
+def perft(p: int, o: int, depth: int) -> int:
+    """depth 手先までの局面数を数える。パスも1手として数え、終局した局面は葉とする"""
+    if depth == 0:
+        return 1
+    moves = legal_moves_bb(p, o)
+    if not moves:
+        if not legal_moves_bb(o, p):
+            return 1
+        return perft(o, p, depth - 1)
+    if depth == 1:
+        return moves.bit_count()
+    nodes = 0
+    while moves:
+        lsb = moves & -moves
+        moves ^= lsb
+        f = flips_bb(p, o, lsb.bit_length() - 1)
+        nodes += perft(o ^ f, p | f | lsb, depth - 1)
+    return nodes
+
+
+# 比較用: reversi02.py の従来実装（64マス × 8方向を NumPy の要素参照で調べる）
+_DIRS = [(dx, dy) for dx in [-1, 0, 1] for dy in [-1, 0, 1] if not (dx == 0 and dy == 0)]
+
+
+def _inside(x, y):
+    return 0 <= x < SIZE and 0 <= y < SIZE
+
+
+def _valid_moves_array(board, color):
+    moves = []
+    for y in range(SIZE):
+        for x in range(SIZE):
+            if board[y, x] != EMPTY:
+                continue
+            for dx, dy in _DIRS:
+                nx, ny = x + dx, y + dy
+                found = False
+                while _inside(nx, ny) and board[ny, nx] == -color:
+                    found = True
+                    nx += dx
+                    ny += dy
+                if found and _inside(nx, ny) and board[ny, nx] == color:
+                    moves.append((x, y))
+                    break
+    return moves
+
+
+def _place_stone_array(board, x, y, color):
+    board[y, x] = color
+    for dx, dy in _DIRS:
+        nx, ny = x + dx, y + dy
+        flips = []
+        while _inside(nx, ny) and board[ny, nx] == -color:
+            flips.append((nx, ny))
+            nx += dx
+            ny += dy
+        if _inside(nx, ny) and board[ny, nx] == color:
+            for fx, fy in flips:
+                board[fy, fx] = color
+
+
+def _perft_array(board, color, depth):
+    if depth == 0:
+        return 1
+    moves = _valid_moves_array(board, color)
+    if not moves:
+        if not _valid_moves_array(board, -color):
+            return 1
+        return _perft_array(board, -color, depth - 1)
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for x, y in moves:
+        child = board.copy()
+        _place_stone_array(child, x, y, color)
+        nodes += _perft_array(child, -color, depth - 1)
+    return nodes
+
+
+def init_board_yx():
+    """reversi02.py と同じ配置の NumPy 盤面を返す"""
+    board = np.zeros((SIZE, SIZE), dtype=int)
+    board[3, 3], board[4, 4] = WHITE, WHITE
+    board[3, 4], board[4, 3] = BLACK, BLACK
+    return board
+
+
+def _corpus(depth):
+    """初期局面から depth 手までの全局面 (盤面, 手番) を集める"""
+    positions = [(init_board_yx(), BLACK)]
+    frontier = positions
+    for _ in range(depth):
+        nxt = []
+        for board, color in frontier:
+            for x, y in _valid_moves_array(board, color):
+                child = board.copy()
+                _place_stone_array(child, x, y, color)
+                nxt.append((child, -color))
+        positions += nxt
+        frontier = nxt
+    return positions
+
+
+def _best_of(fn, repeat):
+    """fn() を repeat 回実行して (最短の秒数, 結果) を返す"""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    import argparse
+    import reversi_batch00
+
+    parser = argparse.ArgumentParser(description="ビットボード perft ベンチマーク")
+    parser.add_argument("--depth", type=int, default=9, help="ビットボード版の perft 深さ")
+    parser.add_argument("--batch-depth", type=int, default=10, help="一括版（reversi_batch00）の perft 深さ")
+    parser.add_argument("--array-depth", type=int, default=7, help="従来版の perft 深さ")
+    parser.add_argument("--corpus-depth", type=int, default=5, help="手生成の計測に使う局面の手数")
+    parser.add_argument("--repeat", type=int, default=3, help="各計測の繰り返し回数（最良値を使う）")
+    args = parser.parse_args()
+
+    board = init_board_yx()
+    black, white = to_bitboards(board, BLACK)
+    assert (black, white) == init_bitboards()
+
+    # 1) perft: 既知の局面数（PERFT）・従来版と一致することを確認しつつ、1秒あたりの局面数を比較
+    array_sec, array_nodes = _best_of(lambda: _perft_array(board, BLACK, args.array_depth), 1)
+    assert perft(black, white, args.array_depth) == array_nodes
+    bb_sec, nodes = _best_of(lambda: perft(black, white, args.depth), args.repeat)
+    batch_sec, batch_nodes = _best_of(lambda: reversi_batch00.perft(black, white, args.batch_depth), args.repeat)
+    assert reversi_batch00.perft(black, white, args.depth) == nodes
+    for depth, n in ((args.array_depth, array_nodes), (args.depth, nodes), (args.batch_depth, batch_nodes)):
+        assert depth not in PERFT or n == PERFT[depth], f"perft({depth}) = {n:,}（既知の値は {PERFT[depth]:,}）"
+
+    array_nps = array_nodes / array_sec
+    print(f"array    perft({args.array_depth:>2}) = {array_nodes:>11,}  {array_sec:8.3f}s  {array_nps:13,.0f} nodes/s")
+    for name, depth, n, sec in (("bitboard", args.depth, nodes, bb_sec),
+                                ("batch   ", args.batch_depth, batch_nodes, batch_sec)):
+        print(f"{name} perft({depth:>2}) = {n:>11,}  {sec:8.3f}s  {n / sec:13,.0f} nodes/s"
+              f"  ({n / sec / array_nps:,.1f}x)")
+    checked = [d for d in (args.array_depth, args.depth, args.batch_depth) if d in PERFT]
+    print(f"perft: 既知の値と一致（深さ {', '.join(map(str, sorted(set(checked))))}）")
+
+    # 2) 手生成: 同じ局面集合で1秒あたりに生成できる合法手の数を比較
+    #    ビットボード同士 / 画面側の入口（NumPy 盤面 → 合法手のリスト）/ 一括版
+    corpus = _corpus(args.corpus_depth)
+    bbs = [to_bitboards(b, c) for b, c in corpus]
+    packed = reversi_batch00.pack(np.stack([b for b, _ in corpus]), np.array([c for _, c in corpus]))
+    array_sec, array_lists = _best_of(lambda: [_valid_moves_array(b, c) for b, c in corpus], args.repeat)
+    array_moves = sum(map(len, array_lists))
+    speedups = []
+    sec, masks = _best_of(lambda: [legal_moves_bb(p, o) for p, o in bbs], args.repeat * 5)
+    assert sum(map(int.bit_count, masks)) == array_moves
+    speedups.append(("movegen bitboard", array_sec / sec))
+    sec, lists = _best_of(lambda: [valid_moves_yx(b, c) for b, c in corpus], args.repeat * 5)
+    assert lists == array_lists
+    speedups.append(("movegen valid_moves_yx", array_sec / sec))
+    sec, batch = _best_of(lambda: reversi_batch00.legal_moves(*packed), args.repeat * 5)
+    assert int(np.bitwise_count(batch).sum()) == array_moves
+    speedups.append(("movegen batch", array_sec / sec))
+    print(f"array          movegen: {array_moves / array_sec:13,.0f} moves/s ({len(corpus):,} positions)")
+    for name, speedup in speedups:
+        print(f"{name[8:]:<14} movegen: {array_moves / array_sec * speedup:13,.0f} moves/s  ({speedup:,.1f}x)")
+
+    # 3) 石を置く（裏返す）: 画面側の入口 place_stone_yx を従来版と比べる
+    plays = [(b, c, x, y) for (b, c), moves in zip(corpus, array_lists) for x, y in moves]
+    array_sec, _ = _best_of(lambda: [_place_stone_array(b.copy(), x, y, c) for b, c, x, y in plays], args.repeat)
+    sec, placed = _best_of(lambda: [place_stone_yx(b.copy(), x, y, c) for b, c, x, y in plays], args.repeat)
+    for (b, c, x, y), after in zip(plays, placed):
+        old = b.copy()
+        _place_stone_array(old, x, y, c)
+        assert (old == after).all()
+    speedups.append(("flip place_stone_yx", array_sec / sec))
+    print(f"array          flip   : {len(plays) / array_sec:13,.0f} moves/s")
+    print(f"place_stone_yx flip   : {len(plays) / sec:13,.0f} moves/s  ({array_sec / sec:,.1f}x)")
+
+    # 目標（従来版の 50 倍）に届いた経路と届かない経路を分けて示す。画面側が呼ぶのは 1局面ずつの
+    # valid_moves_* / place_stone_* で、一括版（reversi_batch00）はまだ使っていない。place_stone は従来版も
+    # 打ったマスから 8 方向を見るだけなので、ビットボードにしても数倍にしかならない
+    speedups[:0] = [("perft bitboard", nodes / bb_sec / array_nps), ("perft batch", batch_nodes / batch_sec / array_nps)]
+    print("50x 以上: " + ", ".join(name for name, x in speedups if x >= 50))
+    print("50x 未満: " + ", ".join(f"{name} ({x:.1f}x)" for name, x in speedups if x < 50))
+
+if __name__ == "__main__":
+    main()
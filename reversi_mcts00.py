@@ -0,0 +1,199 @@
+import argparse
+import math
+import multiprocessing
+import os
+import time
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from reversi_logic00 import legal_moves_bb, flips_bb, init_bitboards, to_bitboards
+from reversi_batch00 import playout
+
+# ----------------- モンテカルロ木探索（UCT） -----------------
+# 葉を batch_leaves 個選んでから、それぞれ playouts_per_leaf 回のランダム対局を reversi_batch00 で
+# まとめて1回の NumPy 計算として打つ。選んでいる途中の経路には先に訪問回数だけを足しておき
+# （仮想損失）、同じ葉ばかり選ばないようにする。
+# workers > 1 ならルート並列化: 各プロセスが別々のシードで木を作り、ルートの子の訪問回数を合計する。
+
+PASS = -1
+UCT_C = 1.4
+
+
+class Node:
+    __slots__ = ("p", "o", "move", "parent", "children", "untried", "visits", "wins")
+
+    def __init__(self, p, o, move=None, parent=None):
+        self.p, self.o = p, o  # この局面の手番側・相手側
+        self.move = move  # 親からこの局面へ来た手（PASS はパス）
+        self.parent = parent
+        self.children = []
+        moves = legal_moves_bb(p, o)
+        if moves:
+            self.untried = [sq for sq in range(64) if moves >> sq & 1]
+        elif legal_moves_bb(o, p):
+            self.untried = [PASS]
+        else:
+            self.untried = []  # 終局
+        self.visits = 0
+        self.wins = 0.0  # 親の手番側（この局面へ打った側）から見た勝ち数（引き分けは 0.5）
+
+    def expand(self, rng):
+        move = self.untried.pop(rng.integers(len(self.untried)))
+        if move == PASS:
+            child = Node(self.o, self.p, PASS, self)
+        else:
+            f = flips_bb(self.p, self.o, move)
+            child = Node(self.o ^ f, self.p | f | (1 << move), move, self)
+        self.children.append(child)
+        return child
+
+    def select(self):
+        log_n = math.log(self.visits)
+        return max(self.children, key=lambda c: c.wins / c.visits + UCT_C * math.sqrt(log_n / c.visits))
+
+
+class MCTSResult(NamedTuple):
+    move: Optional[int]  # 最善手のマス番号（打てる手がなければ None）
+    win_rate: float  # 最善手の勝率（手番側から見た推定）
+    playouts: int  # ランダム対局の回数（全プロセスの合計）
+    visits: dict  # ルートの各手の訪問回数
+
+
+def _score(diff):
+    """最終石差を手番側から見た勝ち点（勝ち 1, 引き分け 0.5, 負け 0）にする"""
+    return (np.sign(diff) + 1) / 2
+
+
+def search_tree(p: int, o: int, playouts: Optional[int] = None, time_ms: Optional[float] = None,
+                batch_leaves: int = 16, playouts_per_leaf: int = 8, seed: Optional[int] = None):
+    """1プロセス分の UCT 探索。ルートの子ごとの {手: (訪問回数, 勝ち数)} と打ったランダム対局の数を返す"""
+    rng = np.random.default_rng(seed)
+    root = Node(p, o)
+    deadline = None if time_ms is None else time.perf_counter() + time_ms / 1000
+    done = 0
+    while (playouts is None or done < playouts) and (deadline is None or time.perf_counter() < deadline):
+        leaves = []
+        for _ in range(batch_leaves):
+            node = root
+            while not node.untried and node.children:
+                node = node.select()
+            if node.untried:
+                node = node.expand(rng)
+            # 仮想損失: 結果が出る前に訪問回数だけ足す
+            n = node
+            while n is not None:
+                n.visits += playouts_per_leaf
+                n = n.parent
+            leaves.append(node)
+
+        ps = np.repeat(np.array([leaf.p for leaf in leaves], dtype=np.uint64), playouts_per_leaf)
+        os_ = np.repeat(np.array([leaf.o for leaf in leaves], dtype=np.uint64), playouts_per_leaf)
+        # 葉の手番側から見た勝ち点。終局している葉はランダム対局でも石差がそのまま返る
+        scores = _score(playout(ps, os_, rng)).reshape(len(leaves), playouts_per_leaf).sum(axis=1)
+        for leaf, score in zip(leaves, scores):
+            w = playouts_per_leaf - float(score)  # 葉へ打った側から見た勝ち点
+            n = leaf
+            while n is not None:
+                n.wins += w
+                w = playouts_per_leaf - w
+                n = n.parent
+        done += len(leaves) * playouts_per_leaf
+    return {c.move: (c.visits, c.wins) for c in root.children}, done
+
+
+def _search_worker(args):
+    return search_tree(*args)
+
+
+class MCTS:
+    """UCT による AI。playouts（ランダム対局の回数）か time_ms（ミリ秒）で思考量を決める
+
+    workers > 1 ならプロセスを使ったルート並列化で、各プロセスがそれぞれの予算で木を作る。
+    プロセスプールは最初の探索（か start()）で作って使い回すので、使い終わったら close() する。
+    context には multiprocessing.get_context(...) を渡すとその起動方法でプロセスを作る（None なら既定の方法）。
+    """
+
+    def __init__(self, playouts: Optional[int] = 2000, time_ms: Optional[float] = None, workers: int = 1,
+                 batch_leaves: int = 16, playouts_per_leaf: int = 8, seed: Optional[int] = None, context=None):
+        if playouts is None and time_ms is None:
+            raise ValueError("playouts か time_ms のどちらかを指定してください")
+        self.playouts = playouts
+        self.time_ms = time_ms
+        self.workers = workers
+        self.batch_leaves = batch_leaves
+        self.playouts_per_leaf = playouts_per_leaf
+        self.rng = np.random.default_rng(seed)
+        self.pool = None
+        self.context = context if context is not None else multiprocessing
+
+    def start(self):
+        """プロセスプールを今すぐ作る（GUI などを作る前にプロセスを起動しておきたいとき）"""
+        if self.workers > 1 and self.pool is None:
+            self.pool = self.context.Pool(self.workers)
+        return self
+
+    def search(self, p: int, o: int) -> MCTSResult:
+        """手番側 p・相手側 o の局面の最善手を返す"""
+        moves = legal_moves_bb(p, o)
+        if not moves:
+            return MCTSResult(None, 0.0, 0, {})
+        if moves & (moves - 1) == 0:
+            return MCTSResult(moves.bit_length() - 1, 0.0, 0, {})  # 1手しかない
+
+        seeds = self.rng.integers(2 ** 32, size=self.workers).tolist()
+        tasks = [(p, o, self.playouts, self.time_ms, self.batch_leaves, self.playouts_per_leaf, s) for s in seeds]
+        if self.workers == 1:
+            results = [search_tree(*tasks[0])]
+        else:
+            results = self.start().pool.map(_search_worker, tasks)
+
+        visits, wins = {}, {}
+        total = 0
+        for stats, done in results:
+            total += done
+            for move, (v, w) in stats.items():
+                visits[move] = visits.get(move, 0) + v
+                wins[move] = wins.get(move, 0.0) + w
+        move = max(visits, key=visits.get)
+        return MCTSResult(move, wins[move] / visits[move], total, visits)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def mcts_move(board, color: int, mcts: MCTS) -> Optional[int]:
+    """NumPy 盤面で color（1: 黒, -1: 白）の手を MCTS で選び、マス番号を返す（best_move と同じ形）"""
+    return mcts.search(*to_bitboards(board, color)).move
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MCTS の思考速度（ランダム対局/秒）を計る")
+    parser.add_argument("--playouts", type=int, default=20000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count()])
+    parser.add_argument("--batch-leaves", type=int, default=16)
+    parser.add_argument("--playouts-per-leaf", type=int, default=8)
+    args = parser.parse_args()
+
+    p, o = init_bitboards()
+    for workers in args.workers:
+        with MCTS(args.playouts, None, workers, args.batch_leaves, args.playouts_per_leaf, seed=0) as mcts:
+            mcts.search(p, o)  # プロセスの起動を計測に含めない
+            t0 = time.perf_counter()
+            result = mcts.search(p, o)
+            sec = time.perf_counter() - t0
+        print(f"workers {workers:>3}: {result.playouts:>8} playouts  {sec:6.2f}s  "
+              f"{result.playouts / sec:10,.0f} playouts/s  move {result.move}  win {result.win_rate:.3f}")
+
+
+if __name__ == "__main__":
+    main()
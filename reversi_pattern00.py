@@ -0,0 +1,320 @@
+import argparse
+import os
+import random
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from reversi_logic00 import legal_moves_bb, flips_bb, iter_bits, init_bitboards, transpose, symmetry_square
+from reversi_ai00 import Searcher, TranspositionTable
+from reversi_batch00 import legal_moves as batch_legal_moves
+
+# ----------------- パターン評価関数 -----------------
+# 辺・隅・斜めなどのマスの並び（パターン）ごとに、各マスの状態（空き 0, 手番側 1, 相手側 2）を
+# 3 進数の添字にして重みの表を引き、その合計を評価値（手番側から見た最終石差の予測）とする。
+# 対称な位置にあるパターンは同じ表を使う。表は進行度（石の数）ごとに PHASES 枚ある。
+#
+# 添字はマス1つずつではなく、パターンのマスを1バイトに集めてから 256 要素の表で一度に求める。
+#   - 横1列: 行をそのまま取り出す
+#   - 縦1列: 転置した盤面の行を取り出す
+#   - 斜め: 列がすべて異なるので、0x0101010101010101 を掛けると最上位バイトに集まる
+#   - 隅の 2x4: 上の行を 4 ビットずらして足し、隣り合う 2 つの 4 ビットを1バイトにする
+# パターンのほかに、着手可能数の差（-32 〜 32）ごとの重みも同じように表で引く。
+WEIGHTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reversi_pattern.npy")
+PATTERNS = (
+    ("edge", (0, 1, 2, 3, 4, 5, 6, 7)),
+    ("line2", (8, 9, 10, 11, 12, 13, 14, 15)),
+    ("line3", (16, 17, 18, 19, 20, 21, 22, 23)),
+    ("line4", (24, 25, 26, 27, 28, 29, 30, 31)),
+    ("diag8", (0, 9, 18, 27, 36, 45, 54, 63)),
+    ("diag7", (1, 10, 19, 28, 37, 46, 55)),
+    ("diag6", (2, 11, 20, 29, 38, 47)),
+    ("diag5", (3, 12, 21, 30, 39)),
+    ("diag4", (4, 13, 22, 31)),
+    ("corner", (0, 1, 2, 3, 8, 9, 10, 11)),
+)
+TABLE_SIZE = 3 ** 8  # 1パターンの表の大きさ（8マスまで）
+MOBILITY_RANGE = 32  # 着手可能数の差はこの範囲に丸める
+PHASES = 4  # 進行度の区切り数
+SCALE = 32  # 重みの単位（1石 = 32）
+
+
+def phase(discs: int) -> int:
+    """盤上の石の数から進行度（0 〜 PHASES - 1）を求める"""
+    return min((discs - 4) * PHASES // 60, PHASES - 1)
+
+
+def _extractor(squares):
+    """パターンのマスを1バイトに集める方法 (転置するか, マスク, 掛ける数, 右シフト) を決める"""
+    rows = {sq >> 3 for sq in squares}
+    cols = {sq & 7 for sq in squares}
+    transposed = False
+    if len(cols) == 1 or len(rows) == 4 and len(cols) == 2:
+        # 縦1列・縦長の 2x4 は転置して横向きにする
+        squares = [(sq & 7) * 8 + (sq >> 3) for sq in squares]
+        rows, cols = cols, rows
+        transposed = True
+    mask = sum(1 << sq for sq in squares)
+    if len(rows) == 1:
+        return transposed, mask, 1, min(rows) * 8
+    if len(cols) == len(squares):
+        return transposed, mask, 0x0101010101010101, 56
+    return transposed, mask, 17, min(rows) * 8 + min(cols) + 4
+
+
+def _extract(bb, mask, mul, shift):
+    return ((bb & mask) * mul >> shift) & 0xFF
+
+
+def _instances():
+    """全パターンの配置を (転置するか, マスク, 掛ける数, 右シフト, 手番側の表, 相手側の表) で返す
+
+    手番側の表には重みの表全体の中での位置（パターンの番号 * TABLE_SIZE）も足してある。
+    """
+    instances = []
+    for g, (_, base) in enumerate(PATTERNS):
+        seen = set()
+        for k in range(8):
+            squares = tuple(symmetry_square(sq, k) for sq in base)
+            if frozenset(squares) in seen:
+                continue
+            seen.add(frozenset(squares))
+            transposed, mask, mul, shift = _extractor(squares)
+            # バイトの各ビットがパターンの何番目のマスかを、1マスだけの盤面で確かめる
+            digit = [0] * 8
+            for i, sq in enumerate(squares):
+                bit = transpose(1 << sq) if transposed else 1 << sq
+                byte = _extract(bit, mask, mul, shift)
+                assert byte.bit_count() == 1
+                digit[byte.bit_length() - 1] = 3 ** i
+            base3 = [sum(d for b, d in enumerate(digit) if byte >> b & 1) for byte in range(256)]
+            lut_p = [g * TABLE_SIZE + v for v in base3]
+            lut_o = [2 * v for v in base3]
+            instances.append((transposed, mask, mul, shift, lut_p, lut_o))
+    return instances
+
+
+INSTANCES = _instances()
+MOBILITY_OFFSET = len(PATTERNS) * TABLE_SIZE + MOBILITY_RANGE  # 着手可能数の差 0 の重みの位置
+N_WEIGHTS = len(PATTERNS) * TABLE_SIZE + 2 * MOBILITY_RANGE + 1  # 進行度1つ分の重みの数
+
+
+class PatternEvaluator:
+    """パターンの重みの表を読み込み、評価値を表引きの合計で求める
+
+    Searcher(evaluator=...) にそのまま渡せる（手番側 p・相手側 o → 評価値）。
+    """
+
+    def __init__(self, weights):
+        weights = np.asarray(weights)
+        if weights.shape != (PHASES, N_WEIGHTS):
+            raise ValueError(f"重みの形が違います: {weights.shape}")
+        # 1要素ずつ引くので Python のリストにしておく（NumPy 配列の要素アクセスより速い）
+        self.tables = weights.tolist()
+        normal = [inst[1:] for inst in INSTANCES if not inst[0]]
+        transposed = [inst[1:] for inst in INSTANCES if inst[0]]
+        self.normal, self.transposed = normal, transposed
+
+    @classmethod
+    def load(cls, path: str = WEIGHTS_FILE):
+        return cls(np.load(path))
+
+    def __call__(self, p: int, o: int) -> int:
+        w = self.tables[phase((p | o).bit_count())]
+        score = 0
+        for mask, mul, shift, lut_p, lut_o in self.normal:
+            score += w[lut_p[((p & mask) * mul >> shift) & 0xFF] + lut_o[((o & mask) * mul >> shift) & 0xFF]]
+        mobility = legal_moves_bb(p, o).bit_count() - legal_moves_bb(o, p).bit_count()
+        score += w[MOBILITY_OFFSET + max(-MOBILITY_RANGE, min(MOBILITY_RANGE, mobility))]
+        p, o = transpose(p), transpose(o)
+        for mask, mul, shift, lut_p, lut_o in self.transposed:
+            score += w[lut_p[((p & mask) * mul >> shift) & 0xFF] + lut_o[((o & mask) * mul >> shift) & 0xFF]]
+        return score
+
+
+def load_evaluator(path: str = WEIGHTS_FILE):
+    """重みのファイルがあれば PatternEvaluator を、なければ None を返す"""
+    if not os.path.exists(path):
+        return None
+    return PatternEvaluator.load(path)
+
+
+# ----------------- 学習用の添字（NumPy で一括計算） -----------------
+
+def _transpose_np(bb):
+    """reversi_logic00.transpose の uint64 配列版"""
+    for mask, s in ((0x0F0F0F0F00000000, 28), (0x3333000033330000, 14), (0x5500550055005500, 7)):
+        mask, s = np.uint64(mask), np.uint64(s)
+        t = mask & (bb ^ (bb << s))
+        bb = bb ^ t ^ (t >> s)
+    return bb
+
+
+def feature_indices(p, o):
+    """(手番側, 相手側) の uint64 配列から、各局面で引く重みの添字 (N, パターン配置数 + 1) を求める
+
+    添字は進行度を含めた通し番号（phase * N_WEIGHTS + 表の中の位置）。最後の列は着手可能数の差。
+    """
+    p = np.asarray(p, dtype=np.uint64)
+    o = np.asarray(o, dtype=np.uint64)
+    boards = {False: (p, o), True: (_transpose_np(p), _transpose_np(o))}
+    discs = np.bitwise_count(p | o).astype(np.int64)
+    base = np.minimum((discs - 4) * PHASES // 60, PHASES - 1) * N_WEIGHTS
+    columns = []
+    for transposed, mask, mul, shift, lut_p, lut_o in INSTANCES:
+        x, y = boards[transposed]
+        mask, mul, shift = np.uint64(mask), np.uint64(mul), np.uint64(shift)
+        bx = ((x & mask) * mul >> shift) & np.uint64(0xFF)
+        by = ((y & mask) * mul >> shift) & np.uint64(0xFF)
+        columns.append(base + np.asarray(lut_p)[bx] + np.asarray(lut_o)[by])
+    mobility = (np.bitwise_count(batch_legal_moves(p, o)).astype(np.int64)
+                - np.bitwise_count(batch_legal_moves(o, p)).astype(np.int64))
+    columns.append(base + MOBILITY_OFFSET + np.clip(mobility, -MOBILITY_RANGE, MOBILITY_RANGE))
+    return np.stack(columns, axis=1)
+
+
+# ----------------- 自己対戦 -----------------
+
+_selfplay = {}
+
+
+def _init_worker(depth, opening_plies, epsilon, weights):
+    _selfplay.update(depth=depth, opening_plies=opening_plies, epsilon=epsilon,
+                     evaluator=None if weights is None else PatternEvaluator.load(weights))
+
+
+def play_selfplay_game(seed: int):
+    """1局を自己対戦し、各局面の (手番側, 相手側, 手番側から見た最終石差) のリストを返す
+
+    序盤の 0 〜 opening_plies 手はランダムに打ち、その後も epsilon の確率でランダムな手を混ぜて局面を散らす。
+    ランダムな手より前の局面は最終石差がその局面の良し悪しを表さないので、最後のランダムな手の後の局面だけを返す。
+    """
+    rng = random.Random(seed)
+    searcher = Searcher(_selfplay["depth"], None, TranspositionTable(14), endgame_empties=8,
+                        evaluator=_selfplay["evaluator"])
+    random_plies = rng.randint(0, _selfplay["opening_plies"])
+    p, o = init_bitboards()
+    positions = []  # (手番側, 相手側, 手番の色)
+    side = 0
+    plies = 0
+    passed = False
+    while True:
+        moves = legal_moves_bb(p, o)
+        if not moves:
+            if passed:
+                break
+            passed = True
+        else:
+            passed = False
+            if plies < random_plies or rng.random() < _selfplay["epsilon"]:
+                sq = rng.choice(list(iter_bits(moves)))
+                positions.clear()
+            else:
+                positions.append((p, o, side))
+                sq = searcher.search(p, o, side).move
+            f = flips_bb(p, o, sq)
+            p, o = p | f | (1 << sq), o ^ f
+            plies += 1
+        p, o = o, p
+        side ^= 1
+    diff = p.bit_count() - o.bit_count()  # 最後の手番側から見た石差
+    return [(pp, oo, diff if s == side else -diff) for pp, oo, s in positions]
+
+
+def selfplay(path: str, games: int, depth: int, opening_plies: int, epsilon: float, seed: int, workers: int,
+             weights=None):
+    t0 = time.perf_counter()
+    ps, os_, diffs = [], [], []
+    seeds = [seed * 1_000_003 + i for i in range(games)]
+    with Pool(workers, _init_worker, (depth, opening_plies, epsilon, weights)) as pool:
+        for i, positions in enumerate(pool.imap_unordered(play_selfplay_game, seeds, chunksize=4), 1):
+            for p, o, d in positions:
+                ps.append(p)
+                os_.append(o)
+                diffs.append(d)
+            if i % 500 == 0:
+                print(f"  {i}/{games} games  {len(diffs)} positions  {time.perf_counter() - t0:.1f}s")
+    np.savez_compressed(path, p=np.array(ps, dtype=np.uint64), o=np.array(os_, dtype=np.uint64),
+                        diff=np.array(diffs, dtype=np.int8))
+    print(f"wrote {len(diffs)} positions from {games} games to {path} ({time.perf_counter() - t0:.1f}s)")
+
+
+# ----------------- 学習 -----------------
+
+def train(p, o, diff, iterations: int = 100, l2: float = 1.0):
+    """最小二乗（リッジ回帰）で重みを求め、(PHASES, N_WEIGHTS) の float 配列を返す
+
+    特徴は「引く重みの添字が立つ」0/1 の疎な行列 A なので、A や A^T を作らずに
+    A w は添字での合計、A^T r は bincount で求め、共役勾配法（CGLS）で解く。
+    """
+    idx = feature_indices(p, o)
+    k = idx.shape[1]
+    flat = idx.ravel()
+    size = PHASES * N_WEIGHTS
+    y = np.asarray(diff, dtype=np.float64)
+
+    def a_t(r):
+        return np.bincount(flat, weights=np.repeat(r, k), minlength=size)
+
+    w = np.zeros(size)
+    r = y.copy()
+    s = a_t(r)
+    d = s.copy()
+    gamma = s @ s
+    for it in range(1, iterations + 1):
+        q = d[idx].sum(axis=1)
+        alpha = gamma / (q @ q + l2 * (d @ d))
+        w += alpha * d
+        r -= alpha * q
+        s = a_t(r) - l2 * w
+        gamma, gamma_old = s @ s, gamma
+        d = s + (gamma / gamma_old) * d
+        if it % 10 == 0 or it == iterations:
+            print(f"  iteration {it:4d}  rmse {np.sqrt(np.mean(r ** 2)):.3f} discs")
+    return w.reshape(PHASES, N_WEIGHTS)
+
+
+def save_weights(path: str, w):
+    """重みを SCALE 倍した int16 の .npy に保存する"""
+    table = np.clip(np.rint(w * SCALE), -32768, 32767).astype(np.int16)
+    np.save(path, table)
+    print(f"wrote {path} ({os.path.getsize(path) / 1024:.0f} KiB, {np.count_nonzero(table)} nonzero weights)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="パターン評価関数の自己対戦データ作成と学習")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sp = sub.add_parser("selfplay", help="自己対戦で学習用の局面を作る")
+    sp.add_argument("--games", type=int, default=5000)
+    sp.add_argument("--depth", type=int, default=2)
+    sp.add_argument("--opening-plies", type=int, default=16, help="序盤にランダムに打つ手数の上限")
+    sp.add_argument("--epsilon", type=float, default=0.0, help="途中でランダムな手を打つ確率")
+    sp.add_argument("--weights", help="対局の評価にこのパターンの重みを使う（省略時は reversi_ai00.evaluate）")
+    sp.add_argument("--seed", type=int, default=0)
+    sp.add_argument("--workers", type=int, default=os.cpu_count())
+    sp.add_argument("--output", default="reversi_selfplay.npz")
+    tp = sub.add_parser("train", help="自己対戦の局面から重みを学習する")
+    tp.add_argument("data", nargs="+", help="selfplay で作った .npz")
+    tp.add_argument("--iterations", type=int, default=100)
+    tp.add_argument("--l2", type=float, default=1.0, help="リッジ回帰の正則化の強さ")
+    tp.add_argument("--output", default=WEIGHTS_FILE)
+    args = parser.parse_args()
+
+    if args.command == "selfplay":
+        selfplay(args.output, args.games, args.depth, args.opening_plies, args.epsilon, args.seed, args.workers,
+                 args.weights)
+    else:
+        data = [np.load(path) for path in args.data]
+        p = np.concatenate([d["p"] for d in data])
+        o = np.concatenate([d["o"] for d in data])
+        diff = np.concatenate([d["diff"] for d in data])
+        print(f"training on {len(diff)} positions, {len(INSTANCES)} pattern instances")
+        t0 = time.perf_counter()
+        w = train(p, o, diff, args.iterations, args.l2)
+        print(f"trained in {time.perf_counter() - t0:.1f}s")
+        save_weights(args.output, w)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+import argparse
+import contextlib
+import json
+import mmap
+import os
+import random
+import sys
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from reversi_logic00 import legal_moves_bb, flips_bb, iter_bits, init_bitboards
+import reversi_batch00 as batch
+from reversi_ai00 import Searcher, TranspositionTable, WIN_SCORE, final_score
+from reversi_pattern00 import PatternEvaluator, SCALE
+
+# ----------------- 棋譜ファイル -----------------
+# 8 バイトのマジックのあとに、対局ごとに「手数 (uint8) + 1手1バイトのマス番号」を追記していく。
+# 対局はすべて初期配置（黒 28・35、白 27・36、黒番）から始まり、パスは記録しない
+# （打てる手がなければ再生時に自動でパスとする）。途中で書き込みが切れた最後の対局は読み飛ばす。
+RECORD_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reversi_games.rvg")
+RECORD_MAGIC = b"RVGAME01"
+
+
+class GameWriter:
+    """棋譜ファイルに対局を追記する（ファイルがなければマジックを書いて作る）
+
+    バッファを通さず（buffering=0）、1局ごとに O_APPEND の write を1回だけ呼ぶ。
+    """
+
+    def __init__(self, path: str = RECORD_FILE):
+        self.f = open(path, "ab", buffering=0)
+        if self.f.tell() == 0:
+            self.f.write(RECORD_MAGIC)
+
+    def write(self, moves):
+        """1局分のマス番号の並びを追記する"""
+        moves = bytes(moves)
+        if len(moves) > 60:
+            raise ValueError(f"手数が多すぎます: {len(moves)}")
+        # 1局を O_APPEND の write 1回で書くので、複数のプロセスから追記しても対局が混ざらない
+        self.f.write(bytes((len(moves),)) + moves)
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def append_game(moves, path: str = RECORD_FILE):
+    """1局だけ追記する簡易窓口"""
+    with GameWriter(path) as writer:
+        writer.write(moves)
+
+
+@contextlib.contextmanager
+def _open_archive(path):
+    """棋譜ファイルを mmap で開く（with を抜けると閉じる）"""
+    with open(path, "rb") as f:
+        if f.read(len(RECORD_MAGIC)) != RECORD_MAGIC:
+            raise ValueError(f"棋譜ファイルではありません: {path}")
+        if os.fstat(f.fileno()).st_size == len(RECORD_MAGIC):
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data
+
+
+def read_games(path: str = RECORD_FILE, start: int = len(RECORD_MAGIC), end: int = None):
+    """棋譜ファイルの start 〜 end バイトにある対局を bytes で1局ずつ返す"""
+    with _open_archive(path) as data:
+        end = len(data) if end is None else min(end, len(data))
+        pos = start
+        while pos < end:
+            n = data[pos]
+            if pos + 1 + n > len(data):
+                break  # 書き込み途中の対局
+            yield data[pos + 1:pos + 1 + n]
+            pos += 1 + n
+
+
+def chunk_ranges(path: str, games_per_chunk: int):
+    """棋譜ファイルを games_per_chunk 局ずつの (開始位置, 終了位置) に区切る（手数のバイトだけを読む）"""
+    with _open_archive(path) as data:
+        size = len(data)
+        pos = start = len(RECORD_MAGIC)
+        count = 0
+        while pos < size:
+            pos += 1 + data[pos]
+            count += 1
+            if count == games_per_chunk:
+                yield start, pos
+                start, count = pos, 0
+        if count:
+            yield start, pos
+
+
+# ----------------- 再生 -----------------
+
+def replay(moves):
+    """棋譜を再生し、各手の前の (手番側, 相手側, 手番の色 0: 黒 1: 白, 打った手) を返す
+
+    不正な手があれば ValueError を送出する。
+    """
+    p, o = init_bitboards()
+    color = 0
+    for ply, sq in enumerate(moves):
+        legal = legal_moves_bb(p, o)
+        if not legal:
+            p, o, color = o, p, color ^ 1  # パス
+            legal = legal_moves_bb(p, o)
+        if not legal >> sq & 1:
+            raise ValueError(f"{ply + 1} 手目の {sq} は打てません")
+        yield p, o, color, sq
+        f = flips_bb(p, o, sq)
+        p, o, color = o ^ f, p | f | (1 << sq), color ^ 1
+
+
+def batch_replay(games):
+    """複数の棋譜を NumPy でまとめて1手ずつ再生する
+
+    (各手の前の手番側の着手可能数 (N, 60)、黒の石数 (N,)、白の石数 (N,)、不正な手を含むか (N,)) を返す。
+    """
+    n = len(games)
+    lengths = np.array([len(g) for g in games], dtype=np.int64)
+    moves = np.full((n, 60), -1, dtype=np.int64)
+    for i, g in enumerate(games):
+        moves[i, :len(g)] = np.frombuffer(g, dtype=np.uint8)
+    black, white = init_bitboards()
+    p = np.full(n, black, dtype=np.uint64)
+    o = np.full(n, white, dtype=np.uint64)
+    white_to_move = np.zeros(n, dtype=bool)
+    mobility = np.zeros((n, 60), dtype=np.int8)
+    illegal = np.zeros(n, dtype=bool)
+    for ply in range(int(lengths.max(initial=0))):
+        active = ply < lengths
+        legal = batch.legal_moves(p, o)
+        passed = active & (legal == 0)
+        p, o = np.where(passed, o, p), np.where(passed, p, o)
+        white_to_move ^= passed
+        legal = np.where(passed, batch.legal_moves(p, o), legal)
+        squares = np.where(active, moves[:, ply], -1)
+        illegal |= active & ((legal & batch._move_bits(squares)) == 0)
+        mobility[:, ply] = np.where(active, np.bitwise_count(legal), 0)
+        p2, o2, _ = batch.play(p, o, squares)
+        p, o = np.where(active, o2, p), np.where(active, p2, o)
+        white_to_move ^= active
+    black, white = np.where(white_to_move, o, p), np.where(white_to_move, p, o)
+    return mobility, np.bitwise_count(black), np.bitwise_count(white), illegal
+
+
+# ----------------- 解析 -----------------
+
+class BlunderCheck:
+    """打った手が最善手より何石損かを探索で見積もる（評価はパターン評価）
+
+    最善手は depth + 1 手、打った手はその後の局面を depth 手読むので、どちらも同じ深さまで見ている。
+    """
+
+    def __init__(self, depth: int, evaluator=None):
+        evaluator = evaluator if evaluator is not None else PatternEvaluator.load()
+        tt = TranspositionTable(16)
+        self.root = Searcher(depth + 1, None, tt, endgame_empties=10, evaluator=evaluator)
+        self.child = Searcher(depth, None, tt, endgame_empties=10, evaluator=evaluator)
+
+    def _value(self, p, o, color):
+        """手番側から見た局面の評価値（パスと終局も扱う）"""
+        if legal_moves_bb(p, o):
+            return self.child.search(p, o, color).score
+        if legal_moves_bb(o, p):
+            return -self.child.search(o, p, color ^ 1).score
+        return final_score(p, o)
+
+    def loss(self, p, o, color, sq):
+        """(最善手, 損失の石数) を返す"""
+        best = self.root.search(p, o, color)
+        if best.move == sq:
+            return sq, 0
+        f = flips_bb(p, o, sq)
+        played = -self._value(o ^ f, p | f | (1 << sq), color ^ 1)
+        return best.move, max(0, _to_discs(best.score) - _to_discs(played))
+
+
+def _to_discs(score: int) -> int:
+    """評価値（パターン評価の SCALE 倍、終局は WIN_SCORE 付き）をおおよその石差に直す"""
+    if score >= WIN_SCORE:
+        return 64 + score - WIN_SCORE
+    if score <= -WIN_SCORE:
+        return -64 + score + WIN_SCORE
+    return round(score / SCALE)
+
+
+def _stats(plies, black, white, mobility, blunders):
+    return {
+        "plies": plies,
+        "black": black,
+        "white": white,
+        "winner": "black" if black > white else "white" if white > black else "draw",
+        "mobility": mobility,
+        "blunders": blunders,
+    }
+
+
+def analyze_game(moves, check=None, blunder: int = 8):
+    """1局の統計を dict で返す
+
+    mobility: 各手の前の手番側の着手可能数
+    blunders: check（BlunderCheck）を渡すと、最善手より blunder 石以上損をした手の (手数, 打った手, 最善手, 損失)
+    """
+    mobility = []
+    blunders = []
+    black, white = init_bitboards()
+    for ply, (p, o, color, sq) in enumerate(replay(moves), 1):
+        mobility.append(legal_moves_bb(p, o).bit_count())
+        if check is not None and mobility[-1] > 1:
+            best, loss = check.loss(p, o, color, sq)
+            if loss >= blunder:
+                blunders.append((ply, sq, best, loss))
+        f = flips_bb(p, o, sq)
+        p, o = p | f | (1 << sq), o ^ f
+        black, white = (p, o) if color == 0 else (o, p)
+    return _stats(len(moves), black.bit_count(), white.bit_count(), mobility, blunders)
+
+
+_analysis = {}
+
+
+def _init_worker(path, depth, blunder):
+    _analysis.update(path=path, blunder=blunder, check=BlunderCheck(depth) if depth else None)
+
+
+def _analyze_chunk(chunk):
+    start, end = chunk
+    games = list(read_games(_analysis["path"], start, end))
+    if _analysis["check"] is None:
+        # 探索しないときは、チャンク内の対局をまとめて NumPy で再生する
+        mobility, black, white, illegal = batch_replay(games)
+        return [{"error": "不正な手があります"} if illegal[i] else
+                _stats(len(g), int(black[i]), int(white[i]), mobility[i, :len(g)].tolist(), [])
+                for i, g in enumerate(games)]
+    results = []
+    for moves in games:
+        try:
+            results.append(analyze_game(moves, _analysis["check"], _analysis["blunder"]))
+        except ValueError as e:
+            results.append({"error": str(e)})
+    return results
+
+
+def analyze_archive(path: str, depth: int, blunder: int, workers: int, chunk: int):
+    """棋譜ファイル全体をプロセスプールで解析し、対局ごとの結果をファイル内の順に1局ずつ返す"""
+    with Pool(workers, _init_worker, (path, depth, blunder)) as pool:
+        for results in pool.imap(_analyze_chunk, chunk_ranges(path, chunk)):
+            yield from results
+
+
+# ----------------- 棋譜の作成（ランダム対局） -----------------
+
+def random_game(rng):
+    """両者ランダムに打った1局の棋譜を返す"""
+    p, o = init_bitboards()
+    moves = bytearray()
+    passed = False
+    while True:
+        legal = legal_moves_bb(p, o)
+        if not legal:
+            if passed:
+                return bytes(moves)
+            passed = True
+        else:
+            passed = False
+            sq = rng.choice(list(iter_bits(legal)))
+            f = flips_bb(p, o, sq)
+            p, o = p | f | (1 << sq), o ^ f
+            moves.append(sq)
+        p, o = o, p
+
+
+def main():
+    parser = argparse.ArgumentParser(description="リバーシの棋譜ファイルの作成と一括解析")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rp = sub.add_parser("random", help="ランダム対局の棋譜を追記する（解析の動作確認・計測用）")
+    rp.add_argument("path")
+    rp.add_argument("--games", type=int, default=10000)
+    rp.add_argument("--seed", type=int, default=0)
+    ap = sub.add_parser("analyze", help="棋譜ファイルを解析し、対局ごとの統計を JSON Lines で出力する")
+    ap.add_argument("path", nargs="?", default=RECORD_FILE)
+    ap.add_argument("--depth", type=int, default=2, help="悪手判定の読みの深さ（0 なら探索しない）")
+    ap.add_argument("--blunder", type=int, default=8, help="最善手よりこの石数以上損した手を悪手とする")
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
+    ap.add_argument("--chunk", type=int, default=2000, help="1回にワーカーへ渡す対局数")
+    ap.add_argument("--output", help="出力先（省略時は標準出力）")
+    args = parser.parse_args()
+
+    if args.command == "random":
+        rng = random.Random(args.seed)
+        t0 = time.perf_counter()
+        with GameWriter(args.path) as writer:
+            for _ in range(args.games):
+                writer.write(random_game(rng))
+        print(f"appended {args.games} games to {args.path} ({time.perf_counter() - t0:.1f}s)")
+        return
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    t0 = time.perf_counter()
+    games = black_wins = white_wins = blunders = errors = 0
+    try:
+        for stats in analyze_archive(args.path, args.depth, args.blunder, args.workers, args.chunk):
+            out.write(json.dumps(stats) + "\n")
+            games += 1
+            if "error" in stats:
+                errors += 1
+                continue
+            black_wins += stats["winner"] == "black"
+            white_wins += stats["winner"] == "white"
+            blunders += len(stats["blunders"])
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - t0
+    print(f"{games} games  black {black_wins} / white {white_wins} / draw {games - black_wins - white_wins - errors}  "
+          f"{blunders} blunders  {errors} errors  {elapsed:.1f}s  {games / elapsed:,.0f} games/s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
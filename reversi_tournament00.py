@@ -0,0 +1,233 @@
+import argparse
+import json
+import math
+import os
+import random
+import struct
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from reversi_logic00 import legal_moves_bb, flips_bb, iter_bits, init_bitboards
+from reversi_ai00 import Searcher, TranspositionTable
+from reversi_pattern00 import PatternEvaluator
+from reversi_record00 import GameWriter
+from reversi_mcts00 import MCTS
+
+# ----------------- 対局エンジン -----------------
+# "random"              : reversi02_streamlit01.py の元の AI（合法手からランダム）
+# "greedy"              : reversi02.py の元の AI（裏返る石が最も多い手）
+# "alphabeta:深さ[:秒]" : reversi_ai00 のアルファベータ探索（石の位置と着手可能数による評価）
+# "pattern:深さ[:秒]"   : 同じ探索で、評価に reversi_pattern00 のパターン評価を使う（両フロントエンドの現在の AI）
+# "mcts:回数" / "mcts:ミリ秒ms" : reversi_mcts00 の UCT（ランダム対局の回数か思考時間）。
+#                         対局自体をプロセスで並列に回すので、ここでは1プロセスで探索する
+
+
+def random_move(p, o, rng):
+    return rng.choice(list(iter_bits(legal_moves_bb(p, o))))
+
+
+def greedy_move(p, o, rng):
+    best, max_flips = None, -1
+    for sq in iter_bits(legal_moves_bb(p, o)):
+        n = flips_bb(p, o, sq).bit_count()
+        if n > max_flips:
+            best, max_flips = sq, n
+    return best
+
+
+def make_engine(spec: str):
+    """エンジン指定文字列から (p, o, color, rng) → マス番号 の関数を作る"""
+    name, *params = spec.split(":")
+    if name == "random":
+        return lambda p, o, color, rng: random_move(p, o, rng)
+    if name == "greedy":
+        return lambda p, o, color, rng: greedy_move(p, o, rng)
+    if name in ("alphabeta", "pattern"):
+        depth = int(params[0]) if params else 4
+        time_limit = float(params[1]) if len(params) > 1 else None
+        evaluator = PatternEvaluator.load() if name == "pattern" else None
+        searcher = Searcher(depth, time_limit, TranspositionTable(16), evaluator=evaluator)
+        return lambda p, o, color, rng: searcher.search(p, o, color).move
+    if name == "mcts":
+        budget = params[0] if params else "2000"
+        if budget.endswith("ms"):
+            mcts = MCTS(playouts=None, time_ms=float(budget[:-2]))
+        else:
+            mcts = MCTS(playouts=int(budget))
+
+        def mcts_engine(p, o, color, rng):
+            mcts.rng = np.random.default_rng(rng.getrandbits(32))
+            return mcts.search(p, o).move
+        return mcts_engine
+    raise ValueError(f"未知のエンジン: {spec}")
+
+
+# ----------------- 対局 -----------------
+# 対局ログは 8 バイト固定長のレコードを追記する
+#   対局番号 (uint32), A が黒番か (uint8), 黒の石数 (uint8), 白の石数 (uint8), 手数 (uint8)
+LOG_MAGIC = b"RVT1"
+RECORD = struct.Struct("<IBBBB")
+
+_engines = {}
+
+
+def _init_worker(spec_a, spec_b):
+    _engines["a"] = make_engine(spec_a)
+    _engines["b"] = make_engine(spec_b)
+
+
+def play_game(game_id: int, seed: int, opening_plies: int):
+    """1局を最後まで打って (対局番号, A が黒番か, 黒の石数, 白の石数, 手数, 棋譜) を返す
+
+    同じ seed の2局（対局番号が 2k と 2k+1）は同じランダム序盤から先後を入れ替えて打つ。
+    """
+    rng = random.Random(seed * 1_000_003 + game_id // 2)
+    a_is_black = game_id % 2 == 0
+    players = (_engines["a"], _engines["b"]) if a_is_black else (_engines["b"], _engines["a"])
+
+    p, o = init_bitboards()
+    color = 0  # 0: 黒番, 1: 白番
+    plies = 0
+    record = bytearray()
+    passed = False
+    while True:
+        moves = legal_moves_bb(p, o)
+        if not moves:
+            if passed:
+                break
+            passed = True
+        else:
+            passed = False
+            if plies < opening_plies:
+                sq = random_move(p, o, rng)
+            else:
+                sq = players[color](p, o, color, rng)
+            f = flips_bb(p, o, sq)
+            p, o = p | f | (1 << sq), o ^ f
+            record.append(sq)
+            plies += 1
+        p, o = o, p
+        color ^= 1
+    black, white = (p, o) if color == 0 else (o, p)
+    return game_id, int(a_is_black), black.bit_count(), white.bit_count(), plies, bytes(record)
+
+
+def _play(args):
+    return play_game(*args)
+
+
+def read_log(path):
+    """対局ログを読み込み (メタ情報, レコードのリスト) を返す"""
+    with open(path, "rb") as f:
+        if f.read(4) != LOG_MAGIC:
+            raise ValueError(f"対局ログではありません: {path}")
+        (meta_len,) = struct.unpack("<H", f.read(2))
+        meta = json.loads(f.read(meta_len))
+        data = f.read()
+    usable = len(data) - len(data) % RECORD.size
+    return meta, list(RECORD.iter_unpack(data[:usable]))
+
+
+# ----------------- 集計 -----------------
+
+Z_95 = 1.96  # 95% 信頼区間の z 値
+
+
+def elo_from_score(score: float) -> float:
+    """期待得点率から Elo 差を求める"""
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+def summarize(records):
+    """A から見た勝ち・負け・引き分け、得点率、Elo 差とその 95% 信頼区間を返す"""
+    wins = losses = draws = 0
+    for _, a_is_black, black, white, _ in records:
+        diff = (black - white) if a_is_black else (white - black)
+        if diff > 0:
+            wins += 1
+        elif diff < 0:
+            losses += 1
+        else:
+            draws += 1
+    n = wins + losses + draws
+    if n == 0:
+        return None
+    score = (wins + 0.5 * draws) / n
+    # 得点率の区間は Wilson の方法で求める（全勝・全敗でも幅が 0 にならない）。
+    # p(1 - p) の代わりに1局ごとの得点 (1, 0.5, 0) の分散を使い、引き分けの分だけ区間を狭める
+    var = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / n
+    z2 = Z_95 ** 2
+    center = (score + z2 / (2 * n)) / (1 + z2 / n)
+    half = Z_95 * math.sqrt(var / n + z2 / (4 * n * n)) / (1 + z2 / n)
+    lo, hi = max(center - half, 0.0), min(center + half, 1.0)
+    return {
+        "games": n,
+        "wins": wins,
+        "losses": losses,
+        "draws": draws,
+        "score": score,
+        "score_ci": (lo, hi),
+        "elo": elo_from_score(score),
+        "elo_ci": (elo_from_score(lo), elo_from_score(hi)),
+    }
+
+
+def format_summary(spec_a, spec_b, s, elapsed):
+    """summarize の結果を1行にする（まだ1局も終わっていなければ s は None）"""
+    if s is None:
+        return f"{spec_a} vs {spec_b}: 0 games"
+    lo, hi = s["score_ci"]
+    elo_lo, elo_hi = s["elo_ci"]
+    return (
+        f"{spec_a} vs {spec_b}: {s['games']} games  "
+        f"+{s['wins']} -{s['losses']} ={s['draws']}  "
+        f"score {s['score']:.3f} [{lo:.3f}, {hi:.3f}]  "
+        f"Elo {s['elo']:+.0f} [{elo_lo:+.0f}, {elo_hi:+.0f}]  "
+        f"{s['games'] / elapsed:.1f} games/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="リバーシ AI 同士の自己対戦トーナメント")
+    parser.add_argument("engine_a", help='例: "pattern:4", "alphabeta:4", "mcts:2000", "mcts:500ms", "greedy", "random"')
+    parser.add_argument("engine_b")
+    parser.add_argument("--games", type=int, default=1000, help="対局数（先後入れ替えのため偶数に切り上げ）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--opening-plies", type=int, default=4, help="序盤にランダムに打つ手数")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--log", default="tournament.rvt", help="対局ログの出力先")
+    parser.add_argument("--record", help="棋譜を追記する reversi_record00 形式のファイル")
+    parser.add_argument("--report-every", type=int, default=100)
+    args = parser.parse_args()
+
+    games = args.games + args.games % 2
+    meta = json.dumps({
+        "engine_a": args.engine_a, "engine_b": args.engine_b,
+        "seed": args.seed, "opening_plies": args.opening_plies,
+    }).encode()
+    tasks = [(i, args.seed, args.opening_plies) for i in range(games)]
+
+    records = []
+    writer = GameWriter(args.record) if args.record else None
+    t0 = time.perf_counter()
+    with open(args.log, "wb") as log, Pool(args.workers, _init_worker, (args.engine_a, args.engine_b)) as pool:
+        log.write(LOG_MAGIC + struct.pack("<H", len(meta)) + meta)
+        for *rec, moves in pool.imap_unordered(_play, tasks, chunksize=max(1, games // (args.workers * 16))):
+            log.write(RECORD.pack(*rec))
+            if writer is not None:
+                writer.write(moves)
+            records.append(rec)
+            if len(records) % args.report_every == 0:
+                log.flush()
+                print(format_summary(args.engine_a, args.engine_b, summarize(records), time.perf_counter() - t0))
+    if writer is not None:
+        writer.close()
+    elapsed = time.perf_counter() - t0
+    print(format_summary(args.engine_a, args.engine_b, summarize(records), elapsed))
+
+
+if __name__ == "__main__":
+    main()
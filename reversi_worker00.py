@@ -0,0 +1,178 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from reversi_logic00 import to_bitboards, legal_moves_bb, flips_bb, iter_bits, place_stone_xy
+from reversi_ai00 import Searcher, TranspositionTable, ENDGAME_EMPTIES, evaluate
+from reversi_cache00 import PositionCache, board_bitboards
+
+# ----------------- バックグラウンド思考 -----------------
+# Streamlit の再実行スレッドを止めないように、AI の探索を別スレッドで走らせる。
+# セッションごとに AIWorker を1つ持ち、同時に考えるのは1手だけにする。
+# 結果はスレッドからセッションの状態を書き換えずに AIJob に残し、画面側が次の再実行で取りに来る。
+
+
+class AIJob:
+    """バックグラウンドで考えている1手
+
+    cancel() で探索を打ち切ると、そこまでに読み切った深さの最善手が結果になる。
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor, board, color: int, depth: int,
+                 time_limit: Optional[float], tt: Optional[TranspositionTable], book,
+                 endgame_empties: int, evaluator=None):
+        self.stop_event = threading.Event()
+        self.searcher = Searcher(depth, time_limit, tt, endgame_empties, self.stop_event, evaluator)
+        self.from_book = False
+        self.started = time.perf_counter()
+        self.future = executor.submit(self._run, board.copy(), color, book)
+
+    def _run(self, board, color, book) -> Optional[int]:
+        p, o = to_bitboards(board, color)
+        if book is not None:
+            sq = book.move(p, o)
+            if sq is not None:
+                self.from_book = True
+                return sq
+        side = 0 if color == 1 else 1
+        if self.cancelled():
+            # 順番待ちの間に打ち切られた: 手番を飛ばさないよう、1手読みの最善手だけは打つ
+            return Searcher(1, None, self.searcher.tt, 0, None, self.searcher.evaluate).search(p, o, side).move
+        # 探索中に打ち切られても、Searcher は読み切った深さの最善手（1手も読めていなければ最初の合法手）を返す
+        return self.searcher.search(p, o, side).move
+
+    def cancel(self):
+        self.stop_event.set()
+
+    def cancelled(self) -> bool:
+        return self.stop_event.is_set()
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self) -> Optional[int]:
+        """最善手のマス番号（打てる手がなければ None）。考え終わるまで待つ
+
+        打ち切った手でも、打てる手がある限り合法手を返す（None になるのはパスのときだけ）。
+        """
+        return self.future.result()
+
+    def progress(self) -> tuple[int, int, float]:
+        """(読み切った深さ, 探索したノード数, 経過秒数) を返す"""
+        depth, nodes = self.searcher.progress()
+        return depth, nodes, time.perf_counter() - self.started
+
+
+class AIWorker:
+    """セッションごとの思考スレッド（1本）"""
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reversi-ai")
+        self.job: Optional[AIJob] = None
+
+    def submit(self, board, color: int, depth: int = 6, time_limit: Optional[float] = None,
+               tt: Optional[TranspositionTable] = None, book=None,
+               endgame_empties: int = ENDGAME_EMPTIES, evaluator=None) -> AIJob:
+        """board の局面で color の手を考え始める。考え中の手があれば打ち切る"""
+        self.cancel()
+        self.job = AIJob(self.executor, board, color, depth, time_limit, tt, book, endgame_empties, evaluator)
+        return self.job
+
+    def adopt(self, job: AIJob) -> AIJob:
+        """別の場所（先読み）で考え始めていた手を、この思考スレッドの手として引き継ぐ"""
+        self.cancel()
+        self.job = job
+        return job
+
+    def cancel(self):
+        """考え中の手を打ち切って捨てる"""
+        if self.job is not None:
+            self.job.cancel()
+            self.job = None
+
+    @property
+    def thinking(self) -> bool:
+        return self.job is not None
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False)
+
+
+# ----------------- 先読み（ポンダー） -----------------
+# プレイヤーが考えている間に、プレイヤーの候補手それぞれに対する AI の応手を別スレッドで順に考えておく。
+# 考え終わった応手はセッションごとの PositionCache に入れ、プレイヤーが打った時点でまだ考え中なら
+# その AIJob を AIWorker に引き継ぐ（最初から考え直さない）。
+
+
+class Ponderer:
+    """セッションごとの先読みスレッド（1本）
+
+    候補手は AI から見て評価の低い順（プレイヤーにとって良さそうな順）に考える。
+    """
+
+    def __init__(self, maxsize: int = 1000):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reversi-ponder")
+        self.cache = PositionCache(maxsize)
+        self.tts: dict = {}  # tag → TranspositionTable（条件ごとに評価関数が違うので置換表も分ける）
+        self.jobs: dict = {}  # (黒, 白) → AIJob
+        self.position = None  # 先読みしている局面と条件
+
+    def start(self, board, player: int, depth: int = 6, time_limit: Optional[float] = None, book=None,
+              endgame_empties: int = ENDGAME_EMPTIES, evaluator=None, tag=None,
+              tt: Optional[TranspositionTable] = None):
+        """player が board で打つ各候補手の後の局面で、相手 (-player) の応手を考え始める
+
+        同じ局面・同じ条件で先読み中なら何もしない。tt を渡さなければ tag ごとの置換表を使う
+        （引き継いだ AIJob はこの置換表のまま AIWorker で考え続ける）。
+        """
+        position = (board_bitboards(board), player, tag)
+        if position == self.position:
+            return
+        self.cancel()
+        self.position = position
+        if tt is None:
+            tt = self.tts.setdefault(tag, TranspositionTable())
+        score = evaluator if evaluator is not None else evaluate
+        p, o = to_bitboards(board, player)
+        candidates = []
+        for sq in iter_bits(legal_moves_bb(p, o)):
+            f = flips_bb(p, o, sq)
+            candidates.append((score(o ^ f, p | f | (1 << sq)), sq))
+        candidates.sort()
+        for _, sq in candidates:
+            after = place_stone_xy(board.copy(), sq // 8, sq % 8, player)
+            key = board_bitboards(after)
+            if self.cache.peek_best_move(*key, -player == -1, tag) is not None:
+                continue
+            job = AIJob(self.executor, after, -player, depth, time_limit, tt, book, endgame_empties, evaluator)
+            job.future.add_done_callback(lambda _, job=job, key=key: self._store(job, key, -player, tag))
+            self.jobs[key] = job
+
+    def _store(self, job: AIJob, key, color: int, tag):
+        if not job.cancelled():
+            # 途中で打ち切った手は浅い読みの結果なので入れない
+            self.cache.store_best_move(*key, color == -1, job.result(), tag)
+
+    def lookup(self, board, color: int, tag=None) -> Optional[int]:
+        """board で color の応手を考え終わっていれば、そのマス番号を返す（なければ None）"""
+        return self.cache.peek_best_move(*board_bitboards(board), color == -1, tag)
+
+    def take(self, board) -> Optional[AIJob]:
+        """board の応手を考え中（または順番待ち）なら、その AIJob を先読みから外して返す"""
+        job = self.jobs.pop(board_bitboards(board), None)
+        if job is None or job.cancelled():
+            return None
+        return job
+
+    def cancel(self):
+        """先読みを打ち切る（考え終わった応手はキャッシュに残す）"""
+        for job in self.jobs.values():
+            job.cancel()
+        self.jobs = {}
+        self.position = None
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False)
@@ -1,34 +1,47 @@
 import streamlit as st
 
+from tic_tac_toe_table00 import load_table, POW3, MARKS, WINNER, VALUE, MOVE, X_WINS, O_WINS, DRAW
+
 # --- 1. 初期設定 ---
-# 勝利のパターン (インデックス 0-8)
-WINNING_LINES = [
-    (0, 1, 2), (3, 4, 5), (6, 7, 8),  # 行
-    (0, 3, 6), (1, 4, 7), (2, 5, 8),  # 列
-    (0, 4, 8), (2, 4, 6)  # 対角線
-]
+# 勝敗・最善手は tic_tac_toe_table00 の完全解析表（盤面番号で引く）を使う
+WINNER_NAMES = {X_WINS: 'X', O_WINS: 'O', DRAW: 'Draw'}
+
+
+@st.cache_resource
+def get_table():
+    """完全解析表を読み込む（全セッションで共有）"""
+    return load_table()
 
 
 def initialize_game():
     """ゲームの状態を初期化/リセットする"""
     if 'board' not in st.session_state or st.session_state.game_over:
         st.session_state.board = [''] * 9  # 9マスのリスト
+        st.session_state.index = 0  # 盤面番号（解析表の列）
         st.session_state.current_player = 'X'
         st.session_state.game_over = False
         st.session_state.winner = None
 
 
-def check_winner(board):
-    """ボードの状態を確認し、勝者または引き分けを判定する"""
-    for line in WINNING_LINES:
-        if board[line[0]] == board[line[1]] == board[line[2]] and board[line[0]] != '':
-            return board[line[0]]  # 勝者 (例: 'X' または 'O')
+def check_winner(state):
+    """盤面番号から勝者 ('X' / 'O')、引き分け ('Draw')、まだ決まっていない (None) を返す"""
+    return WINNER_NAMES.get(int(get_table()[WINNER, state]))
 
-    # 引き分け判定 (空きマスがない場合)
-    if '' not in board:
-        return 'Draw'
 
-    return None  # まだ勝敗は決まっていない
+def place_mark(index):
+    """手番のマークを置き、勝敗判定と手番の交代をする"""
+    mark = st.session_state.current_player
+    st.session_state.board[index] = mark
+    st.session_state.index += MARKS[mark] * POW3[index]
+
+    # 勝敗判定
+    winner = check_winner(st.session_state.index)
+    if winner:
+        st.session_state.winner = winner
+        st.session_state.game_over = True
+    else:
+        # プレイヤーを交代
+        st.session_state.current_player = 'O' if mark == 'X' else 'X'
 
 
 # --- 2. クリック時の処理 ---
@@ -38,17 +51,11 @@ def handle_click(index):
         # ゲーム終了後、または既にマークがあるマスはクリックできない
         return
 
-    # ボードを更新
-    st.session_state.board[index] = st.session_state.current_player
+    place_mark(index)
 
-    # 勝敗判定
-    winner = check_winner(st.session_state.board)
-    if winner:
-        st.session_state.winner = winner
-        st.session_state.game_over = True
-    else:
-        # プレイヤーを交代
-        st.session_state.current_player = 'O' if st.session_state.current_player == 'X' else 'X'
+    # CPU 対戦なら、続けて CPU (O) が最善手を打つ
+    if st.session_state.vs_cpu and not st.session_state.game_over:
+        place_mark(int(get_table()[MOVE, st.session_state.index]))
 
 
 # --- 3. UIの構築とメインロジック ---
@@ -60,6 +67,12 @@ st.title("✖️🅾️ マルバツゲーム (Streamlit)")
 # ゲームの初期化/リセット
 initialize_game()
 
+# 対戦相手（CPU は解析表の最善手を打つので負けない）
+# CPU は必ず O を持つので、切り替えは盤面が空のとき（X の手番）だけにする
+st.session_state.vs_cpu = st.toggle("CPU (O) と対戦する", value=st.session_state.get("vs_cpu", False),
+                                    disabled=st.session_state.index != 0,
+                                    help="対局中は切り替えられません。新しいゲームを始めてから切り替えてください。")
+
 # ボードの描画 (3x3)
 # StreamlitではCSSを使わないため、ボタンのサイズやフォントサイズは制限があります。
 # 添付画像のように大きなフォントにするには、ボタンのラベルとして大きな文字を使います。
@@ -92,6 +105,14 @@ for i in range(3):
             )
 
 # --- 4. 結果の表示 ---
+if not st.session_state.game_over:
+    # 形勢（両者が最善を尽くした場合の結果）
+    value = int(get_table()[VALUE, st.session_state.index])
+    player = st.session_state.current_player
+    other = 'O' if player == 'X' else 'X'
+    outlook = {1: f"{player}の勝ち", 0: "引き分け", -1: f"{other}の勝ち"}[value]
+    st.caption(f"手番: {player} / 形勢: 最善を尽くせば{outlook}")
+
 if st.session_state.game_over:
     if st.session_state.winner == 'Draw':
         st.info("✋ 引き分けです！")
@@ -0,0 +1,127 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+# ----------------- マルバツの完全解析表 -----------------
+# 盤面は各マスを 0: 空き, 1: X, 2: O とした 3 進数（マス i の桁が 3**i）で番号を付ける。
+# 表は3行 × 3**9 列の int8 で、盤面番号の列に
+#   WINNER: 勝者（0: まだ決まっていない, 1: X, 2: O, 3: 引き分け）
+#   VALUE : 手番側から見た最善の結果（1: 勝ち, 0: 引き分け, -1: 負け）
+#   MOVE  : 最善手のマス番号（終局なら -1）
+# を持つ。初期局面から届かない盤面は UNREACHABLE。手番は X と O の数から決まる（X が先手）。
+
+TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tic_tac_toe_table.npy")
+
+WINNING_LINES = [
+    (0, 1, 2), (3, 4, 5), (6, 7, 8),  # 行
+    (0, 3, 6), (1, 4, 7), (2, 5, 8),  # 列
+    (0, 4, 8), (2, 4, 6)  # 対角線
+]
+POW3 = [3 ** i for i in range(9)]
+N_STATES = 3 ** 9
+WINNER, VALUE, MOVE = 0, 1, 2
+UNREACHABLE = -128
+MARKS = {'': 0, 'X': 1, 'O': 2}
+NO_WINNER, X_WINS, O_WINS, DRAW = 0, 1, 2, 3
+
+
+def digits(index: int) -> list[int]:
+    """盤面番号を各マスの値（0: 空き, 1: X, 2: O）のリストに戻す"""
+    return [index // POW3[i] % 3 for i in range(9)]
+
+
+def board_index(board) -> int:
+    """'' / 'X' / 'O' のリスト（9マス）の盤面番号"""
+    return sum(MARKS[mark] * POW3[i] for i, mark in enumerate(board))
+
+
+def to_move(index: int) -> int:
+    """手番（1: X, 2: O）"""
+    cells = digits(index)
+    return 1 if cells.count(1) == cells.count(2) else 2
+
+
+def _winner(cells) -> int:
+    for a, b, c in WINNING_LINES:
+        if cells[a] != 0 and cells[a] == cells[b] == cells[c]:
+            return cells[a]
+    return DRAW if 0 not in cells else NO_WINNER
+
+
+def build_table() -> np.ndarray:
+    """初期局面から届く全盤面を列挙し、終局から逆向きに（後退解析で）勝敗と最善手を決める"""
+    # 前向きに手数ごとの盤面を列挙する
+    layers = [[0]]
+    winner = {0: NO_WINNER}
+    for ply in range(9):
+        mark = 1 if ply % 2 == 0 else 2
+        following = set()
+        for index in layers[-1]:
+            if winner[index] != NO_WINNER:
+                continue
+            cells = digits(index)
+            for sq in range(9):
+                if cells[sq] == 0:
+                    child = index + mark * POW3[sq]
+                    if child not in winner:
+                        cells[sq] = mark
+                        winner[child] = _winner(cells)
+                        cells[sq] = 0
+                    following.add(child)
+        layers.append(sorted(following))
+
+    # 手数の多い盤面から順に値を決める。勝ちは早く、負けは遅くなる手を選ぶ
+    table = np.full((3, N_STATES), UNREACHABLE, dtype=np.int8)
+    plies_left = {}
+    for ply in range(9, -1, -1):
+        mark = 1 if ply % 2 == 0 else 2
+        for index in layers[ply]:
+            w = winner[index]
+            table[WINNER, index] = w
+            if w != NO_WINNER:
+                # 終局: 直前に打った側が勝ったか引き分け
+                table[VALUE, index] = 0 if w == DRAW else -1
+                table[MOVE, index] = -1
+                plies_left[index] = 0
+                continue
+            best = None
+            for sq, cell in enumerate(digits(index)):
+                if cell != 0:
+                    continue
+                child = index + mark * POW3[sq]
+                value = -int(table[VALUE, child])
+                left = plies_left[child] + 1
+                key = (value, -left if value > 0 else left)
+                if best is None or key > best[0]:
+                    best = (key, sq, left)
+            (value, _), sq, left = best
+            table[VALUE, index] = value
+            table[MOVE, index] = sq
+            plies_left[index] = left
+    return table
+
+
+def load_table(path: str = TABLE_FILE) -> np.ndarray:
+    """解析表を読み込む。ファイルがなければその場で作る（0.1 秒ほど）"""
+    if os.path.exists(path):
+        return np.load(path)
+    return build_table()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="マルバツの完全解析表を作る")
+    parser.add_argument("--out", default=TABLE_FILE)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    table = build_table()
+    reachable = int((table[WINNER] != UNREACHABLE).sum())
+    np.save(args.out, table)
+    value = {1: "先手 X の勝ち", 0: "引き分け", -1: "後手 O の勝ち"}[int(table[VALUE, 0])]
+    print(f"{reachable} 局面 / 初期局面: {value} / {time.perf_counter() - t0:.2f}s → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import io
+import streamlit as st
+import pandas as pd
+from datetime import datetime, timedelta
+import pytz
+
+from timecard_db00 import TimecardDB, CLOCKED_OUT, NOT_CLOCKED_IN
+
+DB_FILE = "timecard.db"  # SQLite のファイル名（従業員全員分）
+
+# ───── 保存先（SQLite）─────
+# 全セッションで1つの TimecardDB（接続プール）を共有する。打刻・参照は (従業員, 日付) の索引で1行だけ触る
+@st.cache_resource
+def get_db():
+    return TimecardDB(DB_FILE)
+
+
+db = get_db()
+
+# ───── 日本時間（JST）で現在時刻を取得 ─────
+JST = pytz.timezone('Asia/Tokyo')
+now_jst = datetime.now(JST)
+
+today = now_jst.strftime("%Y-%m-%d")
+now_time = now_jst.strftime("%H:%M:%S")
+
+# ───── Streamlit 設定 ─────
+st.set_page_config(page_title="タイムカード", layout="centered")
+st.title("🕒 タイムカード（複数人）")
+
+# ───── 従業員の選択 ─────
+employees = db.employees()
+NEW = "（新しい従業員）"
+choice = st.selectbox("従業員", options=employees + [NEW])
+employee = st.text_input("名前", value="") if choice == NEW else choice
+if not employee:
+    st.info("名前を入力してください")
+    st.stop()
+
+# ───── 出勤・退勤・クリアボタン ─────
+col1, col2, col3 = st.columns(3)
+
+with col1:
+    clock_in_pressed = st.button("出勤")
+with col2:
+    clock_out_pressed = st.button("退勤")
+with col3:
+    clear_today_pressed = st.button("今日の記録をクリア")
+
+# 出勤処理
+if clock_in_pressed:
+    if db.clock_in(employee, today, now_time):
+        st.success(f"{employee} 出勤: {now_time}")
+    else:
+        st.warning("今日の出勤は既に記録されています")
+
+# 退勤処理
+if clock_out_pressed:
+    result = db.clock_out(employee, today, now_time)
+    if result == CLOCKED_OUT:
+        st.success(f"{employee} 退勤: {now_time}")
+    elif result == NOT_CLOCKED_IN:
+        st.warning("まず出勤を記録してください")
+    else:
+        st.warning("既に退勤済みです")
+
+# 今日の記録クリア
+if clear_today_pressed:
+    db.delete(employee, today)
+    st.info("今日の記録をクリアしました")
+
+# ───── 期間を指定して表示・編集 ─────
+st.subheader(f"📄 {employee} の記録")
+period = st.date_input("期間", value=(now_jst.date() - timedelta(days=30), now_jst.date()))
+if len(period) != 2:
+    st.stop()  # 終わりの日付を選んでいる途中
+first, last = period
+df = db.range(employee, first.isoformat(), last.isoformat())
+df_display = df.rename(columns={"date": "日付", "start": "出勤", "end": "退勤", "hours": "勤務時間"})
+edited_df = st.data_editor(
+    df_display,
+    num_rows="dynamic",  # 行の追加・削除可
+    disabled=["勤務時間"],
+)
+
+if st.button("編集内容を保存"):
+    save_df = edited_df.rename(columns={"日付": "date", "出勤": "start", "退勤": "end"})
+    # 表示している期間の分だけを1つのトランザクションで置き換える（期間外の記録はそのまま）
+    rows = [(str(date), start, end) for date, start, end in zip(save_df["date"], save_df["start"], save_df["end"])
+            if pd.notna(date)]
+    try:
+        db.replace_range(employee, first.isoformat(), last.isoformat(), rows)
+    except ValueError as e:
+        st.error(f"保存できませんでした: {e}")
+    else:
+        st.success("編集内容を保存しました")
+        st.rerun()
+
+# ───── 今日の全員の記録 ─────
+st.subheader(f"👥 今日（{today}）の全員")
+st.dataframe(
+    db.day(today).rename(columns={"employee": "従業員", "start": "出勤", "end": "退勤", "hours": "勤務時間"}),
+    use_container_width=True,
+)
+
+# ───── CSV の取り込み・書き出し（date,start,end,hours）─────
+st.subheader("📦 CSV")
+st.download_button(
+    f"{employee} の記録を CSV で書き出す", db.export_csv_text(employee),
+    file_name=f"timecard_{employee}.csv", mime="text/csv",
+)
+uploaded = st.file_uploader(f"CSV を {employee} の記録として取り込む", type="csv")
+if uploaded is not None and st.button("取り込む"):
+    try:
+        count = db.import_csv(io.TextIOWrapper(uploaded, encoding="utf-8", newline=""), employee)
+    except ValueError as e:
+        st.error(f"取り込めませんでした: {e}")
+    else:
+        st.success(f"{count} 行を取り込みました")
+
+# 表全体のフォントサイズを大きくする
+st.markdown(
+    """
+    <style>
+    .stDataFrame tbody, .stDataFrame th, .stDataFrame td {
+        font-size: 20px !important;
+    }
+    </style>
+    """,
+    unsafe_allow_html=True,
+)
@@ -0,0 +1,321 @@
+import argparse
+import csv
+import io
+import queue
+import random
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import date as Date, timedelta
+from typing import Iterable, Optional
+
+import pandas as pd
+
+from timecard_hours00 import work_hours, clean_time, update_hours
+from timecard_journal00 import normalize_date
+
+# ───── 複数の従業員のタイムカードを SQLite に保存 ─────
+# 1行 = (従業員, 日付, 出勤, 退勤)。主キー (employee, date) の B-tree をそのまま表にする（WITHOUT ROWID）ので、
+# 「ある人のある日」の打刻・参照も「ある人の期間」の取り出しも索引をたどるだけで、行数が増えても遅くならない。
+# 日付ごとに全員を見る用途（今日の出勤者など）のために (date, employee) の索引も持つ。
+#
+# WAL モードなので、書き込み中も他の接続は読める。接続はプールして使い回し、
+# SQL は下の定数だけを使う（sqlite3 は接続ごとに同じ SQL 文の準備済みステートメントをキャッシュする）。
+# 勤務時間（hours）は保存せず、出力するときに timecard_hours00 で計算する（表はまとめて、CSV は1行ずつ）。
+# 日付は書き込む前に normalize_date で 'YYYY-MM-DD' にそろえる（そろわなければ ValueError）。
+# 期間の取り出しは文字列の BETWEEN なので、別の形の日付が入ると画面から見えず消せもしなくなるため。
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS punches (
+    employee TEXT NOT NULL,
+    date     TEXT NOT NULL,
+    start    TEXT NOT NULL DEFAULT '',
+    end      TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (employee, date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS punches_date ON punches (date, employee);
+"""
+
+SQL_CLOCK_IN = "INSERT OR IGNORE INTO punches (employee, date, start) VALUES (?, ?, ?)"
+SQL_CLOCK_OUT = "UPDATE punches SET end = ? WHERE employee = ? AND date = ? AND end = ''"
+SQL_GET = "SELECT start, end FROM punches WHERE employee = ? AND date = ?"
+SQL_PUT = "INSERT OR REPLACE INTO punches (employee, date, start, end) VALUES (?, ?, ?, ?)"
+SQL_DELETE = "DELETE FROM punches WHERE employee = ? AND date = ?"
+SQL_CLEAR = "DELETE FROM punches WHERE employee = ?"
+SQL_CLEAR_RANGE = "DELETE FROM punches WHERE employee = ? AND date BETWEEN ? AND ?"
+SQL_RANGE = ("SELECT date, start, end FROM punches WHERE employee = ? AND date BETWEEN ? AND ? "
+             "ORDER BY date")
+SQL_DAY = "SELECT employee, start, end FROM punches WHERE date = ? ORDER BY employee"
+SQL_ALL = "SELECT employee, date, start, end FROM punches ORDER BY employee, date"
+SQL_EMPLOYEE_ALL = "SELECT date, start, end FROM punches WHERE employee = ? ORDER BY date"
+# employee の索引を飛び飛びにたどって重複のない一覧を作る（全行は読まない）
+SQL_EMPLOYEES = """
+WITH RECURSIVE e(name) AS (
+    SELECT MIN(employee) FROM punches
+    UNION ALL
+    SELECT (SELECT MIN(employee) FROM punches WHERE employee > e.name) FROM e WHERE e.name IS NOT NULL
+)
+SELECT name FROM e WHERE name IS NOT NULL
+"""
+
+CLOCKED_OUT, NOT_CLOCKED_IN, ALREADY_OUT = "ok", "not_clocked_in", "already_out"
+CSV_COLUMNS = ["date", "start", "end", "hours"]
+FIRST_DATE, LAST_DATE = "0000-00-00", "9999-99-99"
+
+
+class TimecardDB:
+    """SQLite のタイムカード。スレッドから同時に使ってよい（接続はプールから1本ずつ借りる）
+
+    pool_size: プールする接続の数（同時に処理できるリクエストの数）
+    """
+
+    def __init__(self, path: str = "timecard.db", pool_size: int = 4):
+        self.path = path
+        self.pool: queue.Queue = queue.Queue()
+        for _ in range(pool_size):
+            self.pool.put(self._connect())
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None: 自動でトランザクションを始めない（書き込みは transaction() でまとめる）
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False,
+                               cached_statements=64)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # WAL ではコミットごとの fsync を省いても壊れない
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        conn = self.pool.get()
+        try:
+            yield conn
+        finally:
+            self.pool.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        """1つのトランザクションで書き込む（BEGIN IMMEDIATE で先に書き込みロックを取る）"""
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def close(self):
+        while not self.pool.empty():
+            self.pool.get().close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ───── 打刻 ─────
+    def clock_in(self, employee: str, date: str, start: str) -> bool:
+        """出勤を記録する。その日の記録が既にあれば何もしないで False"""
+        with self.connection() as conn:
+            return conn.execute(SQL_CLOCK_IN, (employee, date, start)).rowcount == 1
+
+    def clock_out(self, employee: str, date: str, end: str) -> str:
+        """退勤を記録する。結果は CLOCKED_OUT / NOT_CLOCKED_IN / ALREADY_OUT"""
+        with self.connection() as conn:
+            if conn.execute(SQL_CLOCK_OUT, (end, employee, date)).rowcount == 1:
+                return CLOCKED_OUT
+            return ALREADY_OUT if conn.execute(SQL_GET, (employee, date)).fetchone() else NOT_CLOCKED_IN
+
+    def get(self, employee: str, date: str) -> Optional[tuple[str, str]]:
+        """その日の (出勤, 退勤)。記録がなければ None"""
+        with self.connection() as conn:
+            return conn.execute(SQL_GET, (employee, date)).fetchone()
+
+    def put(self, employee: str, date: str, start: str, end: str = ""):
+        """その日の記録を (出勤, 退勤) にする（手での修正用）。日付が YYYY-MM-DD にそろえられなければ ValueError"""
+        row = (employee, normalize_date(date), clean_time(start), clean_time(end))
+        with self.connection() as conn:
+            conn.execute(SQL_PUT, row)
+
+    def delete(self, employee: str, date: str):
+        date = normalize_date(date)
+        with self.connection() as conn:
+            conn.execute(SQL_DELETE, (employee, date))
+
+    def clear(self, employee: str):
+        with self.connection() as conn:
+            conn.execute(SQL_CLEAR, (employee,))
+
+    def replace_all(self, employee: str, rows: Iterable[tuple[str, str, str]]):
+        """employee の記録を rows（日付, 出勤, 退勤）でまとめて置き換える（表の編集の保存用）
+
+        先に全行をそろえるので、読めない日付が1つでもあれば何も変えずに ValueError になる。
+        """
+        rows = [(employee, normalize_date(d), clean_time(s), clean_time(e)) for d, s, e in rows if d]
+        with self.transaction() as conn:
+            conn.execute(SQL_CLEAR, (employee,))
+            conn.executemany(SQL_PUT, rows)
+
+    def replace_range(self, employee: str, first: str, last: str, rows: Iterable[tuple[str, str, str]]):
+        """employee の first〜last（両端を含む）の記録を rows（日付, 出勤, 退勤）で置き換える（期間を絞った表の編集の保存用）
+
+        期間外の記録はそのまま残す。削除と書き込みは1つのトランザクションで、途中で失敗すれば何も変わらない。
+        読めない日付や期間外の日付の行が1つでもあれば、何も変えずに ValueError になる（期間外の記録を上書きしない）。
+        """
+        first, last = normalize_date(first), normalize_date(last)
+        rows = [(employee, normalize_date(d), clean_time(s), clean_time(e)) for d, s, e in rows if d]
+        outside = [row[1] for row in rows if not first <= row[1] <= last]
+        if outside:
+            raise ValueError(f"表示している期間（{first}〜{last}）の外の日付があります: {', '.join(outside)}")
+        with self.transaction() as conn:
+            conn.execute(SQL_CLEAR_RANGE, (employee, first, last))
+            conn.executemany(SQL_PUT, rows)
+
+    # ───── 参照 ─────
+    def employees(self) -> list[str]:
+        with self.connection() as conn:
+            return [name for (name,) in conn.execute(SQL_EMPLOYEES)]
+
+    def range(self, employee: str, first: str = FIRST_DATE, last: str = LAST_DATE) -> pd.DataFrame:
+        """employee の first〜last（両端を含む）の記録。列は従来の CSV と同じ date, start, end, hours"""
+        with self.connection() as conn:
+            rows = conn.execute(SQL_RANGE, (employee, first, last)).fetchall()
+        return update_hours(pd.DataFrame(rows, columns=CSV_COLUMNS[:3], dtype=object))
+
+    def day(self, date: str) -> pd.DataFrame:
+        """その日の全員の記録（列は employee, start, end, hours）"""
+        with self.connection() as conn:
+            rows = conn.execute(SQL_DAY, (date,)).fetchall()
+        return update_hours(pd.DataFrame(rows, columns=["employee", "start", "end"], dtype=object))
+
+    # ───── CSV の取り込み・書き出し（date,start,end,hours）─────
+    def import_csv(self, file, employee: Optional[str] = None, batch: int = 50_000) -> int:
+        """従来形式の CSV（パスかテキストのファイル）を employee の記録として取り込む。hours 列は読み捨てる
+
+        employee 列がある CSV（export_csv で全員分を書き出したもの）なら、その列の従業員として取り込む。
+        同じ従業員・日付の記録は上書きする。batch 行ずつ1トランザクションで書くので、大きなファイルでもメモリは一定。
+        YYYY-MM-DD にそろえられない日付の行があればそこで ValueError にする（その行を含む batch より前は取り込み済み）。
+        """
+        if isinstance(file, str):
+            with open(file, newline="", encoding="utf-8") as f:
+                return self.import_csv(f, employee, batch)
+        reader = csv.DictReader(file)
+        count = 0
+        while True:
+            chunk = []
+            for row in reader:
+                name = row.get("employee") or employee
+                if row.get("date") and name:
+                    try:
+                        date = normalize_date(row["date"])
+                    except ValueError as e:
+                        raise ValueError(f"{reader.line_num} 行目: {e}") from None
+                    chunk.append((name, date, clean_time(row.get("start")), clean_time(row.get("end"))))
+                    if len(chunk) == batch:
+                        break
+            if not chunk:
+                return count
+            with self.transaction() as conn:
+                conn.executemany(SQL_PUT, chunk)
+            count += len(chunk)
+
+    def export_csv(self, file, employee: Optional[str] = None) -> int:
+        """employee の記録を従来形式の CSV に書き出す。employee=None なら先頭に employee 列を付けて全員分
+
+        行は SQLite から順に読みながら書くので、全件をメモリに載せない。
+        """
+        if isinstance(file, str):
+            with open(file, "w", newline="", encoding="utf-8") as f:
+                return self.export_csv(f, employee)
+        writer = csv.writer(file)
+        count = 0
+        with self.connection() as conn:
+            if employee is None:
+                writer.writerow(["employee"] + CSV_COLUMNS)
+                for name, d, s, e in conn.execute(SQL_ALL):
+                    writer.writerow([name, d, s, e, work_hours(s, e)])
+                    count += 1
+            else:
+                writer.writerow(CSV_COLUMNS)
+                for d, s, e in conn.execute(SQL_EMPLOYEE_ALL, (employee,)):
+                    writer.writerow([d, s, e, work_hours(s, e)])
+                    count += 1
+        return count
+
+    def export_csv_text(self, employee: Optional[str] = None) -> str:
+        buffer = io.StringIO()
+        self.export_csv(buffer, employee)
+        return buffer.getvalue()
+
+
+# ───── ベンチマーク ─────
+
+def _fill(db: TimecardDB, employees: int, days: int, seed: int = 0):
+    """employees 人 × days 日分の記録を作る"""
+    rng = random.Random(seed)
+    first = Date(2000, 1, 1)
+    dates = [(first + timedelta(days=i)).isoformat() for i in range(days)]
+    for e in range(employees):
+        name = f"emp{e:05d}"
+        rows = ((name, d, f"{rng.randrange(6, 11):02d}:{rng.randrange(60):02d}:00",
+                 f"{rng.randrange(15, 24):02d}:{rng.randrange(60):02d}:00") for d in dates)
+        with db.transaction() as conn:
+            conn.executemany(SQL_PUT, rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite タイムカードの取り込み・書き出し・ベンチマーク")
+    parser.add_argument("--db", default="timecard.db")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("import", help="従来形式の CSV を取り込む")
+    p.add_argument("csv")
+    p.add_argument("employee", nargs="?", help="省略すると CSV の employee 列を使う")
+    p = sub.add_parser("export", help="従来形式の CSV に書き出す（employee 省略で全員分）")
+    p.add_argument("csv")
+    p.add_argument("employee", nargs="?")
+    p = sub.add_parser("bench", help="employees × days 行を作って打刻・参照・期間の速さを測る")
+    p.add_argument("--employees", type=int, default=1000)
+    p.add_argument("--days", type=int, default=1000)
+    p.add_argument("--queries", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with TimecardDB(args.db) as db:
+        if args.command == "import":
+            print(f"{db.import_csv(args.csv, args.employee):,} 行を取り込みました")
+        elif args.command == "export":
+            print(f"{db.export_csv(args.csv, args.employee):,} 行を書き出しました")
+        else:
+            t0 = time.perf_counter()
+            _fill(db, args.employees, args.days)
+            n = args.employees * args.days
+            print(f"作成: {n:,} 行  {time.perf_counter() - t0:.1f}s")
+
+            rng = random.Random(1)
+            names = [f"emp{rng.randrange(args.employees):05d}" for _ in range(args.queries)]
+            today = (Date(2000, 1, 1) + timedelta(days=args.days)).isoformat()
+
+            t0 = time.perf_counter()
+            for name in names:
+                db.clock_in(name, today, "09:00:00")
+                db.clock_out(name, today, "18:00:00")
+            dt = time.perf_counter() - t0
+            print(f"打刻（出勤+退勤）: {dt / len(names) * 1e6:,.0f} µs/回")
+
+            t0 = time.perf_counter()
+            for name in names:
+                db.get(name, today)
+            dt = time.perf_counter() - t0
+            print(f"参照: {dt / len(names) * 1e6:,.0f} µs/回")
+
+            t0 = time.perf_counter()
+            for name in names[:1000]:
+                db.range(name, "2000-02-01", "2000-02-29")
+            dt = time.perf_counter() - t0
+            print(f"期間（1か月）: {dt / min(len(names), 1000) * 1e6:,.0f} µs/回")
+
+
+if __name__ == "__main__":
+    main()
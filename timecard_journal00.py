@@ -0,0 +1,300 @@
+import csv
+import os
+import re
+import struct
+import threading
+import time
+import unicodedata
+import zlib
+from typing import Optional
+
+import pandas as pd
+
+from timecard_hours00 import work_hours, work_hours_series, clean_time
+
+# ───── 追記型ジャーナルによるタイムカードの保存 ─────
+# 打刻のたびに CSV 全体を書き直す代わりに、変更を 32 バイト固定長のレコードとしてジャーナルに追記する。
+# 現在の状態は「スナップショット（従来と同じ形式の timecard.csv）+ ジャーナルの残り」から作る。
+# ジャーナルがある程度たまったら、別スレッドでスナップショットに畳み込んで（コンパクション）空にする。
+#
+# レコードは「その日の行をこの値にする（PUT）」「その日の行を消す（DELETE）」「全部消す（CLEAR）」の
+# 結果そのものなので、同じレコードを2回適用しても結果は変わらない。コンパクションの途中で
+# 落ちて、スナップショットに畳み込み済みのレコードがジャーナルに残っていても、読み直せば同じ状態になる。
+#
+# レコード: 種類 (uint8), 日付 "YYYY-MM-DD" (10 バイト), 出勤 "HH:MM:SS" (8), 退勤 (8), 予備 (1), CRC32 (uint32)
+# 末尾が書きかけ（長さが足りない・CRC が合わない）のレコードは読み込み時に捨てる。
+# 固定長に収めるため、日付と時刻は書く前に ASCII の "YYYY-MM-DD" / "HH:MM:SS" にそろえ、そろわなければ ValueError にする。
+# 以前の版の timecard.csv には日付が "2024/01/05" の行や同じ日付の行が複数あることがある。これらは unreadable に
+# 元の文字列のまま取っておき、スナップショットを書き直すときもそのまま書き戻す（黙って消さない）。
+CSV_COLUMNS = ["date", "start", "end", "hours"]
+
+PUT, DELETE, CLEAR = 1, 2, 3
+RECORD = struct.Struct("<B10s8s8sx")
+RECORD_SIZE = RECORD.size + 4
+COMPACT_EVERY = 1000  # ジャーナルがこのレコード数を超えたらコンパクションする
+RETRY_DELAY, MAX_RETRY_DELAY = 1.0, 300.0  # 畳み込みに失敗したときのやり直しまでの秒数（失敗のたびに倍、上限あり）
+DATE_RE = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}")
+ASCII_TIME_RE = re.compile(r"[0-9]{2}:[0-9]{2}:[0-9]{2}")
+
+
+def normalize_date(value) -> str:
+    """日付を ASCII の 'YYYY-MM-DD' にする（全角数字は半角にする）。それ以外の形なら ValueError"""
+    date = unicodedata.normalize("NFKC", "" if value is None else str(value)).strip()
+    if not DATE_RE.fullmatch(date):
+        raise ValueError(f"日付は YYYY-MM-DD で入力してください: {value!r}")
+    return date
+
+
+def normalize_time(value) -> str:
+    """時刻を ASCII の 'HH:MM:SS' にする（HH:MM:SS 以外は従来どおり空文字）。半角にできない数字なら ValueError"""
+    time = clean_time(value)
+    if not time:
+        return ""
+    time = unicodedata.normalize("NFKC", time)
+    if not ASCII_TIME_RE.fullmatch(time):
+        raise ValueError(f"時刻は HH:MM:SS で入力してください: {value!r}")
+    return time
+
+
+def encode(kind: int, date: str = "", start: str = "", end: str = "") -> bytes:
+    """レコード1件のバイト列。date / start / end は normalize_date / normalize_time 済みの ASCII であること"""
+    body = RECORD.pack(kind, date.encode("ascii"), start.encode("ascii"), end.encode("ascii"))
+    return body + struct.pack("<I", zlib.crc32(body))
+
+
+def decode(data: bytes):
+    """ジャーナルのバイト列から (種類, 日付, 出勤, 退勤) を順に返す
+
+    CRC が合わないレコード（書きかけ）があればそこで終わる。CRC は合うのに中身が読めないレコード
+    （ASCII でない日付など、以前の版で書かれたもの）は None を返して読み飛ばす。
+    """
+    for offset in range(0, len(data) - RECORD_SIZE + 1, RECORD_SIZE):
+        body = data[offset:offset + RECORD.size]
+        (crc,) = struct.unpack_from("<I", data, offset + RECORD.size)
+        if zlib.crc32(body) != crc:
+            return
+        kind, date, start, end = RECORD.unpack(body)
+        try:
+            fields = [field.rstrip(b"\0").decode("ascii") for field in (date, start, end)]
+        except UnicodeDecodeError:
+            yield None
+            continue
+        yield kind, *fields
+
+
+class TimecardJournal:
+    """timecard.csv をスナップショットとし、変更は path + ".journal" に追記する保存先
+
+    rows は {日付: (出勤, 退勤)}、hours は {日付: 勤務時間} で、全部メモリに持つ。打刻（put / delete）は
+    レコード1件の追記とその行の勤務時間の計算だけで、記録の量によらず一定の時間で終わる。同じプロセスのスレッド間ではロックで守る
+    （Streamlit では st.cache_resource で1つを共有する）。
+    """
+
+    def __init__(self, path: str = "timecard.csv", compact_every: int = COMPACT_EVERY, fsync: bool = True):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.compacting_path = path + ".journal.compacting"
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self.lock = threading.Lock()
+        self.compactor: Optional[threading.Thread] = None
+        self.folding = False  # スナップショットを書き出し中（ロックの外で書くので、その間を示す）
+        self.compact_error: Optional[OSError] = None  # 最後の畳み込みの失敗（成功したら None に戻す）
+        self.retry_delay = 0.0
+        self.retry_at = 0.0  # time.monotonic() がこれを過ぎるまで、失敗した畳み込みをやり直さない
+        self.rows: dict[str, tuple[str, str]] = {}
+        self.hours: dict[str, str] = {}
+        self.unreadable: list[tuple[str, str, str, str]] = []  # 読めない・日付が重複した CSV の行（元の文字列のまま）
+        self.journal_records = 0
+        self._load()
+        self.journal = open(self.journal_path, "ab")
+
+    # ───── 読み込み ─────
+    def _load(self):
+        if os.path.exists(self.path):
+            with open(self.path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    raw = tuple(row.get(column) or "" for column in CSV_COLUMNS)
+                    try:
+                        date = normalize_date(row.get("date"))
+                        start, end = normalize_time(row.get("start")), normalize_time(row.get("end"))
+                    except ValueError:
+                        self.unreadable.append(raw)  # 以前の版の日付の形など。書き直しても残す
+                        continue
+                    if date in self.rows:
+                        # 同じ日付の行は従来どおり後の行を使い、前の行も捨てずに取っておく
+                        start0, end0 = self.rows[date]
+                        self.unreadable.append((date, start0, end0, work_hours(start0, end0)))
+                    self.rows[date] = (start, end)
+        # コンパクションの途中で止まっていたら、その分も（畳み込み済みでも）適用し直す
+        leftover = os.path.exists(self.compacting_path)
+        if leftover:
+            with open(self.compacting_path, "rb") as f:
+                self._apply_all(f.read())
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "rb") as f:
+                data = f.read()
+            self.journal_records = self._apply_all(data)
+            valid = self.journal_records * RECORD_SIZE
+            if valid != len(data):
+                # 書きかけのレコードを切り捨てる
+                with open(self.journal_path, "r+b") as f:
+                    f.truncate(valid)
+        # 勤務時間は読み込みの最後に全行まとめて計算し、以後は変わった行だけ計算し直す
+        dates = list(self.rows)
+        starts = pd.Series([self.rows[d][0] for d in dates], dtype=object)
+        ends = pd.Series([self.rows[d][1] for d in dates], dtype=object)
+        self.hours = dict(zip(dates, work_hours_series(starts, ends)))
+        if leftover:
+            # 途中だった畳み込みをやり直す（ジャーナルの分も入るが、読み直しても同じ状態になる）
+            self._write_snapshot(self._snapshot_rows())
+
+    def _apply_all(self, data: bytes) -> int:
+        n = 0
+        for record in decode(data):
+            if record is not None:
+                self._apply(*record)
+            n += 1
+        return n
+
+    def _apply(self, kind, date, start, end):
+        if kind == PUT:
+            self.rows[date] = (start, end)
+        elif kind == DELETE:
+            self.rows.pop(date, None)
+        elif kind == CLEAR:
+            self.rows.clear()
+            self.unreadable.clear()  # 「全部消す」は読めない行も消す
+
+    # ───── 書き込み ─────
+    def _append(self, kind, date="", start="", end=""):
+        with self.lock:
+            self._apply(kind, date, start, end)
+            if kind == PUT:
+                self.hours[date] = work_hours(start, end)
+            elif kind == DELETE:
+                self.hours.pop(date, None)
+            else:
+                self.hours.clear()
+            self.journal.write(encode(kind, date, start, end))
+            self.journal.flush()
+            if self.fsync:
+                os.fsync(self.journal.fileno())
+            self.journal_records += 1
+            if (self.journal_records >= self.compact_every and not self._compacting()
+                    and time.monotonic() >= self.retry_at):
+                self.compact(background=True)
+
+    def put(self, date: str, start: str, end: str = ""):
+        """その日の行を (出勤, 退勤) にする（なければ追加）。日付・時刻がそろえられなければ ValueError"""
+        self._append(PUT, normalize_date(date), normalize_time(start), normalize_time(end))
+
+    def delete(self, date: str):
+        date = normalize_date(date)
+        if date in self.rows:
+            self._append(DELETE, date)
+
+    def clear(self):
+        self._append(CLEAR)
+
+    def replace_all(self, rows: dict):
+        """{日付: (出勤, 退勤)} と同じ内容になるように、変わった行だけを書き込む（表の編集の保存用）
+
+        先に全行をそろえるので、読めない日付・時刻が1つでもあれば何も書かずに ValueError になる。
+        """
+        rows = {normalize_date(date): (normalize_time(start), normalize_time(end))
+                for date, (start, end) in rows.items() if date}
+        for date in [d for d in self.rows if d not in rows]:
+            self.delete(date)
+        for date, (start, end) in rows.items():
+            if self.rows.get(date) != (start, end):
+                self.put(date, start, end)
+
+    # ───── 参照 ─────
+    def get(self, date: str) -> Optional[tuple[str, str]]:
+        try:
+            return self.rows.get(normalize_date(date))
+        except ValueError:
+            return None
+
+    def dataframe(self) -> pd.DataFrame:
+        """従来の CSV と同じ列 (date, start, end, hours) の DataFrame"""
+        with self.lock:
+            rows = self._rows()
+        return pd.DataFrame(rows, columns=CSV_COLUMNS, dtype=object)
+
+    def _rows(self) -> list[tuple[str, str, str, str]]:
+        return [(date, start, end, self.hours[date]) for date, (start, end) in self.rows.items()]
+
+    def _snapshot_rows(self) -> list[tuple[str, str, str, str]]:
+        """スナップショットに書く行。読めない行を元のまま先に書く（重複した日付は読み直しても後の行が使われる）"""
+        return self.unreadable + self._rows()
+
+    # ───── コンパクション ─────
+    def _compacting(self) -> bool:
+        return self.compactor is not None and self.compactor.is_alive()
+
+    def compact(self, background: bool = False):
+        """ジャーナルをスナップショットに畳み込む。background=True なら別スレッドで書き出す
+
+        ロックを持つのはジャーナルを差し替えて行を写し取る間だけで、CSV の書き出し中も打刻できる。
+        書き出しに失敗したら（ディスクがいっぱいなど）compact_error に残し、retry_delay 秒おいてからやり直す
+        （background=False なら例外もそのまま送出する）。
+        """
+        if background:
+            self.compactor = threading.Thread(target=self._compact_or_back_off, daemon=True)
+            self.compactor.start()
+        else:
+            self._compact_or_back_off(raise_error=True)
+
+    def _compact_or_back_off(self, raise_error: bool = False):
+        try:
+            self._compact()
+        except OSError as e:
+            with self.lock:
+                self.compact_error = e
+                self.retry_delay = min(max(self.retry_delay * 2, RETRY_DELAY), MAX_RETRY_DELAY)
+                self.retry_at = time.monotonic() + self.retry_delay
+            if raise_error:
+                raise
+        else:
+            with self.lock:
+                self.compact_error = None
+                self.retry_delay = self.retry_at = 0.0
+
+    def _compact(self):
+        with self.lock:
+            if self.folding:
+                return  # 別のスレッドが書き出し中
+            if not os.path.exists(self.compacting_path):
+                self.journal.close()
+                os.replace(self.journal_path, self.compacting_path)
+                self.journal = open(self.journal_path, "ab")
+                self.journal_records = 0
+            # .compacting が残っていれば前回の書き出しが失敗している。メモリ上の行はその分も含むので、
+            # ジャーナルは差し替えずに今の行で書き出し直す（ジャーナルの分は読み直しても同じ状態になる）
+            rows = self._snapshot_rows()
+            self.folding = True
+        try:
+            self._write_snapshot(rows)
+        finally:
+            with self.lock:
+                self.folding = False
+
+    def _write_snapshot(self, rows):
+        # 一時ファイルに書いてから置き換えるので、途中で落ちても元のスナップショットは壊れない
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_COLUMNS)
+            writer.writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        os.remove(self.compacting_path)
+
+    def close(self):
+        if self.compactor is not None:
+            self.compactor.join()
+        with self.lock:
+            self.journal.close()